@@ -0,0 +1,42 @@
+import hashlib
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic stand-in for the embedding model: every token is hashed to a fixed random unit
+    vector and a text is the normalized sum of its tokens' vectors.
+
+    Texts sharing words get similar vectors, so retrieval still behaves sensibly, but no model is
+    downloaded and the cost per text is tiny. Benchmarks use it to measure the pipeline around the
+    embedding model.
+    """
+
+    def __init__(self, dimension: int = 768):
+        self.dimension = dimension
+        self._token_vectors = {}
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+            vector /= np.linalg.norm(vector)
+            self._token_vectors[token] = vector
+        return vector
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in text.split():
+            vector += self._token_vector(token)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
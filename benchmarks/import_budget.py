@@ -0,0 +1,84 @@
+"""
+Import-time budget check for the entry points.
+
+Imports each entry module in a fresh interpreter, takes the best wall time of a few runs and
+fails (exit status 1) when a module exceeds the budget or loads one of the heavy backends, which
+must only be imported once a component that needs them is selected and constructed.
+
+Usage:
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --budget 0.5 --modules scripts.ingest_data
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+ENTRY_MODULES = ["main", "scripts.ingest_data", "rag.core.container"]
+# Top-level packages no entry point may import eagerly.
+HEAVY_PACKAGES = ["gradio", "selenium", "webdriver_manager", "torch", "transformers", "sentence_transformers",
+                  "elasticsearch", "langchain_elasticsearch", "openai", "langchain_community", "faiss"]
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+print(json.dumps({{"seconds": seconds, "modules": sorted({{name.split(".")[0] for name in sys.modules}})}}))
+"""
+
+
+def _project_root() -> str:
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module: str, runs: int = 3) -> Dict:
+    """Import module in runs fresh interpreters; returns the best time and the heavy packages it loaded."""
+    best, loaded = None, []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", _PROBE.format(module=module)], cwd=_project_root(),
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        best = result["seconds"] if best is None else min(best, result["seconds"])
+        loaded = [package for package in HEAVY_PACKAGES if package in result["modules"]]
+    return {"module": module, "seconds": round(best, 3), "heavy_imports": loaded}
+
+
+def slowest_imports(module: str, count: int = 10) -> List[str]:
+    """The count imports with the largest cumulative time, from python -X importtime."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=_project_root(),
+                            capture_output=True, text=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                rows.append((int(cumulative), name.rstrip()))
+    return [f"{cumulative / 1e6:.3f}s {name}" for cumulative, name in sorted(rows, reverse=True)[:count]]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check that the entry points import within a time budget.")
+    parser.add_argument("--modules", nargs="+", default=ENTRY_MODULES)
+    parser.add_argument("--budget", type=float, default=1.0, help="Seconds each module may take to import.")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per module; the best time counts.")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.modules:
+        result = measure(module, args.runs)
+        over_budget = result["seconds"] > args.budget
+        status = "FAIL" if over_budget or result["heavy_imports"] else "ok"
+        print(f"{status:4}  {module}: {result['seconds']}s (budget {args.budget}s)"
+              + (f", imports {', '.join(result['heavy_imports'])}" if result["heavy_imports"] else ""))
+        if status == "FAIL":
+            failed = True
+            for line in slowest_imports(module):
+                print(f"        {line}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
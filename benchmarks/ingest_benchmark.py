@@ -0,0 +1,168 @@
+"""
+Ingestion throughput benchmark.
+
+Generates synthetic Persian hotel corpora, ingests each one into a fresh FAISS store with
+MainIngestionProcess and reports per-stage timings, peak RSS and documents per second as JSON.
+
+Usage:
+    python -m benchmarks.ingest_benchmark --hotels 1000 10000 100000 --output ingest.json
+    python -m benchmarks.ingest_benchmark --hotels 1000 --embedding-model sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2
+
+Each corpus size runs in its own process, so peak RSS is measured per size. By default texts are
+embedded with the deterministic HashingEmbeddings, which measures the pipeline around the model;
+pass --embedding-model to include a (small, local) sentence-transformers model.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.stage_timer import StageTimer
+from benchmarks.synthetic_corpus import SyntheticHotelCorpus
+from benchmarks.workspace import BenchmarkWorkspace
+
+# The stages every run reports; "other" is the ingest time spent outside all of them.
+STAGES = ["format", "hash", "chunk", "embed", "index", "persist"]
+
+
+def _stage_targets(embeddings) -> list:
+    """The functions timed during an ingest, as (owner, attribute, stage) triples."""
+    from rag.data.document_chunker import HotelChunker, ReviewChunker
+    from rag.data.faiss_doc_store import FAISSStore
+    from scripts.formatters.iran_hotel_online_formatter import IranHotelOnlineFormatter
+    from utils.hash_util import HashUtil
+
+    return [
+        (IranHotelOnlineFormatter, "format_hotel_info_for_faiss", "format"),
+        (IranHotelOnlineFormatter, "format_reviews_as_documents", "format"),
+        (HashUtil, "compute_hash", "hash"),
+        (HashUtil, "find_changed_hashes", "hash"),
+        (HotelChunker, "chunk_text", "chunk"),
+        (ReviewChunker, "chunk_text", "chunk"),
+        (embeddings, "embed_documents", "embed"),
+        # Adding documents minus the nested embedding and saving: FAISS, document table, BM25 and metadata columns.
+        (FAISSStore, "add_documents", "index"),
+        (FAISSStore, "save", "persist"),
+    ]
+
+
+def run_ingest(hotels: int, reviews_per_hotel: int = 5, seed: int = 13, embedding_model: Optional[str] = None,
+               batch_size: Optional[int] = None, config_path: Optional[str] = None,
+               workdir: Optional[str] = None, keep: bool = False) -> Dict:
+    """
+    Ingest a synthetic corpus of the given size into a fresh store and return the measurements.
+
+    Formatting, hashing and chunking run in-process (ingestion.workers = 0) so they can be timed.
+    """
+    from scripts.ingest_data import MainIngestionProcess
+
+    corpus = SyntheticHotelCorpus(seed=seed, reviews_per_hotel=reviews_per_hotel)
+    with BenchmarkWorkspace(root=workdir, keep=keep) as workspace:
+        started = time.perf_counter()
+        reviews = workspace.write_corpus(corpus, hotels)
+        generate_seconds = time.perf_counter() - started
+
+        embeddings = BenchmarkWorkspace.create_embeddings(embedding_model)
+        container = BenchmarkWorkspace.create_container(embeddings, config_path=config_path, batch_size=batch_size)
+        ingestion = MainIngestionProcess(container)
+        # Open the store before timing, so model loading and index creation are not counted.
+        container.document_store()
+
+        timer = StageTimer()
+        with timer.instrument(_stage_targets(embeddings)):
+            started = time.perf_counter()
+            chunks = ingestion.ingest()
+            ingest_seconds = time.perf_counter() - started
+
+    stages = timer.report()
+    measured = sum(stage["seconds"] for stage in stages.values())
+    stages = {name: stages.get(name, {"seconds": 0.0, "calls": 0}) for name in STAGES}
+    stages["other"] = {"seconds": round(max(ingest_seconds - measured, 0.0), 6), "calls": 0}
+    return {
+        "hotels": hotels,
+        "reviews": reviews,
+        "chunks": chunks,
+        "generate_seconds": round(generate_seconds, 3),
+        "ingest_seconds": round(ingest_seconds, 3),
+        "docs_per_sec": round(chunks / ingest_seconds, 1) if ingest_seconds else None,
+        "hotels_per_sec": round(hotels / ingest_seconds, 1) if ingest_seconds else None,
+        "peak_rss_mb": BenchmarkWorkspace.peak_rss_mb(),
+        "stages": stages
+    }
+
+
+def _run_in_child(queue, kwargs) -> None:
+    logging.basicConfig()
+    logging.getLogger().setLevel(kwargs.pop("log_level"))
+    try:
+        queue.put(run_ingest(**kwargs))
+    except BaseException as e:
+        queue.put({"hotels": kwargs["hotels"], "error": repr(e)})
+        raise
+
+
+def run_isolated(**kwargs) -> Dict:
+    """Run run_ingest in a fresh process, so its peak RSS is not inflated by earlier runs."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_run_in_child, args=(queue, kwargs))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    parser = argparse.ArgumentParser(description="Measure ingestion throughput on synthetic hotel corpora.")
+    parser.add_argument("--hotels", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Corpus sizes (number of hotels) to ingest, each into a fresh store.")
+    parser.add_argument("--reviews-per-hotel", type=int, default=5, help="Mean number of reviews per hotel.")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--embedding-model", default=None,
+                        help="Local sentence-transformers model; the deterministic hashing embedder when omitted.")
+    parser.add_argument("--batch-size", type=int, default=None, help="Overrides ingestion.batch_size.")
+    parser.add_argument("--config", default=None, help="Config file; rag/configs/rag_config.yaml by default.")
+    parser.add_argument("--workdir", default=None, help="Directory for the scratch workspaces.")
+    parser.add_argument("--keep", action="store_true", help="Keep the workspaces (corpus and indexes).")
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    runs = []
+    for hotels in args.hotels:
+        result = run_isolated(hotels=hotels, reviews_per_hotel=args.reviews_per_hotel, seed=args.seed,
+                              embedding_model=args.embedding_model, batch_size=args.batch_size,
+                              config_path=args.config, workdir=args.workdir, keep=args.keep,
+                              log_level=args.log_level.upper())
+        runs.append(result)
+        print(f"{hotels} hotels: " + (f"{result['docs_per_sec']} docs/s, peak RSS {result['peak_rss_mb']} MiB"
+                                      if "error" not in result else f"failed: {result['error']}"), file=sys.stderr)
+
+    report = {
+        "benchmark": "ingest",
+        "embedder": args.embedding_model or "hashing",
+        "reviews_per_hotel": args.reviews_per_hotel,
+        "seed": args.seed,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "runs": runs
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Retrieval latency and quality benchmark.
+
+Builds an index per configuration (retrieval mode, vector compression, chunking, sharding) from
+one corpus, replays labeled Persian queries (query -> relevant hotel_source_ids) and reports, side
+by side per configuration, the p50/p95/p99 latency, the queries per second at several concurrent
+clients and recall@k and MRR of two targets:
+
+    store     IDocumentStore.search (or hybrid_search in hybrid mode) over hotel documents
+    combined  CombinedRetriever with the configured retrievers and the query analyzer, as queries run
+
+Usage:
+    python -m benchmarks.retrieval_benchmark --hotels 2000 --clients 1 4 8 --output retrieval.json
+    python -m benchmarks.retrieval_benchmark --configurations dense hybrid --embedding-model sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2
+    python -m benchmarks.retrieval_benchmark --corpus data/hotel --queries queries.json
+
+By default the corpus and its queries are synthetic (see SyntheticHotelCorpus.labeled_queries) and
+texts are embedded with the deterministic HashingEmbeddings, so everything runs offline on a CPU.
+A --queries file is a JSON array of {"query": ..., "relevant": [hotel_source_id, ...]} objects.
+The cross-encoder reranker is not part of the measured path.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.synthetic_corpus import SyntheticHotelCorpus
+from benchmarks.workspace import BenchmarkWorkspace
+
+# Name -> BenchmarkWorkspace.create_container options of each index configuration.
+CONFIGURATIONS: Dict[str, Dict] = {
+    "dense": {"mode": "dense"},
+    "hybrid": {"mode": "hybrid"},
+    "hybrid-int8": {"mode": "hybrid", "search": {"hotel_info": {"compression": "int8", "train_size": 256},
+                                                 "hotel_review": {"compression": "int8", "train_size": 256}}},
+    "hybrid-chunk-256": {"mode": "hybrid", "chunk_size": 256, "chunk_overlap": 25},
+    "hybrid-sharded": {"mode": "hybrid", "store_type": "sharded_faiss"}
+}
+TARGETS = ["store", "combined"]
+
+
+def ranked_hotel_ids(documents) -> List[int]:
+    """The distinct hotel_source_ids of the documents, in rank order."""
+    return list(dict.fromkeys(doc.metadata.get("hotel_source_id") for doc in documents))
+
+
+def ranking_metrics(ranked: List[int], relevant: List[int], k: int) -> Dict[str, float]:
+    """
+    Recall of the first k hotels and the reciprocal rank of the first relevant one.
+
+    Recall is normalized by min(k, number of relevant hotels), so a query with more relevant hotels
+    than k still reaches 1.0 when all k results are relevant.
+    """
+    relevant = set(relevant)
+    found = sum(1 for hotel_id in ranked[:k] if hotel_id in relevant)
+    reciprocal_rank = next((1.0 / rank for rank, hotel_id in enumerate(ranked, start=1) if hotel_id in relevant), 0.0)
+    return {"recall": found / min(k, len(relevant)), "reciprocal_rank": reciprocal_rank}
+
+
+def measure(search: Callable[[str], List[int]], queries: List[Dict], k: int, clients: List[int],
+            warmup: int = 5) -> Dict:
+    """
+    Replay the queries through search (query -> ranked hotel ids): once sequentially for the
+    latency percentiles and the quality metrics, then once per client from each concurrency level
+    in clients for the throughput.
+    """
+    for query in queries[:warmup]:
+        search(query["query"])
+
+    latencies, metrics = [], []
+    for query in queries:
+        started = time.perf_counter()
+        ranked = search(query["query"])
+        latencies.append(time.perf_counter() - started)
+        metrics.append({"kind": query.get("kind", "query"), **ranking_metrics(ranked, query["relevant"], k)})
+
+    throughput = {}
+    for count in clients:
+        def client(offset: int) -> None:
+            # Each client replays every query, starting at a different one.
+            for i in range(len(queries)):
+                search(queries[(offset + i) % len(queries)]["query"])
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            list(executor.map(client, [n * len(queries) // count for n in range(count)]))
+        throughput[str(count)] = round(count * len(queries) / (time.perf_counter() - started), 1)
+
+    latencies_ms = np.array(latencies) * 1000
+    by_kind = {}
+    for kind in dict.fromkeys(metric["kind"] for metric in metrics):
+        of_kind = [metric for metric in metrics if metric["kind"] == kind]
+        by_kind[kind] = {"queries": len(of_kind), **_mean_metrics(of_kind, k)}
+    return {
+        "latency_ms": {name: round(float(np.percentile(latencies_ms, q)), 3)
+                       for name, q in (("p50", 50), ("p95", 95), ("p99", 99))},
+        "qps": throughput,
+        **_mean_metrics(metrics, k),
+        "by_kind": by_kind
+    }
+
+
+def _mean_metrics(metrics: List[Dict], k: int) -> Dict[str, float]:
+    return {f"recall@{k}": round(float(np.mean([metric["recall"] for metric in metrics])), 4),
+            "mrr": round(float(np.mean([metric["reciprocal_rank"] for metric in metrics])), 4)}
+
+
+def run_configuration(name: str, queries: List[Dict], k: int, clients: List[int], hotels: int,
+                      reviews_per_hotel: int = 5, seed: int = 13, corpus_dir: Optional[str] = None,
+                      embedding_model: Optional[str] = None, config_path: Optional[str] = None,
+                      workdir: Optional[str] = None, keep: bool = False) -> Dict:
+    """Ingest the corpus into a fresh store built with the named configuration and measure both targets."""
+    from rag.core.interfaces import DocumentType, RetrievalMode
+    from rag.core.retrievers.combined_retriever import CombinedRetriever
+    from scripts.ingest_data import MainIngestionProcess
+
+    options = CONFIGURATIONS[name]
+    with BenchmarkWorkspace(root=workdir, keep=keep) as workspace:
+        if corpus_dir:
+            workspace.copy_corpus(corpus_dir)
+        else:
+            workspace.write_corpus(SyntheticHotelCorpus(seed=seed, reviews_per_hotel=reviews_per_hotel), hotels)
+
+        embeddings = BenchmarkWorkspace.create_embeddings(embedding_model)
+        container = BenchmarkWorkspace.create_container(embeddings, config_path=config_path, **options)
+        started = time.perf_counter()
+        chunks = MainIngestionProcess(container).ingest()
+        index_seconds = time.perf_counter() - started
+
+        store = container.document_store()
+        mode = RetrievalMode(container.config.retriever.params().get("mode", RetrievalMode.DENSE.value))
+        store_search = store.hybrid_search if mode is RetrievalMode.HYBRID else store.search
+        combined = CombinedRetriever(
+            container.retriever(document_store=store, doc_type=DocumentType.HOTEL_INFO, k=k),
+            container.retriever(document_store=store, doc_type=DocumentType.HOTEL_REVIEW),
+            container.query_analyzer()
+        )
+        # Hotel documents may be split into several chunks, so the store is asked for more than k.
+        searches = {
+            "store": lambda query: ranked_hotel_ids(store_search(query, 4 * k, DocumentType.HOTEL_INFO))[:k],
+            "combined": lambda query: ranked_hotel_ids(combined.retrieve(query))
+        }
+        targets = {}
+        for target in TARGETS:
+            targets[target] = measure(searches[target], queries, k, clients)
+            logging.info(f"{name}/{target}: {targets[target]}")
+
+    return {
+        "configuration": name,
+        "options": options,
+        "chunks": chunks,
+        "index_seconds": round(index_seconds, 3),
+        "targets": targets
+    }
+
+
+def format_table(runs: List[Dict], k: int, clients: List[int]) -> str:
+    """The runs side by side: one row per configuration and target."""
+    header = (["configuration", "target", "p50 ms", "p95 ms", "p99 ms"]
+              + [f"qps@{count}" for count in clients] + [f"recall@{k}", "mrr"])
+    rows = [header]
+    for run in runs:
+        for target, result in run["targets"].items():
+            rows.append([run["configuration"], target]
+                        + [str(result["latency_ms"][p]) for p in ("p50", "p95", "p99")]
+                        + [str(result["qps"][str(count)]) for count in clients]
+                        + [str(result[f"recall@{k}"]), str(result["mrr"])])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    parser = argparse.ArgumentParser(description="Measure retrieval latency, throughput and recall per index configuration.")
+    parser.add_argument("--configurations", nargs="+", choices=list(CONFIGURATIONS), default=list(CONFIGURATIONS))
+    parser.add_argument("--hotels", type=int, default=2000, help="Size of the synthetic corpus.")
+    parser.add_argument("--reviews-per-hotel", type=int, default=3, help="Mean number of reviews per hotel.")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--corpus", default=None,
+                        help="Directory with hotels_info.json and hotel_records.json to index instead of a synthetic corpus.")
+    parser.add_argument("--queries", default=None,
+                        help="JSON file of labeled queries; generated from the synthetic corpus when omitted.")
+    parser.add_argument("--num-queries", type=int, default=150, help="Number of generated queries.")
+    parser.add_argument("--k", type=int, default=10, help="Hotels retrieved per query, and the k of recall@k.")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 8],
+                        help="Concurrent clients the throughput is measured at.")
+    parser.add_argument("--embedding-model", default=None,
+                        help="Local sentence-transformers model; the deterministic hashing embedder when omitted.")
+    parser.add_argument("--config", default=None, help="Config file; rag/configs/rag_config.yaml by default.")
+    parser.add_argument("--workdir", default=None, help="Directory for the scratch workspaces.")
+    parser.add_argument("--keep", action="store_true", help="Keep the workspaces (corpus and indexes).")
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig()
+    logging.getLogger().setLevel(args.log_level.upper())
+    if args.corpus and not args.queries:
+        parser.error("--corpus needs labeled --queries")
+    if args.queries:
+        with open(args.queries, 'r', encoding='utf-8') as f:
+            queries = json.load(f)
+    else:
+        queries = SyntheticHotelCorpus(seed=args.seed).labeled_queries(args.hotels, args.num_queries)
+
+    runs = []
+    for name in args.configurations:
+        runs.append(run_configuration(name, queries, args.k, args.clients, args.hotels,
+                                      reviews_per_hotel=args.reviews_per_hotel, seed=args.seed,
+                                      corpus_dir=args.corpus, embedding_model=args.embedding_model,
+                                      config_path=args.config, workdir=args.workdir, keep=args.keep))
+        print(f"{name}: indexed {runs[-1]['chunks']} chunks in {runs[-1]['index_seconds']}s", file=sys.stderr)
+    print(format_table(runs, args.k, args.clients), file=sys.stderr)
+
+    report = {
+        "benchmark": "retrieval",
+        "embedder": args.embedding_model or "hashing",
+        "corpus": args.corpus or {"hotels": args.hotels, "reviews_per_hotel": args.reviews_per_hotel, "seed": args.seed},
+        "queries": len(queries),
+        "k": args.k,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "runs": runs
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import functools
+import inspect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, ExitStack
+from typing import Any, Dict, Iterable, Tuple
+
+
+class StageTimer:
+    """
+    Accumulates wall time and call counts per named pipeline stage.
+
+    Stages may nest; a stage's time excludes the time of the stages running inside it, so the
+    totals of all stages add up to the time spent in any of them. Existing functions are timed
+    by temporarily replacing them with a timed wrapper (see instrument), without touching the
+    code under test.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name: str):
+        stack = self._local.__dict__.setdefault("stack", [])
+        # Time spent in stages nested in this one, subtracted from its own time.
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            with self._lock:
+                self.seconds[name] += elapsed - nested
+                self.calls[name] += 1
+            if stack:
+                stack[-1] += elapsed
+
+    def timed(self, function, name: str):
+        """Return function wrapped so every call is timed under the stage name."""
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+
+    @contextmanager
+    def instrument(self, targets: Iterable[Tuple[Any, str, str]]):
+        """
+        Time the given attributes while the block runs.
+
+        Args:
+            targets: (owner, attribute name, stage name) triples. The owner is a class or an object;
+                static methods, class-level methods and instance attributes are all supported.
+        """
+        with ExitStack() as restore:
+            for owner, attribute, name in targets:
+                restore.callback(self._patch(owner, attribute, name))
+            yield self
+
+    def _patch(self, owner: Any, attribute: str, name: str):
+        """Replace owner.attribute with a timed version and return a function restoring it."""
+        original = inspect.getattr_static(owner, attribute)
+        own_attribute = attribute in vars(owner)
+        if isinstance(original, staticmethod):
+            setattr(owner, attribute, staticmethod(self.timed(original.__func__, name)))
+        elif isinstance(owner, type):
+            setattr(owner, attribute, self.timed(original, name))
+        else:
+            # An object: wrap the bound method (or callable attribute) on the instance only.
+            setattr(owner, attribute, self.timed(getattr(owner, attribute), name))
+
+        def undo():
+            if own_attribute:
+                setattr(owner, attribute, original)
+            else:
+                delattr(owner, attribute)
+        return undo
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """{stage: {"seconds": total, "calls": count}}, slowest stage first."""
+        return {name: {"seconds": round(seconds, 6), "calls": self.calls[name]}
+                for name, seconds in sorted(self.seconds.items(), key=lambda item: -item[1])}
@@ -0,0 +1,193 @@
+import json
+import random
+from typing import Dict, Iterator, List, Tuple
+
+# (Persian name, English name used in URLs) of the cities hotels are spread over.
+CITIES: List[Tuple[str, str]] = [
+    ("تهران", "tehran"), ("مشهد", "mashhad"), ("اصفهان", "isfahan"), ("شیراز", "shiraz"), ("تبریز", "tabriz"),
+    ("کیش", "kish"), ("یزد", "yazd"), ("رشت", "rasht"), ("قشم", "qeshm"), ("کرمان", "kerman"),
+    ("بندرعباس", "bandar-abbas"), ("اهواز", "ahvaz"), ("ساری", "sari"), ("همدان", "hamedan"), ("قم", "qom")
+]
+HOTEL_PREFIXES = ["هتل", "هتل آپارتمان", "اقامتگاه", "بوتیک هتل", "مهمانپذیر"]
+HOTEL_NAMES = ["پارسیان", "آزادی", "هما", "الماس", "بزرگ", "سپاهان", "کوثر", "زندیه", "پردیس", "ستاره",
+               "آسمان", "مروارید", "نگین", "درویشی", "قصر", "شهریار", "ارگ", "باغ", "سفیر", "آفتاب"]
+STREETS = ["خیابان امام", "بلوار کشاورز", "خیابان ولیعصر", "میدان آزادی", "خیابان حافظ", "بلوار چمران",
+           "خیابان فردوسی", "میدان انقلاب", "خیابان زند", "بلوار ساحلی"]
+AMENITIES = ["استخر", "سونا", "جکوزی", "رستوران", "کافی شاپ", "باشگاه ورزشی", "ترانسفر فرودگاهی",
+             "صبحانه بوفه", "لابی", "اتاق جلسات", "خشکشویی", "صندوق امانات"]
+LANDMARKS = ["حرم", "بازار", "فرودگاه", "ایستگاه مترو", "پارک ملت", "مرکز خرید", "ساحل", "موزه", "دانشگاه"]
+ROOMS = ["اتاق دو تخته دبل", "اتاق دو تخته توئین", "اتاق یک تخته", "سوئیت جونیور", "اتاق سه تخته", "سوئیت رویال"]
+TRAVEL_TYPES = ["خانوادگی", "تفریحی", "کاری", "زوج", "دوستانه", "انفرادی"]
+GUEST_NAMES = ["علی", "مریم", "رضا", "زهرا", "حسین", "فاطمه", "محمد", "سارا", "امیر", "نرگس"]
+RATE_TITLES = {1: "خیلی بد", 2: "بد", 3: "متوسط", 4: "خوب", 5: "عالی"}
+REVIEW_PHRASES = {
+    "positive": ["تمیزی اتاق عالی بود", "پرسنل بسیار مودب و خوش برخورد بودند", "صبحانه متنوع و تازه بود",
+                 "موقعیت هتل فوق العاده است", "منظره اتاق زیبا بود", "ارزش خرید خوبی داشت"],
+    "negative": ["سر و صدای خیابان زیاد بود", "اینترنت ضعیف بود", "حوله ها تمیز نبودند",
+                 "پذیرش طول کشید", "پارکینگ جای کافی نداشت", "کولر اتاق خراب بود"]
+}
+
+
+class SyntheticHotelCorpus:
+    """
+    Deterministic generator of Persian hotel records shaped like data/hotel/hotels_info.json
+    (metadata, descriptive_info and reviews per hotel) and data/hotel/hotel_records.json.
+
+    The same seed always yields the same corpus, so benchmark runs are comparable. Records are
+    generated one at a time and files are written as a stream, so large corpora never sit in memory.
+    """
+
+    def __init__(self, seed: int = 13, reviews_per_hotel: int = 5):
+        """
+        Args:
+            seed (int): Seed of the generator.
+            reviews_per_hotel (int): Mean number of reviews per hotel; each hotel gets 0..2x this many.
+        """
+        self.seed = seed
+        self.reviews_per_hotel = reviews_per_hotel
+
+    @staticmethod
+    def hotel_id(index: int) -> int:
+        return 100000 + index
+
+    @staticmethod
+    def city(index: int) -> Tuple[str, str]:
+        return CITIES[index % len(CITIES)]
+
+    @staticmethod
+    def hotel_name(index: int) -> str:
+        prefix = HOTEL_PREFIXES[index % len(HOTEL_PREFIXES)]
+        name = HOTEL_NAMES[(index // len(HOTEL_PREFIXES)) % len(HOTEL_NAMES)]
+        return f"{prefix} {name} {index}"
+
+    def hotels(self, count: int) -> Iterator[Dict]:
+        """Yield count hotel records with their reviews."""
+        for index in range(count):
+            yield self.hotel(index)
+
+    def hotel(self, index: int) -> Dict:
+        """The record of the hotel with the given index; independent of the other hotels."""
+        rng = random.Random(self.seed * 1_000_003 + index)
+        city_name, city_en_name = self.city(index)
+        hotel_name = self.hotel_name(index)
+        hotel_id = self.hotel_id(index)
+        amenities, streets, landmark, stars = self._features(rng)
+        return {
+            "metadata": {
+                "url": f"https://www.iranhotelonline.com/{city_en_name}-hotels/{hotel_id}/",
+                "hotel_source_id": hotel_id,
+                "hotel_name": hotel_name,
+                "city_name": city_name,
+                "scraped_at": "2024-01-01T00:00:00"
+            },
+            "descriptive_info": {
+                "hotel_summary": f"{hotel_name} یک هتل {stars} ستاره در شهر {city_name} است.",
+                "about_and_cafe": f"امکانات هتل شامل {'، '.join(amenities)} می باشد.",
+                "internet_and_parking": rng.choice(["اینترنت رایگان و پارکینگ", "اینترنت پرسرعت", "پارکینگ سرپوشیده"]),
+                "distance_information": f"فاصله تا {landmark} {rng.randint(1, 30)} کیلومتر است.",
+                "faqs": f"ساعت تحویل اتاق {rng.choice(['۱۲', '۱۴'])} و ساعت تخلیه ۱۲ است.",
+                "policies": "همراه داشتن کارت ملی برای پذیرش الزامی است.",
+                "hotel_labels": rng.choice(["مناسب خانواده", "اقتصادی", "لوکس", "نزدیک مرکز شهر"]),
+                "nearby_info": f"{landmark} و {rng.choice(LANDMARKS)} در نزدیکی هتل قرار دارند.",
+                "club_offers": f"{rng.randint(5, 20)} درصد تخفیف برای اعضای باشگاه",
+                "near_streets": "، ".join(streets)
+            },
+            "reviews": [self._review(rng, hotel_id, number)
+                        for number in range(rng.randint(0, 2 * self.reviews_per_hotel))]
+        }
+
+    def features(self, index: int) -> Dict:
+        """The amenities, landmark and star rating of the hotel with the given index, as used in its record."""
+        amenities, _, landmark, stars = self._features(random.Random(self.seed * 1_000_003 + index))
+        return {"amenities": amenities, "landmark": landmark, "stars": stars}
+
+    @staticmethod
+    def _features(rng: random.Random) -> Tuple[List[str], List[str], str, int]:
+        amenities = rng.sample(AMENITIES, 4)
+        streets = rng.sample(STREETS, 2)
+        landmark = rng.choice(LANDMARKS)
+        stars = rng.randint(1, 5)
+        return amenities, streets, landmark, stars
+
+    @staticmethod
+    def _review(rng: random.Random, hotel_id: int, number: int) -> Dict:
+        rate = rng.randint(1, 5)
+        tone = "positive" if rate >= 3 else "negative"
+        month, day, duration = rng.randint(1, 12), rng.randint(1, 28), rng.randint(1, 7)
+        return {
+            "hotelId": hotel_id,
+            "title": RATE_TITLES[rate],
+            "description": "، ".join(rng.sample(REVIEW_PHRASES[tone], 2)),
+            "rate": rate,
+            "rateTitle": RATE_TITLES[rate],
+            "guestName": f"{rng.choice(GUEST_NAMES)} {number}",
+            "arrivalDate": f"2024-{month:02d}-{day:02d}",
+            "arrivalDatePersian": f"1403/{month:02d}/{day:02d}",
+            "checkoutDate": f"2024-{month:02d}-{min(day + duration, 28):02d}",
+            "checkoutDatePersian": f"1403/{month:02d}/{min(day + duration, 28):02d}",
+            "duration": duration,
+            "travelTypeTitle": rng.choice(TRAVEL_TYPES),
+            "roomName": rng.choice(ROOMS)
+        }
+
+    def hotel_records(self, count: int) -> Iterator[Dict]:
+        """Yield the hotel list records (hotel_records.json) of the first count hotels."""
+        for index in range(count):
+            city_name, city_en_name = self.city(index)
+            hotel_name = self.hotel_name(index)
+            yield {
+                "HotelName": hotel_name,
+                "hotel_url": f"/{city_en_name}-hotels/{hotel_name.replace(' ', '-')}/",
+                "CityName": city_name,
+                "CityEnName": city_en_name,
+                "Id": self.hotel_id(index)
+            }
+
+    def labeled_queries(self, hotels: int, count: int) -> List[Dict]:
+        """
+        Persian queries over the first hotels hotels, each labeled with the hotel_source_ids that answer it.
+
+        A third of the queries name a hotel (one relevant hotel), a third ask for an amenity in a city
+        and a third for a star rating near a landmark in a city (every matching hotel is relevant).
+        """
+        by_amenity, by_landmark = {}, {}
+        for index in range(hotels):
+            city_name = self.city(index)[0]
+            features = self.features(index)
+            for amenity in features["amenities"]:
+                by_amenity.setdefault((city_name, amenity), []).append(self.hotel_id(index))
+            by_landmark.setdefault((city_name, features["landmark"], features["stars"]), []).append(
+                self.hotel_id(index))
+
+        rng = random.Random(self.seed + 1)
+        amenity_keys, landmark_keys = sorted(by_amenity), sorted(by_landmark)
+        queries = []
+        for number in range(count):
+            if number % 3 == 0:
+                index = rng.randrange(hotels)
+                queries.append({"kind": "hotel", "query": f"{self.hotel_name(index)} {self.city(index)[0]}",
+                                "relevant": [self.hotel_id(index)]})
+            elif number % 3 == 1:
+                city_name, amenity = rng.choice(amenity_keys)
+                queries.append({"kind": "amenity", "query": f"هتل با {amenity} در {city_name}",
+                                "relevant": by_amenity[(city_name, amenity)]})
+            else:
+                city_name, landmark, stars = rng.choice(landmark_keys)
+                queries.append({"kind": "landmark",
+                                "query": f"هتل {stars} ستاره در {city_name} نزدیک {landmark}",
+                                "relevant": by_landmark[(city_name, landmark, stars)]})
+        return queries
+
+    @staticmethod
+    def write_json_array(path: str, records: Iterator[Dict]) -> int:
+        """Write records to path as a JSON array, one record at a time. Returns the number written."""
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("[\n")
+            for record in records:
+                if count:
+                    f.write(",\n")
+                json.dump(record, f, ensure_ascii=False)
+                count += 1
+            f.write("\n]\n")
+        return count
@@ -0,0 +1,132 @@
+import os
+import resource
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+from dependency_injector import providers
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.hashing_embeddings import HashingEmbeddings
+from benchmarks.synthetic_corpus import SyntheticHotelCorpus
+from rag.configs.config_loader import ConfigLoader
+from rag.core.container import RAGContainer
+from rag.core.factories.document_chunker_factory import DocumentChunkerFactory
+from rag.core.interfaces import DocumentStoreType
+from rag.data.faiss_doc_store import FAISSStore
+from rag.data.sharded_faiss_doc_store import ShardedFAISSStore
+from utils.path_util import PathUtil
+
+
+class BenchmarkWorkspace:
+    """
+    A scratch project directory for one benchmark run.
+
+    While the workspace is active, the project base path points at it, so the corpus, the indexes,
+    the hash stores and the entity dictionary are all read and written under it and never touch
+    the real data/ directory. It is deleted on exit unless keep is set.
+    """
+
+    def __init__(self, root: Optional[str] = None, keep: bool = False):
+        """
+        Args:
+            root (Optional[str]): Directory to create the workspace in; the system temp dir by default.
+            keep (bool): Keep the workspace on exit, e.g. to inspect the indexes.
+        """
+        self.root = root
+        self.keep = keep
+        self.path: Optional[Path] = None
+        self._original_base_path = None
+
+    def __enter__(self) -> 'BenchmarkWorkspace':
+        if self.root:
+            os.makedirs(self.root, exist_ok=True)
+        self.path = Path(tempfile.mkdtemp(prefix="rag-bench-", dir=self.root))
+        self._original_base_path = PathUtil.__dict__["get_project_base_path"]
+        workspace_path = self.path
+        PathUtil.get_project_base_path = staticmethod(lambda marker=".git": workspace_path)
+        os.makedirs(self.path / "data" / "hotel", exist_ok=True)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        PathUtil.get_project_base_path = self._original_base_path
+        if not self.keep:
+            shutil.rmtree(self.path, ignore_errors=True)
+        return False
+
+    def write_corpus(self, corpus: SyntheticHotelCorpus, hotels: int) -> int:
+        """Write the hotel and hotel list files ingestion reads. Returns the number of reviews written."""
+        reviews = 0
+
+        def counted():
+            nonlocal reviews
+            for hotel in corpus.hotels(hotels):
+                reviews += len(hotel["reviews"])
+                yield hotel
+
+        hotel_dir = self.path / "data" / "hotel"
+        SyntheticHotelCorpus.write_json_array(str(hotel_dir / "hotels_info.json"), counted())
+        SyntheticHotelCorpus.write_json_array(str(hotel_dir / "hotel_records.json"), corpus.hotel_records(hotels))
+        return reviews
+
+    def copy_corpus(self, directory: str) -> None:
+        """Use an existing corpus: the hotels_info.json and hotel_records.json files in directory."""
+        for name in ("hotels_info.json", "hotel_records.json"):
+            shutil.copyfile(os.path.join(directory, name), self.path / "data" / "hotel" / name)
+
+    @staticmethod
+    def create_container(embeddings: Embeddings, config_path: Optional[str] = None,
+                         batch_size: Optional[int] = None, workers: int = 0, store_type: str = "faiss",
+                         mode: Optional[str] = None, search: Optional[Dict[str, Dict]] = None,
+                         chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> RAGContainer:
+        """
+        Build the application container from the config, with the document store replaced by a
+        persistent FAISS store using the given embeddings.
+
+        Args:
+            store_type (str): "faiss" or "sharded_faiss".
+            mode (Optional[str]): Overrides retriever.params.mode ("dense" or "hybrid").
+            search (Optional[Dict[str, Dict]]): Settings merged into retriever.search, per document type.
+            chunk_size (Optional[int]): Overrides the chunkers' chunk size; chunk_overlap their overlap.
+        """
+        config_loader = ConfigLoader(config_path) if config_path else ConfigLoader()
+        config = config_loader.get_container_config()
+        store_class = {DocumentStoreType.FAISS: FAISSStore,
+                       DocumentStoreType.SHARDED_FAISS: ShardedFAISSStore}[DocumentStoreType(store_type)]
+        config.retriever.document_store["type"] = store_type
+        config.retriever.document_store.params["persistent"] = True
+        if mode:
+            config.retriever.params["mode"] = mode
+        for doc_type, settings in (search or {}).items():
+            config.retriever.search.setdefault(doc_type, {}).update(settings)
+        config.ingestion["workers"] = workers
+        if batch_size:
+            config.ingestion["batch_size"] = batch_size
+        container = RAGContainer()
+        container.config.override(config)
+        container.document_store.override(providers.Singleton(
+            store_class, config=config.retriever.document_store, search_config=config.retriever.search,
+            embeddings=embeddings
+        ))
+        chunking = {name: value for name, value in (("chunk_size", chunk_size), ("chunk_overlap", chunk_overlap))
+                    if value is not None}
+        if chunking:
+            container.chunker.override(providers.Factory(DocumentChunkerFactory.create_chunker, **chunking))
+        return container
+
+    @staticmethod
+    def create_embeddings(model_name: Optional[str] = None, dimension: int = 768) -> Embeddings:
+        """A local sentence-transformers model when model_name is given, else the deterministic HashingEmbeddings."""
+        if model_name:
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+            return HuggingFaceEmbeddings(model_name=model_name, model_kwargs={"device": "cpu"})
+        return HashingEmbeddings(dimension)
+
+    @staticmethod
+    def peak_rss_mb() -> float:
+        """Peak resident set size of this process so far, in MiB."""
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes.
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
@@ -1,47 +1,104 @@
 # main.py
+import argparse
 import logging
+from typing import List, Optional
+
 from rag.configs.config_loader import ConfigLoader
 from rag.core.container import RAGContainer
 from rag.core.interfaces import DocumentType
-from scripts.ingest_data import MainIngestionProcess
-from ui.gradio_app import launch_gradio_ui
+from rag.core.metrics import MetricsExporter
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logging = logging.getLogger(__name__)
 
-def main():
-    # Load configuration
-    logging.info("Loading configuration")
-    config_loader = ConfigLoader()  # defaults to 'rag_config.yaml'
-    container = RAGContainer.create(config_loader)
-    logging.info("Configuration loaded successfully")
 
-    # Ingest data if available (for example, from a JSON file or scraper)
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Hotel review question answering.")
+    parser.add_argument("--config", default=None, help="Config file; rag/configs/rag_config.yaml by default.")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("ingest", help="Ingest the scraped hotel data into the document store and exit.")
+    serve_parser = commands.add_parser("serve", help="Launch the chat UI on the current index (the default).")
+    serve_parser.add_argument("--watch", action="store_true",
+                              help="Ingest new hotel data in the background and swap the new index in when it is ready.")
+    serve_parser.add_argument("--interval", type=float, default=None,
+                              help="Seconds between checks for new hotel data; ingestion.watch_interval by default.")
+    return parser
+
+
+def ingest(container) -> None:
+    # Imported here so main.py starts without loading the ingestion pipeline.
+    from scripts.ingest_data import run_ingestion
+
     logging.info("Starting data ingestion process")
-    ingestion = MainIngestionProcess(container)
-    ingestion.ingest()
-    logging.info("Data ingestion process completed")
+    chunk_count = run_ingestion(container)
+    logging.info(f"Data ingestion process completed: {chunk_count} chunks ingested")
+
 
-    # Launch the Gradio chat UI
+def serve(container, watch: bool = False, interval: Optional[float] = None) -> None:
+    from rag.data.hot_swap_doc_store import HotSwapDocumentStore
+
+    # Serve the last published index right away, read-only; newer ones are swapped in between requests.
     logging.info("Setting up document store")
-    document_store = container.document_store()
+    document_store = HotSwapDocumentStore(container.served_document_store())
+
+    logging.info("Loading reranker")
+    reranker = container.reranker()
+    reranker_config = container.config.reranker()
+    # With reranking enabled, the retrievers over-fetch candidates and the reranker keeps the best top_k.
+    k = reranker_config["candidates"] if reranker is not None else None
+    logging.info(f"Reranker {'loaded' if reranker is not None else 'disabled'}")
 
     logging.info("Initializing hotel retriever")
-    hotel_retriever = container.retriever(document_store=document_store, doc_type=DocumentType.HOTEL_INFO)
+    hotel_retriever = container.retriever(document_store=document_store, doc_type=DocumentType.HOTEL_INFO, k=k)
     logging.info("Hotel retriever initialized")
 
     logging.info("Initializing review retriever")
-    review_retriever = container.retriever(document_store=document_store, doc_type=DocumentType.HOTEL_REVIEW)
+    review_retriever = container.retriever(document_store=document_store, doc_type=DocumentType.HOTEL_REVIEW, k=k)
     logging.info("Review retriever initialized")
 
+    logging.info("Loading query analyzer")
+    query_analyzer = container.query_analyzer()
+    logging.info("Query analyzer loaded")
+
     logging.info("Initializing LLM")
     llm = container.llm()
     logging.info("LLM initialized")
 
+    metrics_config = container.config.metrics()
+    if metrics_config["enabled"]:
+        MetricsExporter.serve(metrics_config["port"])
+
+    # Follow the indexes published by `main.py ingest` runs, and with --watch ingest new data itself.
+    from scripts.ingest_watcher import IngestionWatcher
+
+    ingestion_config = container.config.ingestion()
+    watcher = IngestionWatcher(container, document_store, interval=interval or ingestion_config["watch_interval"],
+                               reload_interval=ingestion_config["reload_interval"], ingest=watch,
+                               on_swap=query_analyzer.reload)
+    watcher.start()
+
     logging.info("Launching Gradio UI")
-    launch_gradio_ui(hotel_retriever=hotel_retriever, review_retriever=review_retriever, llm=llm)
+    # Imported here so the ingestion path and the CLI start without loading Gradio.
+    from ui.gradio_app import launch_gradio_ui
+    launch_gradio_ui(hotel_retriever=hotel_retriever, review_retriever=review_retriever, llm=llm,
+                     query_analyzer=query_analyzer, reranker=reranker, rerank_top_k=reranker_config["top_k"])
     logging.info("Gradio UI launched successfully")
 
+
+def main(argv: Optional[List[str]] = None):
+    args = build_parser().parse_args(argv)
+
+    # Load configuration
+    logging.info("Loading configuration")
+    config_loader = ConfigLoader(args.config) if args.config else ConfigLoader()  # defaults to 'rag_config.yaml'
+    container = RAGContainer.create(config_loader)
+    logging.info("Configuration loaded successfully")
+
+    if args.command == "ingest":
+        ingest(container)
+    else:
+        serve(container, watch=getattr(args, "watch", False), interval=getattr(args, "interval", None))
+
 if __name__ == "__main__":
     main()
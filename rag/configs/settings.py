@@ -1,15 +1,32 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 
 # Retriever settings
 class RetrieverParams(BaseModel):
     embedding_model: str
     device: str
+    mode: str = "dense"  # "dense" (vector only) or "hybrid" (vector + BM25, fused with RRF)
+
+# Search settings of one document type
+class SearchSettings(BaseModel):
+    k: int = 10  # Documents returned per query
+    fetch_k: int = 50  # Candidates fetched for MMR re-selection and hybrid fusion
+    mmr_lambda: Optional[float] = None  # Set (0..1, 1 = pure relevance) to diversify results with MMR
+    score_threshold: Optional[float] = None  # Max L2 distance, or min similarity for "ip"/"cosine"
+    metric: str = "l2"  # "l2", "ip" or "cosine": the distance metric new indexes are built with
+    compression: str = "none"  # "none", "fp16", "int8" or "pq": how the index stores vectors in memory
+    pq_m: int = 16  # Bytes per vector with "pq" compression; must divide the embedding dimension
+    train_size: int = 20000  # Vectors used to train "int8"/"pq"; the index stays exact until this many exist
+    rescore_factor: int = 4  # Candidates per result taken from a compressed index and re-scored exactly
+    num_candidates: Optional[int] = None  # HNSW candidates per shard for Elasticsearch kNN; 2 * fetch_k when unset
+    hnsw_m: int = 16  # Neighbours per node of the Elasticsearch HNSW graph
+    hnsw_ef_construction: int = 100  # Candidates considered while building the Elasticsearch HNSW graph
 
 class RetrieverSettings(BaseModel):
     framework: str
     params: RetrieverParams
     document_store: 'DocumentStoreSettings'  # Nested document store settings
+    search: Dict[str, SearchSettings] = {}  # Per DocumentType value, e.g. "hotel_info"
 
 # Document store settings
 class DocumentStoreParams(BaseModel):
@@ -18,11 +35,36 @@ class DocumentStoreParams(BaseModel):
     embedding_model: str
     api_key: Optional[str] = None  # Only needed for Pinecone
     index_name: Optional[str] = None  # Only needed for Pinecone
+    elasticsearch_url: Optional[str] = None  # Only needed for Elasticsearch
+    bulk_chunk_size: int = 500  # Documents embedded and sent per Elasticsearch bulk request
+    bulk_workers: int = 4  # Elasticsearch bulk requests in flight at once
+    connections_per_node: int = 10  # Keep-alive connections pooled per Elasticsearch node
+    request_timeout: float = 30  # Seconds before an Elasticsearch request times out
+    text_analyzer: str = "persian"  # Analyzer of the text field in the Elasticsearch index template
+    index_shards: int = 1  # Primary shards of each Elasticsearch index
+    index_replicas: int = 1  # Replicas of each Elasticsearch index
+    rrf_k: int = 60  # Reciprocal rank fusion damping constant
+    shard_key: str = "city_name"  # Metadata field partitioning the "sharded_faiss" store
+    search_workers: int = 8  # Threads searching the shards of the "sharded_faiss" store in parallel
+    snapshots_to_keep: int = 2  # Published versions of each FAISS index kept on disk
 
 class DocumentStoreSettings(BaseModel):
     type: str
     params: DocumentStoreParams
 
+# Reranker settings
+class RerankerSettings(BaseModel):
+    enabled: bool = False
+    model: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"  # Multilingual cross-encoder
+    candidates: int = 30  # Documents retrieved per type (instead of retriever.search k) for reranking
+    top_k: int = 5  # Documents kept after reranking and passed to the LLM
+    batch_size: int = 16
+    max_length: int = 512
+    device: str = "cpu"
+    backend: str = "torch"  # "torch" or "onnx" (requires optimum[onnxruntime])
+    quantize: bool = True  # Dynamic int8 quantization of the torch model on CPU
+    cache_size: int = 2048  # Cached (query, document) scores
+
 # LLM settings
 class LLMParams(BaseModel):
     api_key: str
@@ -39,6 +81,9 @@ class LLMSettings(BaseModel):
 # Scraper settings
 class ScraperParams(BaseModel):
     api_key: str
+    num_workers: int = 1  # Parallel browser workers (SnappTrip only)
+    headless: bool = True  # Run browser workers without a window (SnappTrip only)
+    extraction_mode: str = "webdriver"  # "webdriver" or "html" review extraction (SnappTrip only)
 
 class ScraperSettings(BaseModel):
     type: str
@@ -52,9 +97,35 @@ class HashStoreSettings(BaseModel):
     type: str
     params: HashStoreParams
 
+# Ingestion settings
+class IngestionSettings(BaseModel):
+    stream: bool = True  # Read hotel records incrementally instead of loading the whole file
+    batch_size: int = 256  # Hotels formatted, chunked and embedded per batch
+    workers: int = 0  # Processes formatting, hashing and chunking hotels; 0 or 1 runs in-process
+    watch_interval: float = 300.0  # Seconds between checks for new hotel data with `main.py serve --watch`
+    reload_interval: float = 10.0  # Seconds between checks of `main.py serve` for a newly published index
+
+# Tracing settings
+class TracingSettings(BaseModel):
+    enabled: bool = False  # Time the stages of every query; disabled tracing costs a flag check per stage
+    exporters: List[str] = ["log"]  # "log", "prometheus" (prometheus_client) and/or "opentelemetry" (opentelemetry-api)
+    slow_query_seconds: Optional[float] = 5.0  # Queries this slow are logged with their stage breakdown
+
+# Metrics settings
+class MetricsSettings(BaseModel):
+    enabled: bool = True  # Serve Prometheus metrics on /metrics next to the chat UI
+    port: int = 8000
+    textfile_path: Optional[str] = None  # Batch ingestion runs write their metrics here (node exporter textfile)
+    pushgateway_url: Optional[str] = None  # ...and/or push them to this Prometheus Pushgateway
+    job: str = "rag_ingest"  # Pushgateway job name of ingestion runs
+
 # Main settings class
 class Settings(BaseModel):
     retriever: RetrieverSettings
     llm: LLMSettings
     scraper: ScraperSettings
     hash_store: HashStoreSettings
+    ingestion: IngestionSettings = IngestionSettings()
+    reranker: RerankerSettings = RerankerSettings()
+    tracing: TracingSettings = TracingSettings()
+    metrics: MetricsSettings = MetricsSettings()
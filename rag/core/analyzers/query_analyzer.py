@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from rag.core.analyzers.aho_corasick import AhoCorasick
+from rag.core.interfaces import MetadataFilter
+from utils.path_util import PathUtil
+from utils.persian_normalizer import PersianNormalizer
+
+# Aliases shorter than this match inside too many unrelated words to be useful.
+MIN_ALIAS_LENGTH = 3
+HOTEL_PREFIX = "هتل "
+
+
+def default_entity_dictionary_path() -> str:
+    return str(PathUtil.construct_path(PathUtil.get_project_base_path(), 'data', 'query_index', 'entities.json'))
+
+
+class EntityDictionary:
+    """
+    Known city and hotel names, keyed by their normalized aliases.
+
+    Built during ingestion from the `city_name`, `hotel_name` and `hotel_source_id` metadata of
+    every hotel, and persisted as JSON so the query analyzer can load it at serving time.
+    """
+
+    def __init__(self):
+        self.cities: Dict[str, str] = {}  # alias -> city_name as stored in metadata
+        self.hotels: Dict[str, List[Tuple[Any, Optional[str]]]] = {}  # alias -> [(hotel_source_id, city_name)]
+
+    def add_city(self, alias: str, city_name: str) -> None:
+        alias = PersianNormalizer.normalize(alias)
+        if len(alias) >= MIN_ALIAS_LENGTH and city_name:
+            self.cities.setdefault(alias, city_name)
+
+    def add_hotel(self, metadata: Dict[str, Any]) -> None:
+        """Register a hotel by its name, with and without the leading 'هتل', and its city."""
+        hotel_id = metadata.get("hotel_source_id")
+        hotel_name = PersianNormalizer.normalize(metadata.get("hotel_name", ""))
+        city_name = metadata.get("city_name")
+        if hotel_id in (None, "") or not hotel_name:
+            return
+        if city_name:
+            self.add_city(city_name, city_name)
+        bare_name = hotel_name[len(HOTEL_PREFIX):] if hotel_name.startswith(HOTEL_PREFIX) else hotel_name
+        for alias in {bare_name, HOTEL_PREFIX + bare_name}:
+            if len(alias) < MIN_ALIAS_LENGTH:
+                continue
+            entries = self.hotels.setdefault(alias, [])
+            if (hotel_id, city_name) not in entries:
+                entries.append((hotel_id, city_name))
+
+    def add_city_aliases_from_records(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Map the Persian city names of hotel list records (CityName) to their metadata form (CityEnName)."""
+        for record in records:
+            if record.get("CityName") and record.get("CityEnName"):
+                self.add_city(record["CityName"], record["CityEnName"])
+                self.add_city(record["CityEnName"], record["CityEnName"])
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or default_entity_dictionary_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"cities": self.cities, "hotels": self.hotels}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'EntityDictionary':
+        path = path or default_entity_dictionary_path()
+        dictionary = cls()
+        if not os.path.exists(path):
+            logging.info(f"Entity dictionary {path} not found; query analysis will not detect entities.")
+            return dictionary
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        dictionary.cities = data.get("cities", {})
+        dictionary.hotels = {alias: [tuple(entry) for entry in entries]
+                             for alias, entries in data.get("hotels", {}).items()}
+        return dictionary
+
+
+@dataclass
+class QueryAnalysis:
+    """Entities detected in a query and the metadata filter derived from them."""
+    cities: List[str] = field(default_factory=list)
+    hotel_ids: List[Any] = field(default_factory=list)
+    metadata_filter: Optional[MetadataFilter] = None
+
+
+class QueryAnalyzer:
+    """
+    Detects known city and hotel names in a query before retrieval, e.g. "هتل چمران شیراز",
+    and turns them into a metadata filter that narrows the search to that city or hotel.
+    """
+
+    def __init__(self, dictionary: EntityDictionary):
+        self.dictionary = dictionary
+        self._automaton = AhoCorasick()
+        for alias, city_name in dictionary.cities.items():
+            self._automaton.add(alias, ("city", city_name))
+        for alias, entries in dictionary.hotels.items():
+            self._automaton.add(alias, ("hotel", entries))
+        self._automaton.build()
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'QueryAnalyzer':
+        return cls(EntityDictionary.load(path))
+
+    def reload(self, path: Optional[str] = None) -> None:
+        """
+        Rebuild the matcher from the entity dictionary saved at path, e.g. after a background ingest.
+        Queries being analyzed meanwhile finish with the previous matcher.
+        """
+        fresh = QueryAnalyzer.load(path)
+        self.dictionary, self._automaton = fresh.dictionary, fresh._automaton
+        logging.info(f"Reloaded the entity dictionary: {len(self.dictionary.cities)} city aliases, "
+                     f"{len(self.dictionary.hotels)} hotel aliases")
+
+    def analyze(self, query: str) -> QueryAnalysis:
+        text = PersianNormalizer.normalize(query)
+        cities, hotel_entries = [], []
+        for _, _, (kind, value) in self._longest_word_matches(text):
+            if kind == "city":
+                if value not in cities:
+                    cities.append(value)
+            else:
+                hotel_entries.extend(value)
+
+        # A hotel name shared by several cities is disambiguated by a city named in the same query.
+        # If none of the named hotels is in a named city, the city alone is used.
+        if cities:
+            hotel_entries = [entry for entry in hotel_entries if entry[1] in cities]
+        hotel_ids = list(dict.fromkeys(hotel_id for hotel_id, _ in hotel_entries))
+
+        metadata_filter = None
+        if hotel_ids:
+            metadata_filter = MetadataFilter().is_in("hotel_source_id", hotel_ids)
+        elif cities:
+            metadata_filter = MetadataFilter().is_in("city_name", cities)
+        return QueryAnalysis(cities=cities, hotel_ids=hotel_ids, metadata_filter=metadata_filter)
+
+    def _longest_word_matches(self, text: str) -> List[Tuple[int, int, Any]]:
+        """Keep matches on word boundaries, preferring the longest one where matches overlap."""
+        matches = [
+            (start, end, value) for start, end, value in self._automaton.find(text)
+            if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+        ]
+        matches.sort(key=lambda match: (match[0], -(match[1] - match[0])))
+        selected, last_end = [], 0
+        for match in matches:
+            if match[0] >= last_end:
+                selected.append(match)
+                last_end = match[1]
+        return selected
@@ -1,12 +1,15 @@
 from dependency_injector import containers, providers
 
 from rag.configs.config_loader import ConfigLoader
+from rag.core.analyzers.query_analyzer import QueryAnalyzer
 from rag.core.factories.document_chunker_factory import DocumentChunkerFactory
 from rag.core.factories.document_store_factory import DocumentStoreFactory
 from rag.core.factories.hash_store_factory import HashStoreFactory
 from rag.core.factories.llm_factory import LLMFactory
+from rag.core.factories.reranker_factory import RerankerFactory
 from rag.core.factories.retriever_factory import RetrieverFactory
 from rag.core.factories.scraper_factory import ScraperFactory
+from rag.core.tracing import tracer
 
 
 class RAGContainer(containers.DeclarativeContainer):
@@ -17,12 +20,29 @@ class RAGContainer(containers.DeclarativeContainer):
         container = cls()
         config_loader.load()
         container.config.override(config_loader.get_container_config())
+        tracer.configure(**container.config.tracing())
         return container
 
     # Provide Document Store
     document_store = providers.Singleton(
         DocumentStoreFactory.create_store,
-        config=config.retriever.document_store
+        config=config.retriever.document_store,
+        search_config=config.retriever.search
+    )
+
+    # Provide the Document Store queries are served from, opened read-only
+    served_document_store = providers.Singleton(
+        DocumentStoreFactory.create_store,
+        config=config.retriever.document_store,
+        search_config=config.retriever.search,
+        read_only=True
+    )
+
+    # Provide a new writable Document Store per call, for ingests running next to a served store
+    ingest_document_store = providers.Factory(
+        DocumentStoreFactory.create_store,
+        config=config.retriever.document_store,
+        search_config=config.retriever.search
     )
 
     # Provide Retriever
@@ -31,14 +51,25 @@ class RAGContainer(containers.DeclarativeContainer):
         config=config.retriever
     )
 
+    # Provide Reranker (None when reranking is disabled)
+    reranker = providers.Singleton(
+        RerankerFactory.create_reranker,
+        config=config.reranker
+    )
+
+    # Provide Query Analyzer (loads the entity dictionary written by ingestion)
+    query_analyzer = providers.Singleton(
+        QueryAnalyzer.load
+    )
+
     # Provide LLM
     llm = providers.Factory(
         LLMFactory.create_llm,
         config=config.llm
     )
 
-    #provide chunker
-    chunker = providers.Singleton(
+    #provide chunker (a Factory, so each document type gets its own chunker)
+    chunker = providers.Factory(
         DocumentChunkerFactory.create_chunker
     )
 
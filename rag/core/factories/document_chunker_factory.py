@@ -1,17 +1,22 @@
 from rag.core.interfaces import IDocumentChunker, DocumentType
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-
-from rag.data.document_chunker import HotelChunker, ReviewChunker
 
 
 class DocumentChunkerFactory:
     @staticmethod
-    def create_chunker(doc_type: DocumentType = None) -> IDocumentChunker:
+    def create_chunker(doc_type: DocumentType = None, chunk_size: int = 512, chunk_overlap: int = 50) -> IDocumentChunker:
+        """
+        Create the chunker of a document type. chunk_size and chunk_overlap (in characters) apply to
+        the split document types; reviews are never split.
+        """
+        # Imported here so LangChain's text splitters are only loaded by the processes that chunk.
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        from rag.data.document_chunker import HotelChunker, ReviewChunker
+
         if doc_type == DocumentType.HOTEL_INFO:
             # Use a Persian-friendly splitter for hotel info.
             splitter = RecursiveCharacterTextSplitter(
-                chunk_size=512,
-                chunk_overlap=50,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
                 separators=["\n\n", "؟", "!", ".", "۔"]
             )
             return HotelChunker(splitter)
@@ -19,7 +24,7 @@ class DocumentChunkerFactory:
             return ReviewChunker()
         else:
             # Default: use the hotel chunker with a default splitter.
-            splitter = RecursiveCharacterTextSplitter(chunk_size=512, chunk_overlap=50)
+            splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
             return HotelChunker(splitter)
 
 # chunker = DocumentChunkerFactory.create_chunker(DocumentType.HOTEL_INFO)
@@ -1,13 +1,12 @@
 from typing import Optional
 
 from rag.core.interfaces import IDocumentStore, DocumentStoreType
-from rag.data.elasticsearch_doc_store import ElasticsearchDocStore
-from rag.data.faiss_doc_store import FAISSStore
 
 
 class DocumentStoreFactory:
     @staticmethod
-    def create_store(config: Optional[dict] = None, store_type: DocumentStoreType = DocumentStoreType.FAISS) -> IDocumentStore:
+    def create_store(config: Optional[dict] = None, store_type: DocumentStoreType = DocumentStoreType.FAISS,
+                     search_config: Optional[dict] = None, read_only: bool = False) -> IDocumentStore:
         """
         Creates an IDocumentStore instance based on the provided configuration or a direct argument.
 
@@ -17,16 +16,27 @@ class DocumentStoreFactory:
           - If no configuration is provided, the factory defaults to the direct argument (defaulting to FAISS).
 
         This ensures a consistent, predictable behavior and avoids ambiguity between direct arguments and configuration.
+
+        search_config holds the per-document-type search settings (retriever.search).
+
+        read_only opens FAISS indexes for searching only, so the store never publishes or deletes index
+        versions; Elasticsearch stores are always writable.
         """
         if config:
             store_type = DocumentStoreType(config['type'])
 
         store_type = store_type or DocumentStoreType.FAISS
 
+        # Backends are imported on selection, so only the configured one's dependencies are loaded.
         if store_type is DocumentStoreType.FAISS:
-            return FAISSStore(config)
+            from rag.data.faiss_doc_store import FAISSStore
+            return FAISSStore(config, search_config, read_only=read_only)
+        elif store_type is DocumentStoreType.SHARDED_FAISS:
+            from rag.data.sharded_faiss_doc_store import ShardedFAISSStore
+            return ShardedFAISSStore(config, search_config, read_only=read_only)
         elif store_type is DocumentStoreType.ELASTICSEARCH:
-            return ElasticsearchDocStore(config)
+            from rag.data.elasticsearch_doc_store import ElasticsearchDocStore
+            return ElasticsearchDocStore(config, search_config)
         else:
             raise ValueError(f"Unsupported document store: {store_type}")
 
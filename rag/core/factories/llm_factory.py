@@ -1,5 +1,3 @@
-from rag.core.llms.local_deepseek_llm import LocalDeepSeekLLM
-from rag.core.llms.remote_deepseek_llm import RemoteDeepSeekLLM
 from rag.core.interfaces import ILLM
 
 class LLMFactory:
@@ -22,15 +20,19 @@ class LLMFactory:
         max_tokens = config.params.max_tokens
         stream = config.params.stream
 
+        # Clients are imported on selection: both pull in the openai package.
         if provider == "deepseek":
             if mode == "remote":
+                from rag.core.llms.remote_deepseek_llm import RemoteDeepSeekLLM
                 return RemoteDeepSeekLLM(model_name=model, api_key=api_key, temperature=temperature,
                                          max_tokens=max_tokens, stream=stream)
             elif mode == "local":
+                from rag.core.llms.local_deepseek_llm import LocalDeepSeekLLM
                 return LocalDeepSeekLLM(model_name=model, temperature=temperature,
                                         max_tokens=max_tokens, stream=stream)
         elif provider == "openai":
             # Return an OpenAI LLM instance if needed.
+            from rag.core.llms.remote_deepseek_llm import RemoteDeepSeekLLM
             return RemoteDeepSeekLLM(model_name=model, api_key=api_key)  # For demonstration.
         else:
             raise ValueError(f"Unsupported LLM provider: {provider}")
@@ -0,0 +1,29 @@
+from typing import Optional
+
+from rag.core.interfaces import IReranker
+
+
+class RerankerFactory:
+    @staticmethod
+    def create_reranker(config=None) -> Optional[IReranker]:
+        """
+        Creates the cross-encoder reranker described by the `reranker` configuration section.
+
+        Returns:
+            Optional[IReranker]: The reranker, or None when reranking is disabled.
+        """
+        if not config or not config.get("enabled", False):
+            return None
+
+        # Imported here so sentence-transformers is only loaded when reranking is enabled.
+        from rag.core.rerankers.cross_encoder_reranker import CrossEncoderReranker, RerankerBackend
+
+        return CrossEncoderReranker(
+            model_name=config.model,
+            batch_size=config.batch_size,
+            max_length=config.max_length,
+            device=config.device,
+            backend=RerankerBackend(config.backend),
+            quantize=config.quantize,
+            cache_size=config.cache_size
+        )
@@ -1,12 +1,16 @@
-from rag.core.interfaces import IRetriever, DocumentType, RetrieverFrameworkType
-from rag.core.retrievers.lang_chain_retriever import LangChainRetriever
+from typing import Optional
+
+from rag.core.interfaces import IRetriever, DocumentType, RetrieverFrameworkType, RetrievalMode
 
 
 class RetrieverFactory:
     @staticmethod
-    def create_retriever(config=None, document_store=None, doc_type: DocumentType = None) -> IRetriever:
+    def create_retriever(config=None, document_store=None, doc_type: DocumentType = None,
+                         k: Optional[int] = None) -> IRetriever:
         """
         Creates a basic retriever (e.g. LangChainRetriever) based on the provided configuration.
+        `params.mode` selects dense (vector only) or hybrid (vector + BM25, fused with RRF) retrieval.
+        `k` overrides the document type's configured k (retriever.search), e.g. to over-fetch candidates for reranking.
         """
         if config is None:
             raise ValueError("Configuration must be provided to create a retriever.")
@@ -15,10 +19,12 @@ class RetrieverFactory:
 
         framework = RetrieverFrameworkType(config.framework.lower())
         params = config.params
+        mode = RetrievalMode(params.get("mode", RetrievalMode.DENSE.value).lower())
         if framework == RetrieverFrameworkType.LANGCHAIN:
-            base_retriever = document_store.get_retriever(doc_type)
-            return LangChainRetriever(base_retriever,
-                                      params.get("embedding_model", "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"))
+            # Imported on selection, like the document store backends.
+            from rag.core.retrievers.lang_chain_retriever import LangChainRetriever
+            base_retriever = document_store.get_retriever(doc_type, mode=mode, k=k)
+            return LangChainRetriever(base_retriever)
         elif framework == RetrieverFrameworkType.HAYSTACK:
             raise NotImplementedError("HaystackRetriever not implemented.")
         else:
@@ -1,15 +1,19 @@
 from rag.core.interfaces import IScraper
-from rag.core.scrapers.iranHotel.iran_hotel_online_scraper import IranHotelOnlineScraper
-from rag.core.scrapers.snap.snapp_hotel_scraper import SnappTripScraper
 
 class ScraperFactory:
     @staticmethod
     def create_scraper(config) -> IScraper:
         scraper_type = config.type  # Accessing attribute directly
+        # Scrapers are imported on selection, so Selenium is only loaded for SnappTrip.
         if scraper_type == "iranhotelonline":
+            from rag.core.scrapers.iranHotel.iran_hotel_online_scraper import IranHotelOnlineScraper
             return IranHotelOnlineScraper()
         elif scraper_type == "snapptrip":
-            return SnappTripScraper()
+            from rag.core.scrapers.snap.snapp_hotel_scraper import ExtractionMode, SnappTripScraper
+            params = config.params
+            return SnappTripScraper(num_workers=params.get("num_workers", 1),
+                                    headless=params.get("headless", True),
+                                    extraction_mode=ExtractionMode(params.get("extraction_mode", "webdriver")))
         else:
             raise ValueError(f"Unsupported scraper type: {scraper_type}")
 
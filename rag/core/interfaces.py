@@ -1,21 +1,24 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Optional, Dict, Any
+from typing import TYPE_CHECKING, List, Optional, Dict, Any, Iterable, Iterator, Tuple
 
-from langchain_core.retrievers import BaseRetriever
 from pydantic import BaseModel
 
+if TYPE_CHECKING:
+    # Only for annotations: importing LangChain would slow down every entry point.
+    from langchain_core.retrievers import BaseRetriever
+
 
 class DocumentType(Enum):
     HOTEL_INFO = "hotel_info"
     HOTEL_REVIEW = "hotel_review"
 
 
-from enum import Enum
-
 class DocumentStoreType(Enum):
     FAISS = "faiss"
+    SHARDED_FAISS = "sharded_faiss"
     PINECONE = "pinecone"
     ELASTICSEARCH = "elasticsearch"
     MILVUS = "milvus"
@@ -31,12 +34,113 @@ class RetrieverFrameworkType(Enum):
     LANGCHAIN = "langchain"
     HAYSTACK = "haystack"
 
+
+class DistanceMetric(Enum):
+    L2 = "l2"  # Euclidean distance on raw vectors
+    INNER_PRODUCT = "ip"  # Inner product on raw vectors
+    COSINE = "cosine"  # Inner product on unit-length vectors
+
+
+class RetrievalMode(Enum):
+    DENSE = "dense"  # Vector similarity only
+    HYBRID = "hybrid"  # Vector similarity fused with BM25 keyword matching
+
+# Metadata field holding the key of the source document a chunk was cut from (a hotel id, or
+# "<hotel id>_<review id>" for a review). A changed document replaces its chunks by this key.
+DOCUMENT_KEY_FIELD = "document_key"
+
+
 @dataclass
 class Document:
     content: str
     metadata: Optional[Dict[str, Any]] = field(default_factory=dict)
 
 
+class FilterOperator(Enum):
+    EQ = "eq"
+    IN = "in"
+    GT = "gt"
+    GTE = "gte"
+    LT = "lt"
+    LTE = "lte"
+
+
+@dataclass(frozen=True)
+class FieldCondition:
+    """A single condition on one metadata field, e.g. rate >= 4."""
+    field: str
+    operator: FilterOperator
+    value: Any
+
+    def matches_value(self, actual: Any) -> bool:
+        if actual is None:
+            return False
+        if self.operator is FilterOperator.EQ:
+            return actual == self.value
+        if self.operator is FilterOperator.IN:
+            return actual in self.value
+        try:
+            if self.operator is FilterOperator.GT:
+                return actual > self.value
+            if self.operator is FilterOperator.GTE:
+                return actual >= self.value
+            if self.operator is FilterOperator.LT:
+                return actual < self.value
+            if self.operator is FilterOperator.LTE:
+                return actual <= self.value
+        except TypeError:
+            # Values of incomparable types (e.g. a missing rate stored as text) never match a range.
+            return False
+        raise ValueError(f"Unsupported filter operator: {self.operator}")
+
+
+@dataclass(frozen=True)
+class MetadataFilter:
+    """
+    A conjunction of conditions on document metadata, pushed down to the document store.
+
+    Filters are immutable and built fluently, e.g.:
+        MetadataFilter().eq("city_name", "Mashhad").gte("rate", 4).between("arrival_date", "2024-06-21", "2024-09-22")
+    """
+    conditions: Tuple[FieldCondition, ...] = ()
+
+    def where(self, field: str, operator: FilterOperator, value: Any) -> 'MetadataFilter':
+        return MetadataFilter(self.conditions + (FieldCondition(field, operator, value),))
+
+    def eq(self, field: str, value: Any) -> 'MetadataFilter':
+        return self.where(field, FilterOperator.EQ, value)
+
+    def is_in(self, field: str, values: Iterable[Any]) -> 'MetadataFilter':
+        return self.where(field, FilterOperator.IN, tuple(values))
+
+    def gt(self, field: str, value: Any) -> 'MetadataFilter':
+        return self.where(field, FilterOperator.GT, value)
+
+    def gte(self, field: str, value: Any) -> 'MetadataFilter':
+        return self.where(field, FilterOperator.GTE, value)
+
+    def lt(self, field: str, value: Any) -> 'MetadataFilter':
+        return self.where(field, FilterOperator.LT, value)
+
+    def lte(self, field: str, value: Any) -> 'MetadataFilter':
+        return self.where(field, FilterOperator.LTE, value)
+
+    def between(self, field: str, low: Any, high: Any) -> 'MetadataFilter':
+        return self.gte(field, low).lte(field, high)
+
+    def combine(self, other: Optional['MetadataFilter']) -> 'MetadataFilter':
+        """Return a filter requiring the conditions of both filters."""
+        if not other:
+            return self
+        return MetadataFilter(self.conditions + other.conditions)
+
+    def matches(self, metadata: Dict[str, Any]) -> bool:
+        return all(condition.matches_value(metadata.get(condition.field)) for condition in self.conditions)
+
+    def __bool__(self) -> bool:
+        return bool(self.conditions)
+
+
 class IScraper(ABC):
     @abstractmethod
     def scrape(self, url: str) -> List[str]:
@@ -48,9 +152,19 @@ class IScraper(ABC):
     def get_data(self, from_file: str, file_name: str) -> List[str]:
         pass
 
+    def iter_data(self, from_file: bool = True) -> Iterator[Any]:
+        """Yield the scraped records one at a time. Scrapers that can stream their source should override this."""
+        yield from self.get_data(from_file=from_file)
+
 class IRetriever(ABC):
     @abstractmethod
-    def retrieve(self, query: str) -> List[Document]:
+    def retrieve(self, query: str, metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
+        pass
+
+class IReranker(ABC):
+    @abstractmethod
+    def rerank(self, query: str, documents: List[Document], top_k: Optional[int] = None) -> List[Document]:
+        """Reorder the documents by relevance to the query, best first, keeping at most top_k of them."""
         pass
 
 class ILLM(ABC):
@@ -65,23 +179,59 @@ class IDocumentStore(ABC):
         pass
 
 
+    @abstractmethod
+    def delete_documents(self, keys: Iterable[str], doc_type: DocumentType) -> None:
+        """Remove every chunk whose DOCUMENT_KEY_FIELD metadata is one of the given keys."""
+        pass
+
     @abstractmethod
     def clear(self, doc_type: DocumentType) -> None:
         """Clear the FAISS index (in-memory and disk)."""
         pass
 
     @abstractmethod
-    def search(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO) -> List[Document]:
+    def search(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO,
+               metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
+        """Return the k documents most similar to the query, among those matching the metadata filter."""
         pass
 
+    def hybrid_search(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO,
+                      metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
+        """
+        Return the k best documents by vector similarity and keyword (BM25) matching combined.
+        Stores without a keyword index fall back to vector search.
+        """
+        return self.search(query, k=k, doc_type=doc_type, metadata_filter=metadata_filter)
+
     @abstractmethod
-    def get_retriever(self, doc_type: DocumentType) -> BaseRetriever:
+    def get_retriever(self, doc_type: DocumentType, metadata_filter: Optional[MetadataFilter] = None,
+                      mode: RetrievalMode = RetrievalMode.DENSE, k: Optional[int] = None) -> 'BaseRetriever':
         pass
 
     @abstractmethod
     def get_type(self) -> DocumentStoreType:
         pass
 
+    @contextmanager
+    def batch(self, doc_type: DocumentType):
+        """
+        Group the add_documents calls made inside the block for the given document type.
+        The documents are persisted when the block exits and discarded if it raises.
+        """
+        yield self
+
+    def is_stale(self) -> bool:
+        """Whether another store instance, e.g. an ingest in another process, published a newer index."""
+        return False
+
+    def reopen(self) -> 'IDocumentStore':
+        """A store serving the newest published index; stores without versioned indexes return themselves."""
+        return self
+
+    def close(self) -> None:
+        """Release the store's files and connections once it is no longer used."""
+        pass
+
 
 class IDocumentChunker(ABC):
     def chunk_text(self, text: str, metadata: Dict[str, Any] = None) -> List[Document]:
@@ -101,3 +251,26 @@ class IHashStore(ABC):
     @abstractmethod
     def load_hash(self, id: str) -> Optional[str]:
         pass
+
+    def load_hashes(self, ids: Iterable[str]) -> Dict[str, str]:
+        """Load the hashes of several ids at once. Ids without a stored hash are omitted."""
+        hashes = {}
+        for id in ids:
+            hash = self.load_hash(id)
+            if hash is not None:
+                hashes[id] = hash
+        return hashes
+
+    def save_hashes(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        """Save several (id, hash) pairs at once."""
+        for id, hash in pairs:
+            self.save_hash(id, hash)
+
+    @contextmanager
+    def transaction(self):
+        """Group the writes made inside the block into a single commit."""
+        yield self
+
+    def close(self) -> None:
+        """Release any resources held by the store."""
+        pass
@@ -1,7 +1,10 @@
+import time
 from typing import List
 import openai
 from langchain_core.prompts import PromptTemplate
 from rag.core.interfaces import ILLM, Document
+from rag.core.metrics import MetricsExporter
+from rag.core.tracing import current_span, span, traced
 import requests
 
 class LocalDeepSeekLLM(ILLM):
@@ -30,10 +33,14 @@ class LocalDeepSeekLLM(ILLM):
             """
         )
 
+    @traced("llm.generate")
     def generate(self, query: str, context: List[Document]) -> str:
-        # Combine all document texts into a single context string
-        combined_context = "\n\n".join([doc.content for doc in context])
-        prompt = self.prompt_template.format(context=combined_context, query=query)
+        with span("llm.format_prompt"):
+            # Combine all document texts into a single context string
+            combined_context = "\n\n".join([doc.content for doc in context])
+            prompt = self.prompt_template.format(context=combined_context, query=query)
+        current_span().set("documents", len(context))
+        current_span().set("prompt_chars", len(prompt))
 
         # Prepare the payload
         payload = {
@@ -45,13 +52,27 @@ class LocalDeepSeekLLM(ILLM):
         }
 
         # Send the request to Ollama
-        response = requests.post(self.base_add, json=payload)
+        started = time.perf_counter()
+        try:
+            with span("llm.request"):
+                response = requests.post(self.base_add, json=payload)
+        except requests.RequestException:
+            MetricsExporter.observe_llm_request("ollama", time.perf_counter() - started, status="error")
+            raise
 
         # Extract and return the assistant's reply from the response
         # Check if the request was successful
         if response.status_code == 200:
             # Parse the response
             result = response.json()
+            # Ollama reports token counts and the generation time in nanoseconds.
+            eval_duration = result.get("eval_duration")
+            MetricsExporter.observe_llm_request("ollama", time.perf_counter() - started,
+                                                prompt_tokens=result.get("prompt_eval_count"),
+                                                completion_tokens=result.get("eval_count"),
+                                                generation_seconds=eval_duration / 1e9 if eval_duration else None)
             return result["response"]
         else:
+            MetricsExporter.observe_llm_request("ollama", time.perf_counter() - started,
+                                                status=str(response.status_code))
             return f"Error: {response.status_code} - {response.text}"
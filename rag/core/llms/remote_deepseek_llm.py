@@ -1,7 +1,10 @@
+import time
 from typing import List
 import openai
 from langchain_core.prompts import PromptTemplate
 from rag.core.interfaces import ILLM, Document
+from rag.core.metrics import MetricsExporter
+from rag.core.tracing import current_span, span, traced
 
 class RemoteDeepSeekLLM(ILLM):
     def __init__(self, model_name: str = "deepseek-chat", api_key: str = None,
@@ -30,21 +33,35 @@ class RemoteDeepSeekLLM(ILLM):
             """
         )
 
+    @traced("llm.generate")
     def generate(self, query: str, context: List[Document]) -> str:
-        # Combine all document texts into a single context string
-        combined_context = "\n\n".join([doc.content for doc in context])
-        prompt = self.prompt_template.format(context=combined_context, query=query)
+        with span("llm.format_prompt"):
+            # Combine all document texts into a single context string
+            combined_context = "\n\n".join([doc.content for doc in context])
+            prompt = self.prompt_template.format(context=combined_context, query=query)
+        current_span().set("documents", len(context))
+        current_span().set("prompt_chars", len(prompt))
 
         # Make a request to the DeepSeek API using OpenAI's ChatCompletion
-        response = openai.ChatCompletion.create(
-            model=self.model_name,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=self.temperature,
-            max_tokens=self.max_tokens
-        )
+        started = time.perf_counter()
+        try:
+            with span("llm.request"):
+                response = openai.ChatCompletion.create(
+                    model=self.model_name,
+                    messages=[
+                        {"role": "system", "content": "You are a helpful assistant."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens
+                )
+        except Exception:
+            MetricsExporter.observe_llm_request("deepseek", time.perf_counter() - started, status="error")
+            raise
+        usage = getattr(response, "usage", None)
+        MetricsExporter.observe_llm_request("deepseek", time.perf_counter() - started,
+                                            prompt_tokens=getattr(usage, "prompt_tokens", None),
+                                            completion_tokens=getattr(usage, "completion_tokens", None))
 
         # Extract and return the assistant's reply from the response
         return response.choices[0].message['content']
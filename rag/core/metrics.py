@@ -0,0 +1,95 @@
+import logging
+import os
+from typing import Optional
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram, push_to_gateway, start_http_server, \
+    write_to_textfile
+
+# Serving
+QUERIES = Counter("rag_queries", "Queries processed, by outcome.", ["status"])
+QUERY_DURATION = Histogram("rag_query_duration_seconds", "End-to-end time to answer a query.",
+                           buckets=(.05, .1, .25, .5, 1, 2.5, 5, 10, 20, 30, 60, 120))
+RETRIEVED_DOCUMENTS = Counter("rag_retrieved_documents", "Documents retrieved for queries.", ["doc_type"])
+CACHE_REQUESTS = Counter("rag_cache_requests", "Cache lookups, by cache and result (hit or miss).",
+                         ["cache", "result"])
+
+# Query path stages, recorded by the "prometheus" tracing exporter
+STAGE_DURATION = Histogram("rag_stage_duration_seconds", "Time spent in each stage of a request.", ["stage"],
+                           buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60))
+STAGE_DOCUMENTS = Histogram("rag_stage_documents", "Documents returned by each retrieval stage.", ["stage"],
+                            buckets=(0, 1, 2, 5, 10, 20, 50, 100))
+PROMPT_CHARACTERS = Histogram("rag_prompt_characters", "Characters in the prompts sent to the LLM.", ["stage"],
+                              buckets=(500, 1000, 2000, 4000, 8000, 16000, 32000, 64000))
+
+# LLM clients
+LLM_REQUESTS = Counter("rag_llm_requests", "LLM requests, by provider and outcome.", ["provider", "status"])
+LLM_REQUEST_DURATION = Histogram("rag_llm_request_duration_seconds", "Time waiting for the LLM to answer.",
+                                 ["provider"], buckets=(.25, .5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300))
+LLM_TOKENS = Counter("rag_llm_tokens", "Tokens processed by the LLM, by kind (prompt or completion).",
+                     ["provider", "kind"])
+LLM_TOKENS_PER_SECOND = Histogram("rag_llm_tokens_per_second", "Completion tokens generated per second.",
+                                  ["provider"], buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 200, 500))
+
+# Ingestion
+INGEST_RUNS = Counter("rag_ingest_runs", "Ingestion runs, by outcome.", ["status"])
+INGEST_DOCUMENTS = Counter("rag_ingest_documents_embedded", "Chunks embedded and written to the document store.",
+                           ["doc_type"])
+INGEST_UNCHANGED = Counter("rag_ingest_documents_unchanged",
+                           "Documents skipped because the hash store holds their current hash.", ["doc_type"])
+INGEST_LAST_DURATION = Gauge("rag_ingest_last_duration_seconds", "Duration of the last successful ingestion run.")
+INGEST_LAST_SUCCESS = Gauge("rag_ingest_last_success_timestamp_seconds",
+                            "Unix time the last successful ingestion run finished.")
+
+# Scrapers
+SCRAPE_REQUESTS = Counter("rag_scrape_requests", "Scraper HTTP requests, by fetcher and status code "
+                                                 "(\"error\" when no response was received).", ["fetcher", "status"])
+
+
+class MetricsExporter:
+    """Exposes the metrics above: over HTTP for the server, as a textfile or a Pushgateway push for batch runs."""
+
+    @staticmethod
+    def serve(port: int, address: str = "0.0.0.0") -> None:
+        """Serve /metrics on port from a background thread."""
+        start_http_server(port, addr=address)
+        logging.info(f"Serving Prometheus metrics on http://{address}:{port}/metrics")
+
+    @staticmethod
+    def export(textfile_path: Optional[str] = None, pushgateway_url: Optional[str] = None,
+               job: str = "rag_ingest") -> None:
+        """
+        Export the current metrics at the end of a batch run.
+
+        Args:
+            textfile_path (Optional[str]): A .prom file for the node exporter's textfile collector;
+                written atomically.
+            pushgateway_url (Optional[str]): A Prometheus Pushgateway to push the metrics to, grouped under job.
+        """
+        if textfile_path:
+            os.makedirs(os.path.dirname(os.path.abspath(textfile_path)), exist_ok=True)
+            write_to_textfile(textfile_path, REGISTRY)
+            logging.info(f"Wrote metrics to {textfile_path}")
+        if pushgateway_url:
+            try:
+                push_to_gateway(pushgateway_url, job=job, registry=REGISTRY)
+                logging.info(f"Pushed metrics to {pushgateway_url} as job {job}")
+            except OSError as e:
+                logging.error(f"Failed to push metrics to {pushgateway_url}: {e}")
+
+    @staticmethod
+    def observe_llm_request(provider: str, seconds: float, status: str = "ok", prompt_tokens: Optional[int] = None,
+                            completion_tokens: Optional[int] = None,
+                            generation_seconds: Optional[float] = None) -> None:
+        """
+        Record one LLM request. Tokens per second are computed over generation_seconds when the
+        provider reports it (Ollama does), else over the whole request.
+        """
+        LLM_REQUESTS.labels(provider, status).inc()
+        LLM_REQUEST_DURATION.labels(provider).observe(seconds)
+        if prompt_tokens:
+            LLM_TOKENS.labels(provider, "prompt").inc(prompt_tokens)
+        if completion_tokens:
+            LLM_TOKENS.labels(provider, "completion").inc(completion_tokens)
+            elapsed = generation_seconds or seconds
+            if elapsed > 0:
+                LLM_TOKENS_PER_SECOND.labels(provider).observe(completion_tokens / elapsed)
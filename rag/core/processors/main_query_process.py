@@ -1,14 +1,27 @@
 # MainQueryProcess: Processes a query by building a combined retriever and using the LLM.
 
-from rag.core.interfaces import IQueryProcess, IRetriever, ILLM
+from typing import Optional
+
+from rag.core.analyzers.query_analyzer import QueryAnalyzer
+from rag.core.interfaces import IQueryProcess, IRetriever, ILLM, IReranker
+from rag.core.metrics import QUERIES, QUERY_DURATION
 from rag.core.processors.processor import QueryProcessor
 from rag.core.retrievers.combined_retriever import CombinedRetriever
+from rag.core.retrievers.reranking_retriever import RerankingRetriever
 
 
 class MainQueryProcess(IQueryProcess):
-    def __init__(self, hotel_retriever: IRetriever, review_retriever: IRetriever,  llm: ILLM):
+    def __init__(self, hotel_retriever: IRetriever, review_retriever: IRetriever,  llm: ILLM,
+                 query_analyzer: Optional[QueryAnalyzer] = None, reranker: Optional[IReranker] = None,
+                 rerank_top_k: int = 5):
+        # The reranker, when given, keeps only the rerank_top_k most relevant hotel documents. It scores
+        # the hotel documents themselves, before their reviews are appended: a hotel with all of its
+        # reviews would not fit the cross-encoder's input and be scored on a truncated prefix.
+        if reranker is not None:
+            hotel_retriever = RerankingRetriever(hotel_retriever, reranker, rerank_top_k)
         # Combine them into a domain-specific (but optional) retriever.
-        self.combined_retriever = CombinedRetriever(hotel_retriever, review_retriever)
+        # The query analyzer, when given, narrows retrieval to the cities and hotels named in the query.
+        self.combined_retriever = CombinedRetriever(hotel_retriever, review_retriever, query_analyzer)
         # Use the LLM provided by the container.
         self.llm = llm
         # Build a QueryProcessor that depends only on the IRetriever interface.
@@ -18,4 +31,11 @@ class MainQueryProcess(IQueryProcess):
         """
         Processes the query by retrieving relevant documents and generating an answer.
         """
-        return self.query_processor.process(query)
+        try:
+            with QUERY_DURATION.time():
+                response = self.query_processor.process(query)
+        except Exception:
+            QUERIES.labels("error").inc()
+            raise
+        QUERIES.labels("ok").inc()
+        return response
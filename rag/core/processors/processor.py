@@ -1,4 +1,5 @@
 from rag.core.interfaces import IRetriever, ILLM, IQueryProcess
+from rag.core.tracing import traced
 
 
 class QueryProcessor(IQueryProcess):
@@ -6,6 +7,7 @@ class QueryProcessor(IQueryProcess):
         self.retriever = retriever
         self.llm = llm
 
+    @traced("query.process")
     def process(self, query: str) -> str:
         documents = self.retriever.retrieve(query)
         response = self.llm.generate(query, documents)
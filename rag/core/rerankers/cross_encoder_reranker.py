@@ -0,0 +1,131 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from enum import Enum
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rag.core.interfaces import IReranker, Document
+from rag.core.metrics import CACHE_REQUESTS
+from rag.core.tracing import traced
+
+
+class RerankerBackend(str, Enum):
+    TORCH = "torch"  # sentence-transformers CrossEncoder, optionally with dynamic int8 quantization
+    ONNX = "onnx"  # ONNX Runtime through optimum
+
+
+class CrossEncoderReranker(IReranker):
+    """
+    Reranks retrieved documents by scoring each (query, document) pair with a cross-encoder.
+
+    Pairs are scored in batches on the CPU. The PyTorch backend can quantize the linear layers to
+    int8, and the ONNX backend runs the exported model through ONNX Runtime. Scores are cached per
+    (query, document text), so repeated questions and documents shared between queries are not
+    scored twice.
+    """
+
+    def __init__(self, model_name: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1", batch_size: int = 16,
+                 max_length: int = 512, device: str = "cpu", backend: RerankerBackend = RerankerBackend.TORCH,
+                 quantize: bool = True, cache_size: int = 2048):
+        """
+        Args:
+            model_name (str): Hugging Face name of a (multilingual) cross-encoder.
+            batch_size (int): Pairs scored per forward pass.
+            max_length (int): Tokens kept per pair; longer documents are truncated.
+            device (str): Device for the PyTorch backend.
+            backend (RerankerBackend): TORCH or ONNX, or its config value ("torch" or "onnx"); any other
+                value raises a ValueError. ONNX falls back to TORCH when optimum is not installed.
+            quantize (bool): Apply dynamic int8 quantization to the PyTorch model on CPU.
+            cache_size (int): Number of (query, document) scores kept in the LRU cache. 0 disables it.
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.device = device
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.backend = RerankerBackend(backend)
+        if self.backend is RerankerBackend.ONNX:
+            try:
+                self._load_onnx()
+            except ImportError:
+                logging.warning("optimum[onnxruntime] is not installed, using the PyTorch reranker instead.")
+                self.backend = RerankerBackend.TORCH
+        if self.backend is RerankerBackend.TORCH:
+            self._load_torch(quantize)
+        logging.info(f"Loaded cross-encoder {model_name} ({self.backend.value} backend)")
+
+    def _load_torch(self, quantize: bool) -> None:
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(self.model_name, max_length=self.max_length, device=self.device)
+        if quantize and self.device == "cpu":
+            import torch
+            self.model.model = torch.quantization.quantize_dynamic(self.model.model, {torch.nn.Linear},
+                                                                   dtype=torch.qint8)
+
+    def _load_onnx(self) -> None:
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.model = ORTModelForSequenceClassification.from_pretrained(self.model_name, export=True)
+
+    @traced("reranker.rerank", count_result=True)
+    def rerank(self, query: str, documents: List[Document], top_k: Optional[int] = None) -> List[Document]:
+        """
+        Score every document against the query and return them best first, each with its
+        score added to the metadata as `rerank_score`.
+        """
+        if not documents:
+            return []
+        scores = self.score(query, [doc.content for doc in documents])
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [replace(documents[i], metadata={**(documents[i].metadata or {}), "rerank_score": float(scores[i])})
+                for i in order]
+
+    def score(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        """Return the relevance score of each text for the query, using cached scores where available."""
+        scores = np.empty(len(texts), dtype=np.float32)
+        missing = []
+        with self._lock:
+            for i, text in enumerate(texts):
+                cached = self._cache.get((query, text))
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end((query, text))
+                    scores[i] = cached
+
+        CACHE_REQUESTS.labels("rerank_scores", "hit").inc(len(texts) - len(missing))
+        CACHE_REQUESTS.labels("rerank_scores", "miss").inc(len(missing))
+        if missing:
+            new_scores = self._predict([(query, texts[i]) for i in missing])
+            scores[missing] = new_scores
+            if self.cache_size:
+                with self._lock:
+                    for i, value in zip(missing, new_scores):
+                        self._cache[(query, texts[i])] = float(value)
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+        return scores
+
+    def _predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        if self.backend is RerankerBackend.TORCH:
+            return np.asarray(self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False,
+                                                 convert_to_numpy=True), dtype=np.float32).reshape(len(pairs), -1)[:, -1]
+
+        scores = []
+        for start in range(0, len(pairs), self.batch_size):
+            batch = pairs[start:start + self.batch_size]
+            inputs = self.tokenizer([query for query, _ in batch], [text for _, text in batch], padding=True,
+                                    truncation=True, max_length=self.max_length, return_tensors="np")
+            logits = np.asarray(self.model(**inputs).logits)
+            # Single-logit models output a relevance score; two-label models the "relevant" logit last.
+            scores.append(logits[:, -1])
+        return np.concatenate(scores).astype(np.float32)
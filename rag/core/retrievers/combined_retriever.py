@@ -1,16 +1,38 @@
 import logging
-from typing import Dict, Any, List
-from rag.core.interfaces import IRetriever, Document
+from typing import Dict, Any, List, Optional
+from rag.core.analyzers.query_analyzer import QueryAnalyzer
+from rag.core.interfaces import IRetriever, Document, MetadataFilter, DocumentType
+from rag.core.metrics import RETRIEVED_DOCUMENTS
+from rag.core.tracing import span, traced
 
 class CombinedRetriever(IRetriever):
-    def __init__(self, hotel_retriever: IRetriever, review_retriever: IRetriever):
+    def __init__(self, hotel_retriever: IRetriever, review_retriever: IRetriever,
+                 query_analyzer: Optional[QueryAnalyzer] = None):
         self.hotel_retriever = hotel_retriever
         self.review_retriever = review_retriever
+        self.query_analyzer = query_analyzer
 
-    def retrieve(self, query: str) -> List[Document]:
+    @traced("retriever.combined", count_result=True)
+    def retrieve(self, query: str, metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
         logging.info(f"Retrieving documents for query: {query}")
 
-        hotel_docs = self.hotel_retriever.retrieve(query)
+        if metadata_filter is None and self.query_analyzer is not None:
+            with span("query.analyze") as analyze_span:
+                analysis = self.query_analyzer.analyze(query)
+                analyze_span.set("filtered", bool(analysis.metadata_filter))
+            metadata_filter = analysis.metadata_filter
+            if metadata_filter:
+                logging.info(f"Query names cities {analysis.cities} and hotels {analysis.hotel_ids}; filtering on them")
+
+        with span("retriever.hotels") as hotels_span:
+            hotel_docs = self.hotel_retriever.retrieve(query, metadata_filter)
+            if not hotel_docs and metadata_filter:
+                # A detected entity can be a false positive; fall back to searching everything.
+                logging.info("No hotel documents match the detected entities, retrying without a filter")
+                metadata_filter = None
+                hotel_docs = self.hotel_retriever.retrieve(query)
+            hotels_span.set("documents", len(hotel_docs))
+        RETRIEVED_DOCUMENTS.labels(DocumentType.HOTEL_INFO.value).inc(len(hotel_docs))
         logging.info(f"Retrieved {len(hotel_docs)} hotel documents")
         for hotel in hotel_docs:
             hotel_id = hotel.metadata.get('hotel_source_id')
@@ -18,32 +40,36 @@ class CombinedRetriever(IRetriever):
             hotel_city = hotel.metadata.get('city_name')
             logging.info(f"Hotel Document - ID: {hotel_id}, Name: {hotel_name}, City: {hotel_city}")
 
-        review_docs = self.review_retriever.retrieve(query)
+        with span("retriever.reviews") as reviews_span:
+            review_docs = self.review_retriever.retrieve(query, metadata_filter)
+            reviews_span.set("documents", len(review_docs))
+        RETRIEVED_DOCUMENTS.labels(DocumentType.HOTEL_REVIEW.value).inc(len(review_docs))
         logging.info(f"Retrieved {len(review_docs)} review documents")
         for review in review_docs:
             review_id = review.metadata.get('hotel_source_id')
             logging.info(f"Review Document - ID: {review_id}")
 
-        grouped_reviews = {}
-        for doc in review_docs:
-            hotel_id = doc.metadata.get("hotel_source_id")
-            if hotel_id:
-                grouped_reviews.setdefault(hotel_id, []).append(doc.content)
+        with span("retriever.group_reviews"):
+            grouped_reviews = {}
+            for doc in review_docs:
+                hotel_id = doc.metadata.get("hotel_source_id")
+                if hotel_id:
+                    grouped_reviews.setdefault(hotel_id, []).append(doc.content)
 
-        logging.info("Grouped reviews by hotel_source_id")
+            logging.info("Grouped reviews by hotel_source_id")
 
-        combined_docs = []
-        for hotel in hotel_docs:
-            hotel_id = hotel.metadata.get("hotel_source_id")
-            hotel_name = hotel.metadata.get('hotel_name')
-            hotel_city = hotel.metadata.get('city_name')
-            reviews = grouped_reviews.get(hotel_id, [])
-            combined_text = hotel.content
-            if reviews:
-                combined_text += "\n\nReviews:\n" + "\n".join(reviews)
-            combined_doc = Document(content=combined_text, metadata=hotel.metadata)
-            combined_docs.append(combined_doc)
-            logging.info(f"Combined Document - ID: {hotel_id}, Name: {hotel_name}, City: {hotel_city}, Reviews Count: {len(reviews)}")
+            combined_docs = []
+            for hotel in hotel_docs:
+                hotel_id = hotel.metadata.get("hotel_source_id")
+                hotel_name = hotel.metadata.get('hotel_name')
+                hotel_city = hotel.metadata.get('city_name')
+                reviews = grouped_reviews.get(hotel_id, [])
+                combined_text = hotel.content
+                if reviews:
+                    combined_text += "\n\nReviews:\n" + "\n".join(reviews)
+                combined_doc = Document(content=combined_text, metadata=hotel.metadata)
+                combined_docs.append(combined_doc)
+                logging.info(f"Combined Document - ID: {hotel_id}, Name: {hotel_name}, City: {hotel_city}, Reviews Count: {len(reviews)}")
 
         logging.info(f"Created {len(combined_docs)} combined documents")
 
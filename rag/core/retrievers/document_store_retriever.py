@@ -0,0 +1,32 @@
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document as LangChainDocument
+from langchain_core.retrievers import BaseRetriever
+
+from rag.core.interfaces import DocumentType, MetadataFilter, RetrievalMode
+
+
+class DocumentStoreRetriever(BaseRetriever):
+    """
+    LangChain retriever backed by an IDocumentStore's own search, so metadata filters are
+    pushed down to the store instead of being applied to the results afterwards.
+
+    A filter given at construction applies to every query; a filter passed per call
+    (retriever.invoke(query, metadata_filter=...)) is combined with it. In hybrid mode the
+    store's keyword and vector results are fused.
+    """
+    document_store: Any
+    doc_type: DocumentType
+    k: int = 10
+    metadata_filter: Optional[MetadataFilter] = None
+    mode: RetrievalMode = RetrievalMode.DENSE
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                metadata_filter: Optional[MetadataFilter] = None) -> List[LangChainDocument]:
+        combined_filter = metadata_filter
+        if self.metadata_filter:
+            combined_filter = self.metadata_filter.combine(metadata_filter)
+        search = self.document_store.hybrid_search if self.mode is RetrievalMode.HYBRID else self.document_store.search
+        results = search(query, k=self.k, doc_type=self.doc_type, metadata_filter=combined_filter)
+        return [LangChainDocument(page_content=doc.content, metadata=doc.metadata) for doc in results]
@@ -1,5 +1,5 @@
-from typing import List
-from rag.core.interfaces import IRetriever, Document
+from typing import List, Optional
+from rag.core.interfaces import IRetriever, Document, MetadataFilter
 from rag.data.document_store import DocumentStore
 
 
@@ -17,7 +17,7 @@ class HaystackRetriever(IRetriever):
         self.document_store = document_store
         # self.retriever = DenseRetriever(document_store=self.document_store, embedding_model=embedding_model)
 
-    def retrieve(self, query: str) -> List[Document]:
+    def retrieve(self, query: str, metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
         """
         Retrieves relevant documents based on a query using Haystack.
 
@@ -1,15 +1,17 @@
-from typing import List
+from typing import List, Optional
 
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_core.retrievers import BaseRetriever
-from rag.core.interfaces import IRetriever, Document
+from rag.core.interfaces import IRetriever, Document, MetadataFilter
 
 
 class LangChainRetriever(IRetriever):
-    def __init__(self, retriever: BaseRetriever, embedding_model: str = "paraphrase-multilingual-mpnet-base-v2"):
-        self.embeddings = HuggingFaceEmbeddings(model_name=embedding_model)
+    def __init__(self, retriever: BaseRetriever):
+        # The document store embeds the query itself; the retriever needs no embedding model of its own.
         self.retriever = retriever
 
-    def retrieve(self, query: str) -> List[Document]:
-        results = self.retriever.get_relevant_documents(query)
+    def retrieve(self, query: str, metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
+        if metadata_filter:
+            results = self.retriever.invoke(query, metadata_filter=metadata_filter)
+        else:
+            results = self.retriever.get_relevant_documents(query)
         return [Document(content=doc.page_content, metadata=doc.metadata) for doc in results]
@@ -0,0 +1,28 @@
+import logging
+from typing import List, Optional
+
+from rag.core.interfaces import IRetriever, IReranker, Document, MetadataFilter
+from rag.core.tracing import traced
+
+
+class RerankingRetriever(IRetriever):
+    """
+    Reranks the candidates of another retriever and keeps only the best top_k.
+
+    The wrapped retriever should over-fetch (its stores' k set to the number of candidates), so the
+    cross-encoder can promote relevant documents the vector search ranked low, while only top_k
+    documents reach the LLM prompt. It should return single documents (hotel documents, not hotels
+    combined with their reviews), which fit the cross-encoder's max_length and are scored whole.
+    """
+
+    def __init__(self, retriever: IRetriever, reranker: IReranker, top_k: int = 5):
+        self.retriever = retriever
+        self.reranker = reranker
+        self.top_k = top_k
+
+    @traced("retriever.reranking", count_result=True)
+    def retrieve(self, query: str, metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
+        candidates = self.retriever.retrieve(query, metadata_filter)
+        reranked = self.reranker.rerank(query, candidates, top_k=self.top_k)
+        logging.info(f"Reranked {len(candidates)} candidates, keeping {len(reranked)}")
+        return reranked
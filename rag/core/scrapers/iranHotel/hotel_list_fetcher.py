@@ -1,8 +1,14 @@
 import json
 import os
+import time
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+
+from rag.core.metrics import SCRAPE_REQUESTS
 from utils.file_manager import FileManager
+from utils.rate_limiter import RateLimiter
 from utils.path_util import PathUtil
 
 # Set up logging
@@ -11,31 +17,70 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 class HotelListFetcher:
     def __init__(self, base_url="https://www.iranhotelonline.com/api/mvc/hotelInfo/suggest?query=",
                  city_base_url="https://www.iranhotelonline.com/api/mvc/v1/search/filter",
-                 letter_limit=30, city_limit=200):
+                 letter_limit=30, city_limit=200, city_page_size=200, max_city_pages=50,
+                 max_workers=8, requests_per_second=10.0, request_timeout=30, page_retries=3, retry_backoff=1.0):
         self.base_url = base_url
         self.city_base_url = city_base_url
         self.persian_alphabet = "ا ب پ ت ث ج چ ح خ د ذ ر ز س ش ص ض ط ظ ع غ ف ق ک گ ل م ن و ه ی".split()
         self.letter_limit = letter_limit
         self.city_limit = city_limit
+        self.city_page_size = city_page_size
+        self.max_city_pages = max_city_pages
+        self.max_workers = max_workers
+        self.request_timeout = request_timeout
+        # Attempts per city page after the first one, waiting retry_backoff * 2**attempt seconds in between.
+        self.page_retries = page_retries
+        self.retry_backoff = retry_backoff
+        # One limiter shared by the letter and city fan-outs keeps the total request rate bounded.
+        self.rate_limiter = RateLimiter(requests_per_second)
+        # A pooled keep-alive session sized for the worker threads.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.hotel_records = []
 
     def fetch_hotels_by_letter(self, letter):
         logging.info(f"Fetching hotels starting with letter: {letter}")
-        response = requests.get(self.base_url + letter)
+        response = self._get(self.base_url + letter)
         if response.status_code == 200:
             return response.json()
         else:
             logging.warning(f"Failed to fetch hotels for letter {letter}. Status code: {response.status_code}")
             return []
 
+    def _get(self, url, params=None):
+        """A rate-limited GET on the pooled session, counted per status code."""
+        self.rate_limiter.acquire()
+        try:
+            response = self.session.get(url, params=params, timeout=self.request_timeout)
+        except requests.RequestException:
+            SCRAPE_REQUESTS.labels("hotel_list", "error").inc()
+            raise
+        SCRAPE_REQUESTS.labels("hotel_list", str(response.status_code)).inc()
+        return response
+
     def fetch_all_hotels(self):
+        """
+        Fetches the suggestion list for every letter concurrently and de-duplicates
+        the hotels by 'id' as each letter's results arrive.
+        """
         logging.info("Fetching all hotels")
+        letters = self.persian_alphabet[:self.letter_limit]
+        seen_ids = set()
         all_hotels = []
-        for i, letter in enumerate(self.persian_alphabet):
-            if i >= self.letter_limit:
-                break
-            hotels = self.fetch_hotels_by_letter(letter)
-            all_hotels.extend(hotels)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.fetch_hotels_by_letter, letter): letter for letter in letters}
+            for future in as_completed(futures):
+                try:
+                    hotels = future.result()
+                except requests.RequestException as e:
+                    logging.warning(f"Failed to fetch hotels for letter {futures[future]}: {e}")
+                    continue
+                for hotel in hotels:
+                    if hotel['id'] not in seen_ids:
+                        seen_ids.add(hotel['id'])
+                        all_hotels.append(hotel)
         logging.info(f"Finished fetching all hotels. all fetched hotels count is {len(all_hotels)}")
         return all_hotels
 
@@ -58,36 +103,78 @@ class HotelListFetcher:
         logging.debug(f"Extracted city name: {city_name}")
         return hotel
 
+    @staticmethod
+    def _card_to_record(card):
+        card_data = card.get('CardData', {})
+        return {
+            "HotelName": card_data.get('HotelName'),
+            "hotel_url": card_data.get('HotelUrl'),
+            "CityName": card_data.get('CityName'),
+            "CityEnName": card_data.get('CityEnName'),
+            "Id": card_data.get('Id')
+        }
+
+    def _get_city_page(self, city_name, page_index):
+        """
+        Fetches one page of a city's hotel cards, retrying failed requests with exponential backoff.
+        Raises requests.HTTPError (or the last connection error) once the retries are exhausted.
+        """
+        params = {
+            "ReferUrl": "home",
+            "PageIndex": page_index,
+            "PageSize": self.city_page_size,
+            "isFirstRequest": "true" if page_index == 0 else "false",
+            "CityName": city_name
+        }
+        for attempt in range(self.page_retries + 1):
+            try:
+                response = self._get(self.city_base_url, params=params)
+                response.raise_for_status()
+                return response.json().get('Cards', [])
+            except requests.RequestException as e:
+                if attempt == self.page_retries:
+                    raise
+                logging.warning(f"Failed to fetch city {city_name} page {page_index} ({e}); "
+                                f"retrying ({attempt + 1}/{self.page_retries})")
+                time.sleep(self.retry_backoff * 2 ** attempt)
+
+    def fetch_city_hotels(self, city_name):
+        """
+        Fetches every hotel card of a city, following pagination until a short or empty page is returned.
+        A page that still fails after its retries fails the whole city rather than returning part of it.
+        """
+        records = []
+        pages = 0
+        while pages < self.max_city_pages:
+            cards = self._get_city_page(city_name, pages)
+            pages += 1
+            records.extend(self._card_to_record(card) for card in cards)
+            if len(cards) < self.city_page_size:
+                break
+        logging.info(f"Fetched {len(records)} hotels for city {city_name} in {pages} page(s)")
+        return records
+
     def fetch_hotel_details_for_cities(self, hotels):
+        """
+        Fetches the hotel cards of every distinct city concurrently. Records are de-duplicated
+        by 'Id' as each city's results arrive.
+        """
         logging.info("Fetching hotel details for cities")
+        cities = list(dict.fromkeys(hotel['city'] for hotel in hotels[:self.city_limit]))
+        seen_ids = set()
         hotel_records = []
-        for i, hotel in enumerate(hotels):
-            if i >= self.city_limit:
-                break
-            city_name = hotel['city']
-            params = {
-                "ReferUrl": "home",
-                "PageIndex": 0,
-                "PageSize": 200,
-                "isFirstRequest": "true",
-                "CityName": city_name
-            }
-            response = requests.get(self.city_base_url, params=params)
-            if response.status_code == 200:
-                hotel_details = response.json()
-                cards = hotel_details.get('Cards', [])
-                for card in cards:
-                    card_data = card.get('CardData', {})
-                    record = {
-                        "HotelName": card_data.get('HotelName'),
-                        "hotel_url": card_data.get('HotelUrl'),
-                        "CityName": card_data.get('CityName'),
-                        "CityEnName": card_data.get('CityEnName'),
-                        "Id": card_data.get('Id')
-                    }
-                    hotel_records.append(record)
-            else:
-                logging.warning(f"Failed to fetch details for city {city_name}. Status code: {response.status_code}")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.fetch_city_hotels, city_name): city_name for city_name in cities}
+            for future in as_completed(futures):
+                try:
+                    records = future.result()
+                except requests.RequestException as e:
+                    logging.warning(f"Failed to fetch details for city {futures[future]}: {e}")
+                    continue
+                for record in records:
+                    if record['Id'] not in seen_ids:
+                        seen_ids.add(record['Id'])
+                        hotel_records.append(record)
         logging.info(f"Finished fetching hotel details. Records count: {len(hotel_records)}")
         return hotel_records
 
@@ -124,8 +211,7 @@ class HotelListFetcher:
 
     def run(self):
         logging.info("Starting hotel list fetching process")
-        all_hotels = self.fetch_all_hotels()
-        unique_hotels = self.remove_duplicates(all_hotels)
+        unique_hotels = self.fetch_all_hotels()
         hotels_with_city = [self.extract_city_name(hotel) for hotel in unique_hotels]
         self.hotel_records = self.fetch_hotel_details_for_cities(hotels_with_city)
         updated_fetched_date = self.save_info()
@@ -3,6 +3,7 @@ import logging
 import os
 import requests
 
+from rag.core.metrics import SCRAPE_REQUESTS
 from utils.file_manager import FileManager
 from utils.path_util import PathUtil
 
@@ -28,7 +29,12 @@ class HotelVoteFetcher:
         """
         url = f"{self.base_url}?hotelId={hotel_id}&pageIndex={page_index}&pageSize={page_size}"
         logging.info(f"Fetching votes for hotel {hotel_id}, page {page_index}")
-        response = requests.get(url)
+        try:
+            response = requests.get(url)
+        except requests.RequestException:
+            SCRAPE_REQUESTS.labels("hotel_votes", "error").inc()
+            raise
+        SCRAPE_REQUESTS.labels("hotel_votes", str(response.status_code)).inc()
         if response.status_code == 200:
             return response.json()
         else:
@@ -5,6 +5,7 @@ from datetime import datetime
 import requests
 
 from rag.core.interfaces import IScraper
+from rag.core.metrics import SCRAPE_REQUESTS
 from rag.core.scrapers.iranHotel.hotel_list_fetcher import HotelListFetcher
 import re
 
@@ -63,7 +64,12 @@ class IranHotelOnlineScraper(IScraper):
 
         for url in urls:
             logging.info(f"Scraping hotel data from: {url}")
-            response = requests.get(url)
+            try:
+                response = requests.get(url)
+            except requests.RequestException:
+                SCRAPE_REQUESTS.labels("hotel_summary", "error").inc()
+                raise
+            SCRAPE_REQUESTS.labels("hotel_summary", str(response.status_code)).inc()
 
             if response.status_code != 200:
                 logging.warning(f"Failed to retrieve data from {url}. Skipping...")
@@ -165,6 +171,17 @@ class IranHotelOnlineScraper(IScraper):
             hotel_info_records = self.hotel_info_list
         return hotel_info_records
 
+    def iter_data(self, from_file=True, file_name='hotels_info.json'):
+        """
+        Yields hotel records one at a time. When reading from file, records are decoded
+        incrementally so the whole file is never held in memory.
+        """
+        if from_file:
+            file_path = PathUtil.construct_path(PathUtil.get_project_base_path(), 'data', 'hotel', file_name)
+            yield from FileManager(file_path).iter_records()
+        else:
+            yield from self.get_data(from_file=False)
+
     def is_duplicate_entry(self, filename, metadata) -> bool:
         """
         Checks if a record with the same hotel_source_id or (hotel_name and city_name) exists.
@@ -1,70 +1,125 @@
 import json
 import logging
 import os
+import threading
+from enum import Enum
+from queue import Queue, Empty
 from typing import List
 
 from selenium import webdriver
-from selenium.common import NoSuchElementException
+from selenium.common import NoSuchElementException, TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
-import time
 
 from rag.core.interfaces import IScraper
+from rag.core.scrapers.snap.snapp_review_parser import SnappReviewParser
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Resources that are never read by the scraper but dominate page weight.
+BLOCKED_RESOURCE_PATTERNS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg",
+                             "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"]
+
+REVIEW_SELECTOR = ".shadow-1.bg-dim-background.flex.w-full.flex-col.gap-4.overflow-hidden.rounded-xl.p-4.xl\\:p-6"
+REVIEWS_CONTAINER_SELECTOR = ".flex.w-full.flex-col.gap-6.md\\:self-start"
+
+
+class ExtractionMode(str, Enum):
+    WEBDRIVER = "webdriver"  # Query every review field through WebDriver calls.
+    HTML = "html"  # Read page_source once per hotel page and parse reviews in-process.
+
+
 class SnappTripScraper(IScraper):
 
-    def __init__(self):
-        self.driver = self._init_webdriver()
+    def __init__(self, num_workers: int = 1, headless: bool = True, wait_timeout: int = 10,
+                 scroll_timeout: int = 5, city_name: str = "هتل های تهران", driver_factory=None,
+                 extraction_mode: ExtractionMode = ExtractionMode.WEBDRIVER):
+        """
+        Args:
+            num_workers (int): Number of WebDriver instances scraping hotel pages in parallel.
+            headless (bool): Run Chrome without a visible window.
+            wait_timeout (int): Seconds to wait for an element to appear before giving up.
+            scroll_timeout (int): Seconds to wait for more content after a scroll before assuming the end.
+            city_name (str): Popular-city label whose hotels are scraped.
+            driver_factory (callable): Optional zero-argument callable returning a WebDriver.
+                Defaults to a Chrome driver; can be replaced to point the scraper at local fixtures.
+            extraction_mode (ExtractionMode): WEBDRIVER to extract each review through WebDriver calls,
+                or HTML to parse all reviews of a page from a single page_source snapshot. A config
+                value ("webdriver" or "html") is accepted too; any other value raises a ValueError.
+        """
+        self.num_workers = max(1, num_workers)
+        self.headless = headless
+        self.wait_timeout = wait_timeout
+        self.scroll_timeout = scroll_timeout
+        self.user_selected_city = city_name
+        self.extraction_mode = ExtractionMode(extraction_mode)
+        self.driver_factory = driver_factory or self._init_webdriver
+        self.driver = None
         self.all_reviews = []
+        self._reviews_lock = threading.Lock()
+        self._driver_path = None
+        self._driver_path_lock = threading.Lock()
+
+    def _get_driver_path(self):
+        # Resolve the chromedriver binary once instead of once per worker.
+        with self._driver_path_lock:
+            if self._driver_path is None:
+                self._driver_path = ChromeDriverManager().install()
+            return self._driver_path
 
     def _init_webdriver(self):
         chrome_options = Options()
-        # chrome_options.add_argument("--headless")  # Run browser in headless mode
+        if self.headless:
+            chrome_options.add_argument("--headless=new")
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--no-sandbox")
-        return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        driver = webdriver.Chrome(service=Service(self._get_driver_path()), options=chrome_options)
+        # Images are disabled above; fonts and remaining media are blocked at the network layer.
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_RESOURCE_PATTERNS})
+        return driver
 
     def _get_review_data(self, review):
         """Extracts the relevant information from a single review."""
         try:
             name = review.find_element(By.XPATH,
-                                       ".//div[contains(@class, 'text-caption') and contains(@class, 'xl:text-subtitle-2')]").content.strip()
-            date = review.find_element(By.CLASS_NAME, 'text-on-surface-medium-emphasis').content.strip()
+                                       ".//div[contains(@class, 'text-caption') and contains(@class, 'xl:text-subtitle-2')]").text.strip()
+            date = review.find_element(By.CLASS_NAME, 'text-on-surface-medium-emphasis').text.strip()
             emoji = review.find_element(By.TAG_NAME, 'img').get_attribute('src')  # URL of the emoji image
 
             try:
                 rating = review.find_element(By.XPATH,
-                                             ".//span[contains(@class, 'mini-chips_text__xuhB9') and (contains(text(), '۱') or contains(text(), '۲') or contains(text(), '۳') or contains(text(), '۴') or contains(text(), '۵'))]").content.strip()
+                                             ".//span[contains(@class, 'mini-chips_text__xuhB9') and (contains(text(), '۱') or contains(text(), '۲') or contains(text(), '۳') or contains(text(), '۴') or contains(text(), '۵'))]").text.strip()
             except:
                 rating = "No rating found"
 
             try:
                 room_type = review.find_element(By.XPATH,
-                                                ".//span[contains(@class, 'mini-chips_text__xuhB9') and not(contains(text(), '۱')) and not(contains(text(), '۲')) and not(contains(text(), '۳')) and not(contains(text(), '۴')) and not(contains(text(), '۵'))]").content.strip()
+                                                ".//span[contains(@class, 'mini-chips_text__xuhB9') and not(contains(text(), '۱')) and not(contains(text(), '۲')) and not(contains(text(), '۳')) and not(contains(text(), '۴')) and not(contains(text(), '۵'))]").text.strip()
             except:
                 room_type = "No room type found"
 
             try:
                 main_text = review.find_element(By.XPATH,
-                                                ".//div[@class='text-caption xl:text-body-2' and not(contains(@class, 'flex'))]").content.strip()
+                                                ".//div[@class='text-caption xl:text-body-2' and not(contains(@class, 'flex'))]").text.strip()
             except:
                 main_text = "No main text found"
 
             positive_viewpoints = [
-                p.find_element(By.XPATH, "./div[2]").content.strip()
+                p.find_element(By.XPATH, "./div[2]").text.strip()
                 for p in review.find_elements(By.XPATH,
                                               ".//div[contains(@class, 'text-caption xl:text-body-2 flex') and .//span[contains(@class, 'text-ventures-snapp')]]")
             ]
 
             negative_viewpoints = [
-                n.find_element(By.XPATH, "./div[2]").content.strip()
+                n.find_element(By.XPATH, "./div[2]").text.strip()
                 for n in review.find_elements(By.XPATH,
                                               ".//div[contains(@class, 'text-caption xl:text-body-2 flex') and .//span[contains(@class, 'text-error')]]")
             ]
@@ -88,7 +143,7 @@ class SnappTripScraper(IScraper):
         logging.info("Navigating to base URL...")
         self.driver.get(self.base_url)
 
-        WebDriverWait(self.driver, 10).until(
+        WebDriverWait(self.driver, self.wait_timeout).until(
             EC.presence_of_element_located(
                 (By.CSS_SELECTOR, "section.popular-cities_list__HtD_z section.keen-slider.size-full"))
         )
@@ -117,7 +172,7 @@ class SnappTripScraper(IScraper):
     def _extract_hotels_from_city_page(self):
         """Extracts hotels from the city page."""
         logging.info(f"Extracting hotels from city page...")
-        WebDriverWait(self.driver, 10).until(
+        WebDriverWait(self.driver, self.wait_timeout).until(
             EC.presence_of_element_located(
                 (By.CSS_SELECTOR, "section.flex.w-full.flex-col.items-center.gap-4.lg\\:gap-6"))
         )
@@ -146,7 +201,7 @@ class SnappTripScraper(IScraper):
     def scrape(self, base_url):
         """Main method to scrape reviews."""
         self.base_url = base_url
-        self.user_selected_city = "هتل های تهران"
+        self.driver = self.driver_factory()
 
         try:
             cities = self._extract_popular_hotel_cities()
@@ -155,54 +210,104 @@ class SnappTripScraper(IScraper):
             self._scroll_to_load_all()  # Scroll to load all hotels
 
             hotels = self._extract_hotels_from_city_page()
-            hotels = self.remove_saved_hotels(filename='tehran_hotel_reviews.json', hotels=hotels)
-            for hotel_name, hotel_url in hotels.items():
-                logging.info(f"Scraping reviews for hotel: {hotel_name}")
-                self.driver.get(hotel_url)
-
-                WebDriverWait(self.driver, 20).until(
-                    EC.presence_of_element_located((By.XPATH, "//span[text()='همه نظرات']"))
-                ).find_element(By.XPATH, "./ancestor::button").click()
-
-                logging.info(f"Clicked on all reviews button for hotel: {hotel_name}")
-                time.sleep(3)
-                parent_div = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, ".flex.w-full.flex-col.gap-6.md\\:self-start"))
-                )
-
-                reviews_list = []
-                last_review_count = 0
-                while True:
-                    reviews = parent_div.find_elements(By.CSS_SELECTOR,
-                                                       ".shadow-1.bg-dim-background.flex.w-full.flex-col.gap-4.overflow-hidden.rounded-xl.p-4.xl\\:p-6")
-
-                    if len(reviews) == last_review_count:
-                        break
+        finally:
+            logging.info("Closing WebDriver.")
+            self.driver.quit()
+            self.driver = None
+
+        hotels = self.remove_saved_hotels(filename='tehran_hotel_reviews.json', hotels=hotels)
+        self._scrape_hotels(hotels)
+        return self.all_reviews
+
+    def _scrape_hotels(self, hotels: dict) -> None:
+        """Scrapes the given hotels with a pool of WebDriver workers sharing one queue of hotel pages."""
+        hotel_queue = Queue()
+        for hotel_name, hotel_url in hotels.items():
+            hotel_queue.put((hotel_name, hotel_url))
+
+        workers = [
+            threading.Thread(target=self._worker, args=(hotel_queue,), name=f"snapp-worker-{i}", daemon=True)
+            for i in range(min(self.num_workers, len(hotels)))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    def _worker(self, hotel_queue: Queue) -> None:
+        driver = self.driver_factory()
+        try:
+            while True:
+                try:
+                    hotel_name, hotel_url = hotel_queue.get_nowait()
+                except Empty:
+                    return
+                try:
+                    hotel_record = self._scrape_hotel(driver, hotel_name, hotel_url)
+                    with self._reviews_lock:
+                        self.all_reviews.append(hotel_record)
+                except Exception as e:
+                    logging.error(f"Error scraping hotel {hotel_name}: {e}")
+                finally:
+                    hotel_queue.task_done()
+        finally:
+            driver.quit()
 
-                    last_review_count = len(reviews)
+    def _scrape_hotel(self, driver, hotel_name: str, hotel_url: str) -> dict:
+        """Opens a hotel page, expands all reviews and extracts them while scrolling."""
+        logging.info(f"Scraping reviews for hotel: {hotel_name}")
+        driver.get(hotel_url)
 
-                    for review in reviews:
-                        review_data = self._get_review_data(review)
-                        if review_data not in reviews_list:
-                            reviews_list.append(review_data)
-                            logging.info(f"Extracted review: {review_data}")
+        WebDriverWait(driver, self.wait_timeout * 2).until(
+            EC.element_to_be_clickable((By.XPATH, "//span[text()='همه نظرات']/ancestor::button"))
+        ).click()
+        logging.info(f"Clicked on all reviews button for hotel: {hotel_name}")
 
-                    self.driver.execute_script("arguments[0].scrollIntoView();", reviews[-1])
-                    logging.info(f"Scroll down for hotel: {hotel_name}")
-                    time.sleep(3)
+        parent_div = WebDriverWait(driver, self.wait_timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, REVIEWS_CONTAINER_SELECTOR))
+        )
+        try:
+            WebDriverWait(driver, self.wait_timeout).until(
+                lambda d: parent_div.find_elements(By.CSS_SELECTOR, REVIEW_SELECTOR)
+            )
+        except TimeoutException:
+            logging.info(f"No reviews found for hotel: {hotel_name}")
+
+        reviews_list = []
+        processed_count = 0
+        while True:
+            reviews = parent_div.find_elements(By.CSS_SELECTOR, REVIEW_SELECTOR)
+            if len(reviews) == processed_count:
+                break
 
-                hotel_record = {
-                    "hotel_name": hotel_name,
-                    "hotel_city": self.user_selected_city,
-                    "reviews": reviews_list
-                }
-                self.all_reviews.append(hotel_record)
+            if self.extraction_mode is ExtractionMode.WEBDRIVER:
+                # Only the reviews appended by the last scroll need to be extracted.
+                for review in reviews[processed_count:]:
+                    review_data = self._get_review_data(review)
+                    if review_data:
+                        reviews_list.append(review_data)
+                        logging.info(f"Extracted review: {review_data}")
+            processed_count = len(reviews)
+
+            driver.execute_script("arguments[0].scrollIntoView();", reviews[-1])
+            logging.info(f"Scroll down for hotel: {hotel_name}")
+            try:
+                WebDriverWait(driver, self.scroll_timeout).until(
+                    lambda d: len(parent_div.find_elements(By.CSS_SELECTOR, REVIEW_SELECTOR)) > processed_count
+                )
+            except TimeoutException:
+                break
 
-            return self.all_reviews
+        if self.extraction_mode is ExtractionMode.HTML:
+            # Every review is loaded now; one page_source call replaces per-review WebDriver round-trips.
+            reviews_list = SnappReviewParser.parse_reviews(driver.page_source)
+            logging.info(f"Extracted {len(reviews_list)} reviews for hotel: {hotel_name}")
 
-        finally:
-            logging.info("Closing WebDriver.")
-            self.driver.quit()
+        return {
+            "hotel_name": hotel_name,
+            "hotel_city": self.user_selected_city,
+            "reviews": reviews_list
+        }
 
     def save_reviews(self, filename='tehran_hotel_reviews.json'):
         logging.info(f"Saving reviews to {filename}...")
@@ -235,11 +340,13 @@ class SnappTripScraper(IScraper):
         last_height = self.driver.execute_script("return document.body.scrollHeight")
         while True:
             self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(3)
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
+            try:
+                WebDriverWait(self.driver, self.scroll_timeout).until(
+                    lambda d: d.execute_script("return document.body.scrollHeight") > last_height
+                )
+            except TimeoutException:
                 break
-            last_height = new_height
+            last_height = self.driver.execute_script("return document.body.scrollHeight")
 
         logging.info("Finished scrolling to load all items.")
 
@@ -266,7 +373,6 @@ class SnappTripScraper(IScraper):
 # Example usage
 if __name__ == "__main__":
     import sys
-    import threading
 
     # Create a stop flag
     stop_flag = threading.Event()
@@ -0,0 +1,83 @@
+import logging
+from typing import List
+
+from lxml import html
+
+
+def _has_classes(*classes: str) -> str:
+    """Builds an XPath predicate matching elements whose class attribute contains every given class token."""
+    return " and ".join(
+        f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')" for cls in classes
+    )
+
+
+PERSIAN_RATING_DIGITS = ("۱", "۲", "۳", "۴", "۵")
+_RATING_TEXT = " or ".join(f"contains(text(), '{digit}')" for digit in PERSIAN_RATING_DIGITS)
+
+# Same elements as REVIEWS_CONTAINER_SELECTOR and REVIEW_SELECTOR in snapp_hotel_scraper; review-styled cards
+# elsewhere on the page (e.g. the featured reviews next to the hotel summary) are not part of the list.
+REVIEWS_CONTAINER_XPATH = "//*[" + _has_classes("flex", "w-full", "flex-col", "gap-6", "md:self-start") + "]"
+REVIEW_XPATH = REVIEWS_CONTAINER_XPATH + "//*[" + _has_classes("shadow-1", "bg-dim-background", "flex", "w-full",
+                                                               "flex-col", "gap-4", "overflow-hidden", "rounded-xl",
+                                                               "p-4", "xl:p-6") + "]"
+NAME_XPATH = ".//div[contains(@class, 'text-caption') and contains(@class, 'xl:text-subtitle-2')]"
+DATE_XPATH = ".//*[" + _has_classes("text-on-surface-medium-emphasis") + "]"
+RATING_XPATH = f".//span[contains(@class, 'mini-chips_text__xuhB9') and ({_RATING_TEXT})]"
+ROOM_TYPE_XPATH = f".//span[contains(@class, 'mini-chips_text__xuhB9') and not({_RATING_TEXT})]"
+MAIN_TEXT_XPATH = ".//div[@class='text-caption xl:text-body-2' and not(contains(@class, 'flex'))]"
+POSITIVE_XPATH = (".//div[contains(@class, 'text-caption xl:text-body-2 flex') "
+                  "and .//span[contains(@class, 'text-ventures-snapp')]]/div[2]")
+NEGATIVE_XPATH = (".//div[contains(@class, 'text-caption xl:text-body-2 flex') "
+                  "and .//span[contains(@class, 'text-error')]]/div[2]")
+
+
+class SnappReviewParser:
+    """
+    Parses SnappTrip reviews from a page's HTML in-process.
+
+    The browser is asked for `page_source` once per hotel page and every review is
+    extracted with lxml, instead of issuing several WebDriver round-trips per review.
+    Produces the same record shape as `SnappTripScraper._get_review_data`.
+    """
+
+    @staticmethod
+    def parse_reviews(page_source: str) -> List[dict]:
+        if not page_source:
+            return []
+        tree = html.fromstring(page_source)
+        reviews = []
+        for review in tree.xpath(REVIEW_XPATH):
+            review_data = SnappReviewParser.parse_review(review)
+            if review_data:
+                reviews.append(review_data)
+        return reviews
+
+    @staticmethod
+    def parse_review(review) -> dict:
+        """Extracts the relevant information from a single review element."""
+        try:
+            name = SnappReviewParser._first_text(review, NAME_XPATH)
+            date = SnappReviewParser._first_text(review, DATE_XPATH)
+            images = review.xpath(".//img/@src")
+            if name is None or date is None or not images:
+                logging.error("Error extracting review data: required review fields are missing")
+                return {}
+
+            return {
+                "name": name,
+                "date": date,
+                "emoji": images[0],  # URL of the emoji image
+                "rating": SnappReviewParser._first_text(review, RATING_XPATH) or "No rating found",
+                "room_type": SnappReviewParser._first_text(review, ROOM_TYPE_XPATH) or "No room type found",
+                "main_text": SnappReviewParser._first_text(review, MAIN_TEXT_XPATH) or "No main text found",
+                "positive_viewpoints": [el.text_content().strip() for el in review.xpath(POSITIVE_XPATH)],
+                "negative_viewpoints": [el.text_content().strip() for el in review.xpath(NEGATIVE_XPATH)]
+            }
+        except Exception as e:
+            logging.error(f"Error extracting review data: {e}")
+            return {}
+
+    @staticmethod
+    def _first_text(element, xpath: str):
+        matches = element.xpath(xpath)
+        return matches[0].text_content().strip() if matches else None
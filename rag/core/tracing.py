@@ -0,0 +1,246 @@
+import functools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Span:
+    """
+    One timed stage of a request, e.g. "store.search", with attributes such as the number of
+    documents it returned. Spans opened while another span is active on the same thread become
+    its children, so a finished request is a tree rooted at its outermost span.
+    """
+    __slots__ = ("name", "attributes", "children", "start", "duration", "_tracer", "_parent", "_started")
+
+    def __init__(self, tracer: 'Tracer', name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.children: List['Span'] = []
+        self.start = 0.0  # time.time() when the span started
+        self.duration = 0.0  # seconds
+        self._tracer = tracer
+        self._parent: Optional['Span'] = None
+        self._started = 0.0
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> 'Span':
+        local = self._tracer._local
+        self._parent = getattr(local, "span", None)
+        local.span = self
+        self.start = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.duration = time.perf_counter() - self._started
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self._tracer._local.span = self._parent
+        if self._parent is not None:
+            self._parent.children.append(self)
+        else:
+            self._tracer._export(self)
+        return False
+
+    def walk(self):
+        """Yield this span and all its descendants, depth first."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+class _NoopSpan:
+    """The span handed out while tracing is disabled: entering, leaving and setting do nothing."""
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> '_NoopSpan':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Times the stages of the query path (and any other code) as nested spans and hands every finished
+    request, i.e. every finished outermost span, to the configured exporters.
+
+    Disabled, span() returns a shared no-op span and traced functions call straight through after a
+    single flag check, so the instrumentation can stay in place in production code.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.exporters: List[Callable[[Span], None]] = []
+        self._local = threading.local()
+
+    def configure(self, enabled: bool = False, exporters: Optional[List[str]] = None,
+                  slow_query_seconds: Optional[float] = None) -> None:
+        """
+        Enable or disable tracing and replace the exporters.
+
+        Args:
+            enabled (bool): Record spans at all.
+            exporters (Optional[List[str]]): "log", "prometheus" and/or "opentelemetry"; "log" by default.
+            slow_query_seconds (Optional[float]): With the "log" exporter, requests at least this slow
+                are logged at WARNING with their per-stage breakdown (all others at DEBUG).
+        """
+        self.exporters = [self._create_exporter(name, slow_query_seconds) for name in (exporters or ["log"])] \
+            if enabled else []
+        self.enabled = enabled
+        logging.info(f"Tracing {'enabled with exporters ' + str(exporters or ['log']) if enabled else 'disabled'}")
+
+    @staticmethod
+    def _create_exporter(name: str, slow_query_seconds: Optional[float]) -> Callable[[Span], None]:
+        if name == "log":
+            return LoggingExporter(slow_query_seconds)
+        if name == "prometheus":
+            return PrometheusExporter()
+        if name == "opentelemetry":
+            return OpenTelemetryExporter()
+        raise ValueError(f"Unsupported tracing exporter: {name}")
+
+    def span(self, name: str, **attributes) -> Span:
+        """A context manager timing the enclosed block as a span named name."""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def current_span(self):
+        """The innermost open span of this thread, to add attributes to; a no-op span when there is none."""
+        return getattr(self._local, "span", None) or NOOP_SPAN
+
+    def in_current_span(self, function: Callable) -> Callable:
+        """
+        Wrap function so the spans it opens on another thread, e.g. a thread pool worker, become children
+        of the span that is current on this thread now, instead of the roots of separate requests.
+        """
+        parent = getattr(self._local, "span", None)
+        if not self.enabled or parent is None:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            previous = getattr(self._local, "span", None)
+            self._local.span = parent
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._local.span = previous
+        return wrapper
+
+    def traced(self, name: str, count_result: bool = False):
+        """
+        Decorator timing every call of the function as a span named name.
+
+        Args:
+            name (str): The span name, e.g. "llm.generate".
+            count_result (bool): Record the length of the returned list as the span's "documents" attribute.
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with Span(self, name, {}) as span:
+                    result = function(*args, **kwargs)
+                    if count_result and result is not None:
+                        span.attributes["documents"] = len(result)
+                    return result
+            return wrapper
+        return decorator
+
+    def _export(self, root: Span) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter(root)
+            except Exception as e:
+                logging.error(f"Tracing exporter {type(exporter).__name__} failed: {e}")
+
+
+class LoggingExporter:
+    """Logs each request's per-stage breakdown: at WARNING when slower than slow_query_seconds, else at DEBUG."""
+
+    def __init__(self, slow_query_seconds: Optional[float] = None):
+        self.slow_query_seconds = slow_query_seconds
+
+    def __call__(self, root: Span) -> None:
+        slow = self.slow_query_seconds is not None and root.duration >= self.slow_query_seconds
+        level = logging.WARNING if slow else logging.DEBUG
+        if not logging.getLogger().isEnabledFor(level):
+            return
+        logging.log(level, f"{'Slow request' if slow else 'Request'} took {root.duration * 1000:.1f} ms:\n"
+                           + "\n".join(self._lines(root, 0)))
+
+    def _lines(self, span: Span, depth: int) -> List[str]:
+        attributes = " ".join(f"{key}={value}" for key, value in span.attributes.items())
+        lines = [f"{'  ' * depth}{span.name} {span.duration * 1000:.1f} ms {attributes}".rstrip()]
+        for child in span.children:
+            lines.extend(self._lines(child, depth + 1))
+        return lines
+
+
+class PrometheusExporter:
+    """
+    Records every span in the Prometheus histograms of rag.core.metrics, labeled by span name:
+    rag_stage_duration_seconds, rag_stage_documents (spans with a "documents" attribute) and
+    rag_prompt_characters (spans with a "prompt_chars" attribute).
+    """
+
+    def __init__(self):
+        from rag.core import metrics
+
+        self.durations = metrics.STAGE_DURATION
+        self.documents = metrics.STAGE_DOCUMENTS
+        self.prompt_chars = metrics.PROMPT_CHARACTERS
+
+    def __call__(self, root: Span) -> None:
+        for span in root.walk():
+            self.durations.labels(span.name).observe(span.duration)
+            if "documents" in span.attributes:
+                self.documents.labels(span.name).observe(span.attributes["documents"])
+            if "prompt_chars" in span.attributes:
+                self.prompt_chars.labels(span.name).observe(span.attributes["prompt_chars"])
+
+
+class OpenTelemetryExporter:
+    """
+    Replays every request as an OpenTelemetry trace and records a rag.stage.duration histogram
+    (requires opentelemetry-api). Spans and metrics go to whatever SDK providers the application set up.
+    """
+
+    def __init__(self):
+        from opentelemetry import metrics, trace
+
+        self._trace = trace
+        self.tracer = trace.get_tracer("rag")
+        self.durations = metrics.get_meter("rag").create_histogram(
+            "rag.stage.duration", unit="s", description="Time spent in each stage of a request.")
+
+    def __call__(self, root: Span, parent=None) -> None:
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        start_ns = int(root.start * 1e9)
+        otel_span = self.tracer.start_span(root.name, context=context, start_time=start_ns,
+                                           attributes={key: value for key, value in root.attributes.items()
+                                                       if isinstance(value, (str, bool, int, float))})
+        for child in root.children:
+            self(child, otel_span)
+        otel_span.end(end_time=start_ns + int(root.duration * 1e9))
+        self.durations.record(root.duration, {"stage": root.name})
+
+
+# The tracer the application's stages are instrumented with; configured from the "tracing" settings.
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
+current_span = tracer.current_span
+in_current_span = tracer.in_current_span
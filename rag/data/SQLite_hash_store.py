@@ -1,43 +1,128 @@
 import sqlite3
-from typing import Optional
+import threading
+from contextlib import contextmanager
+from typing import Optional, Iterable, Dict, Tuple
 
 from rag.core.interfaces import IHashStore
 from utils.path_util import PathUtil
 
+# Stay below SQLITE_MAX_VARIABLE_NUMBER (999 on older builds) for IN (...) lookups.
+_MAX_QUERY_PARAMS = 900
+
+
+class _SharedConnection:
+    """
+    The single connection to one database file, shared by the hash stores of all its tables.
+
+    With a connection per store, a transaction left open on one table holds the database's write
+    lock, and a write to another table from its own connection fails with "database is locked".
+    Sharing the connection (and its transaction depth) turns those writes into one transaction.
+    """
+
+    _instances: Dict[str, '_SharedConnection'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.transaction_depth = 0
+        self.references = 0
+
+    @staticmethod
+    def acquire(db_path: str) -> '_SharedConnection':
+        with _SharedConnection._instances_lock:
+            shared = _SharedConnection._instances.get(db_path)
+            if shared is None:
+                shared = _SharedConnection._instances[db_path] = _SharedConnection(db_path)
+            shared.references += 1
+            return shared
+
+    def release(self) -> None:
+        with _SharedConnection._instances_lock:
+            self.references -= 1
+            if self.references == 0:
+                del _SharedConnection._instances[self.db_path]
+                with self.lock:
+                    self.conn.close()
+
 
 class SQLiteHashStore(IHashStore):
     def __init__(self, db_name: str = "hash_store.db", table_name: str = "hash_store"):
-        self.db_path = PathUtil.construct_path( PathUtil.get_project_base_path(),'data','hash',db_name)
+        hash_dir = PathUtil.construct_path(PathUtil.get_project_base_path(), 'data', 'hash')
+        PathUtil.create_directory(hash_dir)
+        self.db_path = PathUtil.construct_path(hash_dir, db_name)
         self.table_name = table_name
+        # One connection per database file is kept open for the lifetime of its stores instead of one per call.
+        self._shared = _SharedConnection.acquire(str(self.db_path))
+        self._conn = self._shared.conn
+        self._lock = self._shared.lock
         self._setup_database()
 
     def _setup_database(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS {self.table_name} (
-                id TEXT PRIMARY KEY,
-                hash TEXT
-            )
-        ''')
-        conn.commit()
-        conn.close()
+        with self._lock:
+            # WAL lets readers proceed during writes and makes commits an append instead of a rewrite.
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.table_name} (
+                    id TEXT PRIMARY KEY,
+                    hash TEXT
+                )
+            ''')
+            self._conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Defers commits until the outermost block exits, so a whole ingest run costs a single fsync.
+        The writes are rolled back if the block raises. Stores of the same database file share the
+        transaction, so nested blocks of several stores commit together.
+        """
+        shared = self._shared
+        with self._lock:
+            shared.transaction_depth += 1
+            try:
+                yield self
+            except BaseException:
+                shared.transaction_depth -= 1
+                if shared.transaction_depth == 0:
+                    self._conn.rollback()
+                raise
+            else:
+                shared.transaction_depth -= 1
+                if shared.transaction_depth == 0:
+                    self._conn.commit()
+
+    def _commit_unless_in_transaction(self):
+        if self._shared.transaction_depth == 0:
+            self._conn.commit()
 
     def save_hash(self, id: str, hash: str) -> None:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(f'''
-            INSERT OR REPLACE INTO {self.table_name} (id, hash) VALUES (?, ?)
-        ''', (id, hash))
-        conn.commit()
-        conn.close()
+        self.save_hashes([(id, hash)])
+
+    def save_hashes(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        with self._lock:
+            self._conn.executemany(f'''
+                INSERT OR REPLACE INTO {self.table_name} (id, hash) VALUES (?, ?)
+            ''', pairs)
+            self._commit_unless_in_transaction()
 
     def load_hash(self, id: str) -> Optional[str]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(f'''
-            SELECT hash FROM {self.table_name} WHERE id=?
-        ''', (id,))
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else None
+        return self.load_hashes([id]).get(id)
+
+    def load_hashes(self, ids: Iterable[str]) -> Dict[str, str]:
+        ids = list(ids)
+        hashes = {}
+        with self._lock:
+            for start in range(0, len(ids), _MAX_QUERY_PARAMS):
+                batch = ids[start:start + _MAX_QUERY_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                cursor = self._conn.execute(f'''
+                    SELECT id, hash FROM {self.table_name} WHERE id IN ({placeholders})
+                ''', batch)
+                hashes.update(cursor.fetchall())
+        return hashes
+
+    def close(self) -> None:
+        self._shared.release()
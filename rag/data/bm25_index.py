@@ -0,0 +1,200 @@
+import math
+import os
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.persian_normalizer import PersianNormalizer
+
+
+@dataclass
+class BM25Statistics:
+    """
+    The corpus statistics BM25 scores depend on, for the terms of one query. Summed over several
+    indexes (e.g. the shards of a sharded store), they score every index as part of one corpus.
+    """
+    documents: int = 0  # Document ids covered, including ids of documents without tokens
+    documents_with_tokens: int = 0
+    total_length: int = 0  # Tokens in all documents
+    document_frequencies: Dict[str, int] = field(default_factory=dict)  # Documents containing each term
+
+    def __add__(self, other: 'BM25Statistics') -> 'BM25Statistics':
+        frequencies = dict(self.document_frequencies)
+        for term, frequency in other.document_frequencies.items():
+            frequencies[term] = frequencies.get(term, 0) + frequency
+        return BM25Statistics(self.documents + other.documents,
+                              self.documents_with_tokens + other.documents_with_tokens,
+                              self.total_length + other.total_length, frequencies)
+
+
+class BM25Index:
+    """
+    In-process BM25 index over the same documents as a vector index, keyed by the same integer ids.
+
+    Texts are tokenized with the Persian normalizer, so hotel and street names match however the
+    Arabic/Persian letters, digits and half-spaces were typed. Postings are kept as compact integer
+    arrays and persisted as a single compressed .npz file next to the vector index.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            k1 (float): Term frequency saturation.
+            b (float): Document length normalization.
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Tuple[array, array]] = {}  # term -> (doc ids, term frequencies)
+        self._doc_lengths = array('I')
+        self._total_length = 0
+        # numpy views of the postings, built on first use and dropped when the index changes.
+        self._cache: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._doc_lengths_cache: Optional[np.ndarray] = None
+
+    @property
+    def size(self) -> int:
+        """Number of document ids covered by the index, including ids of documents without tokens."""
+        return len(self._doc_lengths)
+
+    def add(self, doc_id: int, text: str) -> None:
+        tokens = PersianNormalizer.tokenize(text)
+        if doc_id >= len(self._doc_lengths):
+            self._doc_lengths.extend([0] * (doc_id + 1 - len(self._doc_lengths)))
+        self._doc_lengths[doc_id] = len(tokens)
+        self._total_length += len(tokens)
+        for term, frequency in Counter(tokens).items():
+            doc_ids, frequencies = self._postings.setdefault(term, (array('i'), array('H')))
+            doc_ids.append(doc_id)
+            frequencies.append(min(frequency, 0xFFFF))
+        self._cache.clear()
+        self._doc_lengths_cache = None
+
+    def remove(self, doc_ids: np.ndarray) -> None:
+        """
+        Remove the given documents and renumber the others to consecutive ids in the same order,
+        the way FAISS renumbers a flat index in remove_ids.
+        """
+        if not self.size:
+            return
+        keep = np.ones(self.size, dtype=bool)
+        keep[doc_ids[doc_ids < self.size]] = False
+        new_ids = (np.cumsum(keep) - 1).astype(np.int32)
+        for term, (ids, frequencies) in list(self._postings.items()):
+            ids = np.frombuffer(ids, dtype=np.int32)
+            kept = keep[ids]
+            if not kept.any():
+                del self._postings[term]
+            else:
+                self._postings[term] = (array('i', new_ids[ids[kept]].tobytes()),
+                                        array('H', np.frombuffer(frequencies, dtype=np.uint16)[kept].tobytes()))
+        doc_lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32)[keep]
+        self._doc_lengths = array('I', doc_lengths.tobytes())
+        self._total_length = int(doc_lengths.sum())
+        self._cache.clear()
+        self._doc_lengths_cache = None
+
+    def statistics(self, query: str) -> BM25Statistics:
+        """The statistics of this index that the scores of the query's terms depend on."""
+        terms = set(PersianNormalizer.tokenize(query))
+        return BM25Statistics(
+            documents=self.size,
+            documents_with_tokens=int(np.count_nonzero(self._doc_lengths_array())) if self.size else 0,
+            total_length=self._total_length,
+            document_frequencies={term: len(self._postings[term][0]) for term in terms if term in self._postings}
+        )
+
+    def search(self, query: str, k: int = 10, allowed_ids: Optional[np.ndarray] = None,
+               statistics: Optional[BM25Statistics] = None) -> List[Tuple[int, float]]:
+        """
+        Return up to k (doc id, score) pairs for the documents sharing at least one term with the
+        query, best first. When allowed_ids is given, only those documents are considered.
+        statistics replaces the index's own statistics (see statistics()), e.g. with those of all
+        the shards the index is one of, so scores are comparable across them.
+        """
+        terms = set(PersianNormalizer.tokenize(query))
+        if not terms or not self.size:
+            return []
+
+        statistics = statistics or self.statistics(query)
+        doc_lengths = self._doc_lengths_array()
+        average_length = statistics.total_length / max(1, statistics.documents_with_tokens)
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in terms:
+            postings = self._posting_arrays(term)
+            if postings is None:
+                continue
+            doc_ids, frequencies = postings
+            document_frequency = statistics.document_frequencies.get(term, len(doc_ids))
+            idf = math.log(1 + (statistics.documents - document_frequency + 0.5) / (document_frequency + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * doc_lengths[doc_ids] / average_length)
+            scores[doc_ids] += idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+
+        candidates = np.flatnonzero(scores) if allowed_ids is None else allowed_ids[scores[allowed_ids] > 0]
+        if candidates.size == 0:
+            return []
+        candidate_scores = scores[candidates]
+        if candidates.size > k:
+            top = np.argpartition(-candidate_scores, k - 1)[:k]
+            candidates, candidate_scores = candidates[top], candidate_scores[top]
+        order = np.argsort(-candidate_scores, kind="stable")
+        return [(int(candidates[i]), float(candidate_scores[i])) for i in order]
+
+    def _posting_arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if term not in self._cache:
+            postings = self._postings.get(term)
+            if postings is None:
+                return None
+            self._cache[term] = (np.array(postings[0], dtype=np.int64), np.array(postings[1], dtype=np.float32))
+        return self._cache[term]
+
+    def _doc_lengths_array(self) -> np.ndarray:
+        if self._doc_lengths_cache is None:
+            self._doc_lengths_cache = np.array(self._doc_lengths, dtype=np.float32)
+        return self._doc_lengths_cache
+
+    def save(self, path: str) -> None:
+        """
+        Save the index as one compressed .npz file: the vocabulary as newline-separated UTF-8, and
+        the postings of all terms concatenated in vocabulary order with an offsets array.
+        """
+        terms = list(self._postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(self._postings[term][0]) for term in terms])
+        doc_ids = np.empty(offsets[-1], dtype=np.int32)
+        frequencies = np.empty(offsets[-1], dtype=np.uint16)
+        for position, term in enumerate(terms):
+            start, end = offsets[position], offsets[position + 1]
+            doc_ids[start:end] = self._postings[term][0]
+            frequencies[start:end] = self._postings[term][1]
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            params=np.array([self.k1, self.b], dtype=np.float64),
+            vocabulary=np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+            offsets=offsets,
+            doc_ids=doc_ids,
+            frequencies=frequencies,
+            doc_lengths=np.array(self._doc_lengths, dtype=np.uint32)
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'BM25Index':
+        with np.load(path) as data:
+            k1, b = data["params"].tolist()
+            index = cls(k1=k1, b=b)
+            vocabulary = data["vocabulary"].tobytes().decode("utf-8")
+            terms = vocabulary.split("\n") if vocabulary else []
+            offsets, doc_ids, frequencies = data["offsets"], data["doc_ids"], data["frequencies"]
+            for position, term in enumerate(terms):
+                start, end = offsets[position], offsets[position + 1]
+                index._postings[term] = (array('i', doc_ids[start:end].tobytes()),
+                                         array('H', frequencies[start:end].tobytes()))
+            index._doc_lengths = array('I', data["doc_lengths"].astype(np.uint32).tobytes())
+        index._total_length = int(sum(index._doc_lengths))
+        return index
@@ -0,0 +1,287 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from rag.core.interfaces import Document, DOCUMENT_KEY_FIELD, FilterOperator, MetadataFilter
+
+# Stay below SQLITE_MAX_VARIABLE_NUMBER (999 on older builds) for IN (...) lookups.
+_MAX_QUERY_PARAMS = 900
+_ITER_FETCH_SIZE = 1000
+# PRAGMA user_version of a table with the document_key column. Tables created before it are version 0.
+DOCUMENT_KEYS_VERSION = 1
+# PRAGMA user_version of a table that also has the filter columns below.
+SCHEMA_VERSION = 2
+# Metadata fields copied into indexed columns of their own, so filters on them are answered by SQLite
+# indexes. Filters on other fields read the metadata JSON of every row.
+FILTER_FIELDS = ("hotel_source_id", "city_name", "rate", "arrival_date", "checkout_date")
+_RANGE_OPERATORS = {FilterOperator.GT: ">", FilterOperator.GTE: ">=", FilterOperator.LT: "<", FilterOperator.LTE: "<="}
+
+
+class DocumentTable:
+    """
+    SQLite table holding the text and metadata of every vector of a FAISS index, keyed by vector id.
+
+    Replaces LangChain's pickled InMemoryDocstore: nothing is loaded up front, the database file is
+    memory-mapped, and a search only reads the rows of its k hits. Metadata filters are resolved to
+    vector ids with SQL over the indexed filter columns. Writes stay in an open transaction until
+    commit(), so a failed batch is undone with rollback().
+    """
+
+    def __init__(self, db_path: Optional[str] = None, mmap_size: int = 256 * 1024 * 1024, read_only: bool = False):
+        """
+        Args:
+            db_path (Optional[str]): SQLite file; None keeps the table in memory.
+            mmap_size (int): Bytes of the database file SQLite may memory-map for reads.
+            read_only (bool): Open an existing file of a published index version for reading only.
+        """
+        self.db_path = db_path or ":memory:"
+        if read_only and db_path:
+            # Published versions never change, so the file is opened immutable: SQLite takes no locks
+            # and creates no -wal or -shm files next to it.
+            self._conn = sqlite3.connect(f"{Path(db_path).absolute().as_uri()}?mode=ro&immutable=1", uri=True,
+                                         check_same_thread=False)
+        else:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.read_only = read_only
+        self._lock = threading.RLock()
+        # The FILTER_FIELDS this table has columns for; all of them unless it predates the columns.
+        self._filter_fields = set(FILTER_FIELDS)
+        self._setup_database(mmap_size)
+
+    def _setup_database(self, mmap_size: int):
+        with self._lock:
+            if not self.read_only:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+            exists = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents'").fetchone()
+            if exists:
+                # An existing table is left as it is: it may belong to a published index version.
+                columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+                self._filter_fields = {field for field in FILTER_FIELDS if _filter_column(field) in columns}
+                return
+            # The filter columns have no declared type, so values keep the type they have in the metadata.
+            filter_columns = " ".join(f"{_filter_column(field)}," for field in FILTER_FIELDS)
+            self._conn.execute(f'''
+                CREATE TABLE documents (
+                    vector_id INTEGER PRIMARY KEY,
+                    hotel_source_id TEXT,
+                    document_key TEXT,
+                    {filter_columns}
+                    chunk_no INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                )
+            ''')
+            self._conn.execute("CREATE INDEX documents_hotel_source_id ON documents (hotel_source_id)")
+            self._conn.execute("CREATE INDEX documents_document_key ON documents (document_key)")
+            self._create_filter_indexes()
+            self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self._conn.commit()
+
+    def _create_filter_indexes(self) -> None:
+        for field in FILTER_FIELDS:
+            column = _filter_column(field)
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS documents_{column} ON documents ({column})")
+
+    @property
+    def schema_version(self) -> int:
+        with self._lock:
+            return self._conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def add(self, first_vector_id: int, docs: List[Document]) -> None:
+        """
+        Insert the documents under consecutive vector ids starting at first_vector_id. chunk_no numbers
+        the chunks of the same hotel within the call, in order.
+        """
+        chunk_numbers: Dict[str, int] = {}
+        rows = []
+        for offset, doc in enumerate(docs):
+            metadata = doc.metadata or {}
+            hotel_source_id = metadata.get("hotel_source_id")
+            hotel_source_id = None if hotel_source_id is None else str(hotel_source_id)
+            chunk_no = chunk_numbers.get(hotel_source_id, 0)
+            chunk_numbers[hotel_source_id] = chunk_no + 1
+            rows.append((first_vector_id + offset, hotel_source_id, metadata.get(DOCUMENT_KEY_FIELD),
+                         *(_filter_value(metadata.get(field)) for field in FILTER_FIELDS), chunk_no,
+                         doc.content, json.dumps(metadata, ensure_ascii=False, default=str)))
+        columns = ", ".join(_filter_column(field) for field in FILTER_FIELDS)
+        placeholders = ", ".join("?" * (len(FILTER_FIELDS) + 6))
+        with self._lock:
+            self._conn.executemany(f'''
+                INSERT OR REPLACE INTO documents (vector_id, hotel_source_id, document_key, {columns}, chunk_no, text,
+                                                  metadata)
+                VALUES ({placeholders})
+            ''', rows)
+
+    def ids_of_keys(self, keys: Iterable[str]) -> List[int]:
+        """The vector ids of the rows with the given document keys, in vector id order."""
+        keys = list(keys)
+        vector_ids = []
+        with self._lock:
+            for start in range(0, len(keys), _MAX_QUERY_PARAMS):
+                batch = keys[start:start + _MAX_QUERY_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                vector_ids.extend(row[0] for row in self._conn.execute(
+                    f"SELECT vector_id FROM documents WHERE document_key IN ({placeholders})", batch))
+        return sorted(vector_ids)
+
+    def delete(self, vector_ids: Iterable[int]) -> None:
+        """Delete the rows of the given vector ids, leaving gaps until compact() renumbers the rest."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM documents WHERE vector_id = ?",
+                                   ((int(vector_id),) for vector_id in vector_ids))
+
+    def compact(self) -> None:
+        """Renumber the rows to consecutive vector ids from 0, keeping their order."""
+        with self._lock:
+            vector_ids = [row[0] for row in self._conn.execute("SELECT vector_id FROM documents ORDER BY vector_id")]
+            # Moved through negative ids, so no row takes an id another row still holds.
+            self._conn.executemany("UPDATE documents SET vector_id = ? WHERE vector_id = ?",
+                                   ((-1 - new_id, old_id) for new_id, old_id in enumerate(vector_ids)
+                                    if new_id != old_id))
+            self._conn.execute("UPDATE documents SET vector_id = -1 - vector_id WHERE vector_id < 0")
+
+    def add_document_keys(self, keys: Iterable[Tuple[int, str]]) -> None:
+        """
+        Upgrade a table created before the document_key column existed: add the column and set the
+        given (vector id, document key) pairs.
+        """
+        with self._lock:
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+            if "document_key" not in columns:
+                self._conn.execute("ALTER TABLE documents ADD COLUMN document_key TEXT")
+                self._conn.execute("CREATE INDEX IF NOT EXISTS documents_document_key ON documents (document_key)")
+            self._conn.executemany("UPDATE documents SET document_key = ? WHERE vector_id = ?",
+                                   ((key, vector_id) for vector_id, key in keys))
+            self._conn.execute(f"PRAGMA user_version={DOCUMENT_KEYS_VERSION}")
+
+    def add_filter_columns(self) -> None:
+        """
+        Upgrade a table created before the filter columns existed: add and index them, and fill them
+        from the stored metadata in one statement run by SQLite.
+        """
+        with self._lock:
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+            for field in FILTER_FIELDS:
+                if _filter_column(field) not in columns:
+                    self._conn.execute(f"ALTER TABLE documents ADD COLUMN {_filter_column(field)}")
+            # Lists and objects are not filter values, like in add().
+            assignments = ", ".join(
+                f"{_filter_column(field)} = CASE WHEN json_type(metadata, ?) IN ('array', 'object') THEN NULL "
+                f"ELSE json_extract(metadata, ?) END"
+                for field in FILTER_FIELDS)
+            self._conn.execute(f"UPDATE documents SET {assignments}",
+                               [_json_path(field) for field in FILTER_FIELDS for _ in range(2)])
+            self._create_filter_indexes()
+            self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self._filter_fields = set(FILTER_FIELDS)
+
+    def select(self, metadata_filter: MetadataFilter) -> List[int]:
+        """
+        The vector ids of the rows whose metadata matches every condition of the filter, in vector id
+        order. Like FieldCondition.matches_value, values of different types are never equal, and a
+        range only matches values of the same kind (numbers or text) as its bound. A table that predates
+        the filter columns is filtered on its metadata JSON.
+        """
+        clauses, params = [], []
+        for condition in metadata_filter.conditions:
+            if condition.field in self._filter_fields:
+                column, column_params = _filter_column(condition.field), []
+            else:
+                column, column_params = "json_extract(metadata, ?)", [_json_path(condition.field)]
+            if condition.operator is FilterOperator.EQ:
+                clauses.append(f"{column} = ?")
+                params.extend(column_params + [_filter_value(condition.value)])
+            elif condition.operator is FilterOperator.IN:
+                values = [_filter_value(value) for value in condition.value]
+                clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+                params.extend(column_params + values)
+            else:
+                kinds = "'text'" if isinstance(condition.value, str) else "'integer', 'real'"
+                clauses.append(f"typeof({column}) IN ({kinds}) AND {column} {_RANGE_OPERATORS[condition.operator]} ?")
+                params.extend(column_params * 2 + [_filter_value(condition.value)])
+        where = " AND ".join(f"({clause})" for clause in clauses) or "1"
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                f"SELECT vector_id FROM documents WHERE {where} ORDER BY vector_id", params)]
+
+    def get(self, vector_ids: Iterable[int]) -> Dict[int, Document]:
+        """Load the documents of the given vector ids. Unknown ids are omitted."""
+        vector_ids = [int(vector_id) for vector_id in vector_ids]
+        documents = {}
+        with self._lock:
+            for start in range(0, len(vector_ids), _MAX_QUERY_PARAMS):
+                batch = vector_ids[start:start + _MAX_QUERY_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                cursor = self._conn.execute(f'''
+                    SELECT vector_id, text, metadata FROM documents WHERE vector_id IN ({placeholders})
+                ''', batch)
+                for vector_id, text, metadata in cursor:
+                    documents[vector_id] = Document(content=text, metadata=json.loads(metadata))
+        return documents
+
+    def iter_all(self) -> Iterator[Tuple[int, Document]]:
+        """Yield (vector id, document) for every row in vector id order, a page of rows at a time."""
+        last_id = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute('''
+                    SELECT vector_id, text, metadata FROM documents WHERE vector_id > ? ORDER BY vector_id LIMIT ?
+                ''', (last_id, _ITER_FETCH_SIZE)).fetchall()
+            if not rows:
+                return
+            for vector_id, text, metadata in rows:
+                yield vector_id, Document(content=text, metadata=json.loads(metadata))
+            last_id = rows[-1][0]
+
+    def truncate(self, count: int) -> None:
+        """Delete the rows with a vector id of count or more."""
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE vector_id >= ?", (count,))
+
+    def commit(self) -> None:
+        with self._lock:
+            self._conn.commit()
+
+    def rollback(self) -> None:
+        with self._lock:
+            self._conn.rollback()
+
+    def checkpoint(self) -> None:
+        """Move the committed transactions from the write-ahead log into the database file."""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def copy_to(self, db_path: str) -> None:
+        """Write a consistent copy of the committed rows to a new database file."""
+        target = sqlite3.connect(db_path)
+        try:
+            with self._lock:
+                self._conn.backup(target)
+        finally:
+            target.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _filter_column(field: str) -> str:
+    return f"meta_{field}"
+
+
+def _json_path(field: str) -> str:
+    return f'$."{field}"'
+
+
+def _filter_value(value: Any) -> Any:
+    """The value stored in a filter column: scalars as they are, anything else (lists, dicts) as NULL."""
+    return value if isinstance(value, (str, int, float)) else None
@@ -0,0 +1,53 @@
+import threading
+from typing import Dict, Tuple
+
+from elasticsearch import Elasticsearch
+
+
+class ElasticsearchClientPool:
+    """
+    Process-wide Elasticsearch clients, one per URL and connection settings.
+
+    A client keeps a pool of keep-alive HTTP connections per node and is thread-safe, so the
+    document store, the LangChain stores it wraps and index management all share one client
+    instead of each opening its own connections.
+    """
+
+    _clients: Dict[Tuple[str, int, float, int], Elasticsearch] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get(url: str, connections_per_node: int = 10, request_timeout: float = 30,
+            max_retries: int = 3) -> Elasticsearch:
+        """
+        Return the shared client for the given settings, creating it on first use.
+
+        Args:
+            url (str): Elasticsearch URL.
+            connections_per_node (int): Keep-alive connections pooled per node; at least the number
+                of parallel bulk workers.
+            request_timeout (float): Seconds before a request times out.
+            max_retries (int): Retries of a request that failed with a connection error or timeout.
+        """
+        key = (url, connections_per_node, request_timeout, max_retries)
+        with ElasticsearchClientPool._lock:
+            client = ElasticsearchClientPool._clients.get(key)
+            if client is None:
+                client = Elasticsearch(
+                    [url],
+                    connections_per_node=connections_per_node,
+                    request_timeout=request_timeout,
+                    max_retries=max_retries,
+                    retry_on_timeout=True,
+                    http_compress=True
+                )
+                ElasticsearchClientPool._clients[key] = client
+            return client
+
+    @staticmethod
+    def close_all() -> None:
+        """Close every shared client and its connections."""
+        with ElasticsearchClientPool._lock:
+            for client in ElasticsearchClientPool._clients.values():
+                client.close()
+            ElasticsearchClientPool._clients.clear()
@@ -1,72 +1,456 @@
 import logging
-from typing import List
-from elasticsearch import Elasticsearch
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from elasticsearch import ApiError, AuthorizationException, BadRequestError, helpers
 
 from langchain.embeddings import HuggingFaceEmbeddings
 from langchain_elasticsearch import ElasticsearchStore  # Updated import
 from langchain.schema import BaseRetriever
 
-from rag.core.interfaces import DocumentType, IDocumentStore, Document, DocumentStoreType
+from rag.configs.settings import SearchSettings
+from rag.core.interfaces import DocumentType, IDocumentStore, Document, DocumentStoreType, MetadataFilter, \
+    FilterOperator, RetrievalMode, DistanceMetric, DOCUMENT_KEY_FIELD
+from rag.core.retrievers.document_store_retriever import DocumentStoreRetriever
+from rag.core.tracing import current_span, span, traced
+from rag.data.elasticsearch_client_pool import ElasticsearchClientPool
+from rag.data.vector_compression import VectorCompression
 from utils.path_util import PathUtil
+from utils.rank_fusion import RankFusion
+
+# Elasticsearch similarity used for each distance metric (applies when the index is created).
+DISTANCE_STRATEGIES = {
+    DistanceMetric.L2: "EUCLIDEAN_DISTANCE",
+    DistanceMetric.INNER_PRODUCT: "MAX_INNER_PRODUCT",
+    DistanceMetric.COSINE: "COSINE"
+}
+# dense_vector similarity of each distance metric, matching the LangChain distance strategies above.
+VECTOR_SIMILARITIES = {
+    DistanceMetric.L2: "l2_norm",
+    DistanceMetric.INNER_PRODUCT: "max_inner_product",
+    DistanceMetric.COSINE: "cosine"
+}
+# HNSW graph type of the dense_vector field for each configured compression. Elasticsearch has no
+# 16-bit float vectors, so fp16 keeps float32; product quantization maps to its 4-bit quantization.
+VECTOR_INDEX_TYPES = {
+    VectorCompression.NONE: "hnsw",
+    VectorCompression.FP16: "hnsw",
+    VectorCompression.INT8: "int8_hnsw",
+    VectorCompression.PQ: "int4_hnsw"
+}
+# Upper bound Elasticsearch puts on num_candidates.
+MAX_NUM_CANDIDATES = 10000
+# Painless script giving a document indexed before documents had keys the key ingestion assigns it
+# (see scripts.hotel_preparer): the hotel id for hotel info, "<hotel id>_<review id>" for a review.
+DOCUMENT_KEY_SCRIPT = (
+    "def metadata = ctx._source.metadata; "
+    "metadata.%s = metadata.containsKey('review_id') "
+    "? metadata.hotel_source_id + '_' + metadata.review_id : String.valueOf(metadata.hotel_source_id)"
+    % DOCUMENT_KEY_FIELD
+)
 
 class ElasticsearchDocStore(IDocumentStore):
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, search_config: Optional[dict] = None):
         """
         Initialize an Elasticsearch-based document store.
 
         The config should include:
           - params.embedding_model: embedding model name.
           - params.elasticsearch_url: URL for Elasticsearch instance.
+          - params.rrf_k: reciprocal rank fusion constant.
+          - params.bulk_chunk_size: documents embedded and sent per bulk request.
+          - params.bulk_workers: bulk requests in flight at once.
+          - params.connections_per_node, params.request_timeout: settings of the shared client.
+          - params.text_analyzer, params.index_shards, params.index_replicas: index template settings.
+
+        search_config holds the per-document-type search settings (see SearchSettings).
         """
         self.config = config
         self.params = config.get("params", {})
         self.embedding_model = self.params.get("embedding_model", "paraphrase-multilingual-mpnet-base-v2")
-        self.elasticsearch_url = self.params.get("elasticsearch_url", "http://localhost:9200")
+        self.elasticsearch_url = self.params.get("elasticsearch_url") or "http://localhost:9200"
+        self.rrf_k = self.params.get("rrf_k", 60)
+        self.bulk_chunk_size = self.params.get("bulk_chunk_size", 500)
+        self.bulk_workers = self.params.get("bulk_workers", 4)
+        self.text_analyzer = self.params.get("text_analyzer", "persian")
+        self.index_shards = self.params.get("index_shards", 1)
+        self.index_replicas = self.params.get("index_replicas", 1)
+        # One pooled keep-alive client for bulk loading, searches, index management and the LangChain stores.
+        self.client = ElasticsearchClientPool.get(self.elasticsearch_url,
+                                                  connections_per_node=self.params.get("connections_per_node", 10),
+                                                  request_timeout=self.params.get("request_timeout", 30))
 
         # Use separate index names for each document type.
         self.index_names = {
             DocumentType.HOTEL_INFO: 'elasticsearch_hotel_info_index',
             DocumentType.HOTEL_REVIEW: 'elasticsearch_hotel_review_index'
         }
+        self.search_settings: Dict[DocumentType, SearchSettings] = {
+            doc_type: SearchSettings(**(search_config or {}).get(doc_type.value, {}))
+            for doc_type in DocumentType
+        }
         self.embeddings = HuggingFaceEmbeddings(model_name=self.embedding_model)
+        self._dimension: Optional[int] = None
         # Create an Elasticsearch store per document type.
         self.stores = {
-            doc_type: self._initialize_store(self.index_names[doc_type])
+            doc_type: self._initialize_store(self.index_names[doc_type],
+                                             DistanceMetric(self.search_settings[doc_type].metric))
             for doc_type in DocumentType
         }
-        self.client = Elasticsearch([self.elasticsearch_url])
+        # Document ids indexed inside an open batch, per document type.
+        self._batches = {}
+        # Cleared once the cluster rejects the rrf retriever; hybrid searches then fuse their ranks locally.
+        self._server_side_rrf = True
 
-    def _initialize_store(self, index_name: str) -> ElasticsearchStore:
+    def _initialize_store(self, index_name: str, metric: DistanceMetric) -> ElasticsearchStore:
         """
-        Initialize the Elasticsearch store.
+        Initialize the Elasticsearch store. The index itself is created from its index template
+        (see _ensure_index); the metric tells LangChain how to turn the hit scores into similarities.
         """
         return ElasticsearchStore(
-            es_url=self.elasticsearch_url,
+            es_connection=self.client,
             index_name=index_name,
-            embedding=self.embeddings
+            embedding=self.embeddings,
+            distance_strategy=DISTANCE_STRATEGIES[metric]
         )
 
     def add_documents(self, docs: List[Document], doc_type: DocumentType) -> None:
         """
         Add a list of Document objects to the Elasticsearch store for the given document type.
+
+        Documents are embedded bulk_chunk_size at a time and sent with parallel bulk requests, so
+        embedding the next chunk overlaps with indexing the previous ones. Outside a batch the call
+        runs in its own batch: the index is refreshed once at the end, and a failure deletes the
+        documents already indexed.
+        """
+        if not docs:
+            return
+        if doc_type not in self._batches:
+            with self.batch(doc_type):
+                self.add_documents(docs, doc_type)
+            return
+
+        index_name = self.index_names[doc_type]
+        ids = [uuid.uuid4().hex for _ in docs]
+        # Recorded before sending, so a failed bulk load is rolled back in full.
+        self._batches[doc_type].extend(ids)
+        failed = 0
+        for ok, item in helpers.parallel_bulk(self.client, self._bulk_actions(index_name, docs, ids),
+                                              thread_count=self.bulk_workers, chunk_size=self.bulk_chunk_size,
+                                              raise_on_error=False):
+            if not ok:
+                failed += 1
+                logging.error(f"Failed to index a document into {index_name}: {item}")
+        if failed:
+            raise RuntimeError(f"{failed} of {len(docs)} documents could not be indexed into {index_name}.")
+        logging.info(f"Bulk indexed {len(docs)} documents into {index_name}.")
+
+    def _bulk_actions(self, index_name: str, docs: List[Document], ids: List[str]) -> Iterator[dict]:
+        """Yield the bulk index actions of the documents, embedding them one chunk at a time."""
+        for start in range(0, len(docs), self.bulk_chunk_size):
+            chunk = docs[start:start + self.bulk_chunk_size]
+            vectors = self.embeddings.embed_documents([doc.content for doc in chunk])
+            for doc_id, doc, vector in zip(ids[start:start + self.bulk_chunk_size], chunk, vectors):
+                # The field names LangChain's ElasticsearchStore reads.
+                yield {
+                    "_op_type": "index",
+                    "_index": index_name,
+                    "_id": doc_id,
+                    "_source": {"text": doc.content, "vector": vector, "metadata": doc.metadata or {}}
+                }
+
+    def _embedding_dimension(self) -> int:
+        if self._dimension is None:
+            self._dimension = len(self.embeddings.embed_query("dimension"))
+        return self._dimension
+
+    def index_template(self, doc_type: DocumentType) -> Dict[str, Any]:
+        """
+        The index template body of a document type, built from its search settings.
+
+        The vector field is an HNSW graph with the configured m and ef_construction, quantized per
+        the configured compression (int8_hnsw for "int8"). The text is analyzed with text_analyzer
+        for hybrid search, and every string metadata field gets a keyword sub-field for exact filters.
+        """
+        settings = self.search_settings[doc_type]
+        compression = VectorCompression(settings.compression)
+        return {
+            "index_patterns": [self.index_names[doc_type]],
+            "template": {
+                "settings": {
+                    "number_of_shards": self.index_shards,
+                    "number_of_replicas": self.index_replicas
+                },
+                "mappings": {
+                    "dynamic_templates": [{
+                        "metadata_strings": {
+                            "path_match": "metadata.*",
+                            "match_mapping_type": "string",
+                            "mapping": {"type": "text", "fields": {"keyword": {"type": "keyword", "ignore_above": 256}}}
+                        }
+                    }],
+                    "properties": {
+                        "text": {"type": "text", "analyzer": self.text_analyzer},
+                        "vector": {
+                            "type": "dense_vector",
+                            "dims": self._embedding_dimension(),
+                            "index": True,
+                            "similarity": VECTOR_SIMILARITIES[DistanceMetric(settings.metric)],
+                            "index_options": {
+                                "type": VECTOR_INDEX_TYPES[compression],
+                                "m": settings.hnsw_m,
+                                "ef_construction": settings.hnsw_ef_construction
+                            }
+                        },
+                        "metadata": {"type": "object", "dynamic": True}
+                    }
+                }
+            }
+        }
+
+    def _ensure_index(self, doc_type: DocumentType) -> None:
+        """
+        Create the index of a document type if missing, after writing its index template from the
+        current config. Existing indexes keep their mapping; clear and re-ingest to apply a new one.
+        """
+        index_name = self.index_names[doc_type]
+        if self.client.indices.exists(index=index_name):
+            return
+        self.client.indices.put_index_template(name=f"{index_name}_template", **self.index_template(doc_type))
+        self.client.indices.create(index=index_name)
+        logging.info(f"Created index {index_name} from its index template.")
+
+    def _refresh_interval(self, index_name: str) -> Optional[str]:
+        """The refresh interval set on the index, or None when it uses the default."""
+        response = self.client.indices.get_settings(index=index_name, name="index.refresh_interval")
+        return response.body.get(index_name, {}).get("settings", {}).get("index", {}).get("refresh_interval")
+
+    @contextmanager
+    def batch(self, doc_type: DocumentType):
+        """
+        Load documents with periodic refreshes disabled (refresh_interval -1) and refresh the index
+        once when the block exits, restoring its refresh interval.
+
+        Elasticsearch indexes documents as they are added, so a failed block deletes the
+        documents it added instead of deferring the writes. Documents the block deleted stay
+        deleted; their hashes are not committed either, so the next ingest adds them again.
+        """
+        index_name = self.index_names[doc_type]
+        self._ensure_index(doc_type)
+        self._migrate_document_keys(doc_type)
+        refresh_interval = self._refresh_interval(index_name)
+        self.client.indices.put_settings(index=index_name, settings={"index": {"refresh_interval": "-1"}})
+        self._batches[doc_type] = []
+        try:
+            yield self
+        except BaseException:
+            added_ids = self._batches[doc_type]
+            if added_ids:
+                self._delete_ids(index_name, added_ids)
+                logging.info(f"Rolled back {len(added_ids)} documents from {index_name}.")
+            raise
+        finally:
+            del self._batches[doc_type]
+            self.client.indices.put_settings(index=index_name,
+                                             settings={"index": {"refresh_interval": refresh_interval}})
+            self.client.indices.refresh(index=index_name)
+
+    def delete_documents(self, keys: Iterable[str], doc_type: DocumentType) -> None:
+        """Delete the chunks of the documents with the given keys with a delete-by-query on their key."""
+        keys = list(keys)
+        index_name = self.index_names[doc_type]
+        if not keys or not self.client.indices.exists(index=index_name):
+            return
+        in_batch = doc_type in self._batches
+        if in_batch and self._batches[doc_type]:
+            # Documents added earlier in the batch are only visible to the query after a refresh.
+            self.client.indices.refresh(index=index_name)
+        response = self.client.delete_by_query(
+            index=index_name, query={"terms": {f"metadata.{DOCUMENT_KEY_FIELD}.keyword": keys}},
+            conflicts="proceed", refresh=not in_batch
+        )
+        if response.get("failures"):
+            raise RuntimeError(f"Failed to delete documents from {index_name}: {response['failures']}")
+        logging.info(f"Deleted {response.get('deleted', 0)} superseded documents from {index_name}.")
+
+    def _migrate_document_keys(self, doc_type: DocumentType) -> None:
         """
-        if docs:
-            store = self.stores[doc_type]
-            texts = [doc.content for doc in docs]
-            metadatas = [doc.metadata for doc in docs]
-            # ElasticsearchStore.add_documents will generate embeddings internally using self.embeddings.
-            store.add_texts(texts, metadatas=metadatas)
+        Key the documents indexed before documents had keys (see DOCUMENT_KEY_SCRIPT). Reviews indexed
+        as one document per hotel have no review id and could never be replaced, so they are deleted;
+        the next ingest adds them one by one. Does nothing once every document has a key.
+        """
+        index_name = self.index_names[doc_type]
+        unkeyed = {"bool": {"must_not": [{"exists": {"field": f"metadata.{DOCUMENT_KEY_FIELD}"}}]}}
+        if doc_type is DocumentType.HOTEL_REVIEW:
+            per_hotel = {"bool": {"must_not": [{"exists": {"field": "metadata.review_id"}}]}}
+            response = self.client.delete_by_query(index=index_name, query=per_hotel, conflicts="proceed",
+                                                   refresh=True)
+            if response.get("deleted"):
+                logging.info(f"Deleted {response['deleted']} per-hotel review documents from {index_name}.")
+        response = self.client.update_by_query(index=index_name, query=unkeyed, conflicts="proceed", refresh=True,
+                                               script={"source": DOCUMENT_KEY_SCRIPT, "lang": "painless"})
+        if response.get("updated"):
+            logging.info(f"Added document keys to {response['updated']} documents of {index_name}.")
 
-    def search(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO) -> List[Document]:
-        """Search the Elasticsearch store for a query and return relevant documents."""
+    def _delete_ids(self, index_name: str, ids: List[str]) -> None:
+        """Delete documents by id with bulk requests. Ids that were never indexed are ignored."""
+        actions = ({"_op_type": "delete", "_index": index_name, "_id": doc_id} for doc_id in ids)
+        for ok, item in helpers.streaming_bulk(self.client, actions, chunk_size=self.bulk_chunk_size,
+                                               raise_on_error=False):
+            if not ok and item.get("delete", {}).get("status") != 404:
+                logging.error(f"Failed to delete a document from {index_name}: {item}")
+
+    @traced("store.search", count_result=True)
+    def search(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO,
+               metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
+        """
+        Search the Elasticsearch store for a query and return relevant documents, using the document
+        type's search settings: num_candidates HNSW candidates per shard, MMR over fetch_k results when
+        mmr_lambda is set, and a minimum score when score_threshold is set. Elasticsearch scores are
+        similarities (higher is better) for every metric; the threshold is applied by Elasticsearch
+        as min_score, so MMR, like FAISS, only diversifies results above it.
+        """
+        current_span().set("doc_type", doc_type.value)
         store = self.stores[doc_type]
-        results = store.similarity_search(query, k=k)
+        settings = self.search_settings[doc_type]
+        filter_clauses = self.to_elasticsearch_filter(metadata_filter)
+        fetch_k = max(k, settings.fetch_k)
+        custom_query = self._knn_options(self._num_candidates(doc_type, fetch_k), filter_clauses,
+                                         settings.score_threshold)
+        if settings.mmr_lambda is not None:
+            results = store.max_marginal_relevance_search(query, k=k, fetch_k=fetch_k, lambda_mult=settings.mmr_lambda,
+                                                          custom_query=custom_query)
+        else:
+            results = store.similarity_search(query, k=k, filter=filter_clauses, custom_query=custom_query)
         return [Document(content=doc.page_content, metadata=doc.metadata) for doc in results]
 
-    def get_retriever(self, doc_type: DocumentType) -> BaseRetriever:
-        """Return a retriever instance for the specified document type."""
-        store = self.stores[doc_type]
-        return store.as_retriever(search_kwargs={"k": 10, "distance_metric": "cosine"})
+    @traced("store.hybrid_search", count_result=True)
+    def hybrid_search(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO,
+                      metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
+        """
+        Run a `match` query on the text and a kNN query on the embeddings, with the ranks of both fused
+        by reciprocal rank fusion. Elasticsearch fuses them in one request with its `rrf` retriever; a
+        cluster that rejects the retriever (a version without it, or a licence not covering RRF) gets
+        both queries in one multi-search request, fused here with RankFusion.
+        """
+        current_span().set("doc_type", doc_type.value)
+        filter_clauses = self.to_elasticsearch_filter(metadata_filter)
+        fetch_k = max(k, self.search_settings[doc_type].fetch_k)
+        with span("store.embed_query"):
+            query_vector = self.embeddings.embed_query(query)
+        lexical = {"bool": {"must": [{"match": {"text": query}}], "filter": filter_clauses}}
+        knn = {
+            "field": "vector",
+            "query_vector": query_vector,
+            "k": fetch_k,
+            "num_candidates": self._num_candidates(doc_type, fetch_k),
+            "filter": filter_clauses
+        }
+        if self._server_side_rrf:
+            try:
+                response = self.client.search(
+                    index=self.index_names[doc_type],
+                    size=k,
+                    retriever={"rrf": {
+                        "retrievers": [{"standard": {"query": lexical}}, {"knn": knn}],
+                        "rank_constant": self.rrf_k,
+                        "rank_window_size": fetch_k
+                    }},
+                    source=["text", "metadata"]
+                )
+                return [self._hit_document(hit) for hit in response["hits"]["hits"]]
+            except (BadRequestError, AuthorizationException) as e:
+                logging.warning(f"Elasticsearch rejected the rrf retriever, fusing hybrid results locally: {e}")
+                self._server_side_rrf = False
+        return self._fused_hybrid_search(self.index_names[doc_type], lexical, knn, k, fetch_k)
+
+    def _fused_hybrid_search(self, index_name: str, lexical: dict, knn: dict, k: int, fetch_k: int) -> List[Document]:
+        """
+        Send the lexical and the kNN query of a hybrid search in one multi-search request and fuse
+        their rankings with RankFusion.
+        """
+        response = self.client.msearch(searches=[
+            {"index": index_name}, {"query": lexical, "size": fetch_k, "_source": ["text", "metadata"]},
+            {"index": index_name}, {"knn": knn, "size": fetch_k, "_source": ["text", "metadata"]}
+        ])
+        hits = {}
+        rankings = []
+        for result in response["responses"]:
+            if "error" in result:
+                raise ApiError(message=str(result["error"]), meta=response.meta, body=result)
+            ranking = []
+            for hit in result["hits"]["hits"]:
+                hits[hit["_id"]] = hit
+                ranking.append(hit["_id"])
+            rankings.append(ranking)
+        fused = RankFusion.reciprocal_rank_fusion(rankings, k=self.rrf_k)[:k]
+        return [self._hit_document(hits[doc_id]) for doc_id, _ in fused]
+
+    @staticmethod
+    def _hit_document(hit: dict) -> Document:
+        return Document(content=hit["_source"].get("text", ""), metadata=hit["_source"].get("metadata", {}))
+
+    def _num_candidates(self, doc_type: DocumentType, k: int) -> int:
+        """
+        HNSW candidates each shard visits for a kNN query returning k hits: the configured
+        num_candidates (2 * fetch_k by default), at least k. It does not grow with the index, so
+        query latency stays flat as documents are added.
+        """
+        settings = self.search_settings[doc_type]
+        return min(max(k, settings.num_candidates or 2 * settings.fetch_k), MAX_NUM_CANDIDATES)
+
+    @staticmethod
+    def _knn_options(num_candidates: int, filter_clauses: List[dict],
+                     min_score: Optional[float] = None) -> Callable[[Dict[str, Any], Optional[str]], Dict[str, Any]]:
+        """
+        Return a LangChain custom_query setting num_candidates and the filter on the kNN query it
+        builds, and min_score on the search when given; LangChain's MMR search would otherwise drop
+        the filter and has no score threshold.
+        """
+        def custom_query(query_body: Dict[str, Any], query: Optional[str]) -> Dict[str, Any]:
+            knn = query_body["knn"]
+            knn["num_candidates"] = max(num_candidates, knn["k"])
+            knn["filter"] = filter_clauses
+            if min_score is not None:
+                query_body["min_score"] = min_score
+            return query_body
+        return custom_query
+
+    @staticmethod
+    def to_elasticsearch_filter(metadata_filter: Optional[MetadataFilter]) -> List[dict]:
+        """
+        Translate a metadata filter into Elasticsearch bool-filter clauses over the `metadata.*` fields,
+        so the kNN search only considers matching documents.
+        """
+        if not metadata_filter:
+            return []
+        range_operators = {
+            FilterOperator.GT: "gt", FilterOperator.GTE: "gte",
+            FilterOperator.LT: "lt", FilterOperator.LTE: "lte"
+        }
+        clauses = []
+        for condition in metadata_filter.conditions:
+            field = f"metadata.{condition.field}"
+            if condition.operator is FilterOperator.EQ:
+                # Dynamically mapped strings are only exact-matchable through their keyword sub-field.
+                keyword_field = f"{field}.keyword" if isinstance(condition.value, str) else field
+                clauses.append({"term": {keyword_field: condition.value}})
+            elif condition.operator is FilterOperator.IN:
+                values = list(condition.value)
+                keyword_field = f"{field}.keyword" if values and isinstance(values[0], str) else field
+                clauses.append({"terms": {keyword_field: values}})
+            else:
+                clauses.append({"range": {field: {range_operators[condition.operator]: condition.value}}})
+        return clauses
+
+    def get_retriever(self, doc_type: DocumentType, metadata_filter: Optional[MetadataFilter] = None,
+                      mode: RetrievalMode = RetrievalMode.DENSE, k: Optional[int] = None) -> BaseRetriever:
+        """
+        Return a retriever instance returning the k best documents of the specified document type.
+        k defaults to the document type's search settings.
+        """
+        return DocumentStoreRetriever(document_store=self, doc_type=doc_type, k=k or self.search_settings[doc_type].k, metadata_filter=metadata_filter,
+                                      mode=mode)
 
     def clear(self, doc_type: DocumentType) -> None:
         """Clear the Elasticsearch index for the specified document type."""
@@ -1,103 +1,791 @@
+import json
 import os
+import pickle
+import shutil
+import faiss
 import numpy as np
 import logging
-from typing import List
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
 from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
 from langchain.schema import BaseRetriever
 
-from rag.core.interfaces import DocumentType, IDocumentStore, Document, DocumentStoreType
+from rag.configs.settings import SearchSettings
+
+from rag.core.interfaces import DocumentType, IDocumentStore, Document, DocumentStoreType, MetadataFilter, \
+    RetrievalMode, DistanceMetric
+from rag.core.retrievers.document_store_retriever import DocumentStoreRetriever
+from rag.core.tracing import current_span, span, traced
+from rag.data.bm25_index import BM25Index, BM25Statistics
+from rag.data.document_table import DocumentTable, DOCUMENT_KEYS_VERSION, SCHEMA_VERSION
+from rag.data.index_snapshots import IndexSnapshots
+from rag.data.raw_vector_store import RawVectorStore
+from rag.data.vector_compression import VectorCompression
 from utils.path_util import PathUtil
+from utils.rank_fusion import RankFusion
+
+# Files inside each FAISS index folder.
+FAISS_INDEX_FILE = "index.faiss"
+DOCUMENT_TABLE_FILE = "documents.sqlite"
+# The pickled docstore of indexes saved by LangChain's FAISS wrapper; migrated into the document table.
+LANGCHAIN_DOCSTORE_FILE = "index.pkl"
+# File name of the BM25 keyword index inside each FAISS index folder.
+BM25_INDEX_FILE = "bm25.npz"
+# File recording how the vectors of a FAISS index folder were built (e.g. the distance metric).
+INDEX_META_FILE = "index_meta.json"
+# Original float32 vectors of a compressed index, used to re-score its top candidates exactly.
+RAW_VECTORS_FILE = "vectors.f32"
+# Vectors scored at a time by a filtered search of an index that cannot apply the filter itself.
+EXACT_SEARCH_CHUNK = 65536
+
+FAISS_METRICS = {
+    DistanceMetric.L2: faiss.METRIC_L2,
+    DistanceMetric.INNER_PRODUCT: faiss.METRIC_INNER_PRODUCT,
+    DistanceMetric.COSINE: faiss.METRIC_INNER_PRODUCT
+}
+
+
+class NormalizedEmbeddings(Embeddings):
+    """Wraps an embedding model so every vector has unit length; inner product then equals cosine similarity."""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    @staticmethod
+    def _normalize(vectors: List[List[float]]) -> List[List[float]]:
+        array = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(array, axis=1, keepdims=True)
+        return (array / np.where(norms == 0, 1, norms)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._normalize(self.embeddings.embed_documents(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._normalize([self.embeddings.embed_query(text)])[0]
 
 
 class FAISSStore(IDocumentStore):
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, search_config: Optional[dict] = None,
+                 index_paths: Optional[Dict[DocumentType, str]] = None, embeddings: Optional[Embeddings] = None,
+                 read_only: bool = False):
         """
         Initialize a FAISS-based document store.
 
+        Each document type has its own folder holding a plain FAISS index (index.faiss) and a SQLite
+        document table (documents.sqlite) with the text and metadata of every vector, keyed by its
+        position in the index. Only the rows of the hits of a query are read from the table.
+
+        Persistent indexes are versioned (see IndexSnapshots): the store loads the version the folder's
+        CURRENT file names, and its first write copies that version into a new one, which save()
+        publishes. A server in another process picks the new version up with is_stale() and reopen().
+
         The config should include:
           - params.embedding_model: embedding model name.
           - params.persistent: whether to persist the index.
-          - params.hotel_index_path: path for hotel info index.
-          - params.reviews_index_path: path for reviews index.
+          - params.rrf_k: reciprocal rank fusion constant.
+          - params.snapshots_to_keep: published index versions kept on disk.
+
+        search_config holds the per-document-type search settings (see SearchSettings): k, fetch_k,
+        mmr_lambda, score_threshold, the distance metric the index is built with, and the vector
+        compression (none, fp16, int8 or pq) of the index.
+
+        index_paths overrides the index folder of each document type, and embeddings lets several
+        stores share one embedding model; ShardedFAISSStore uses both for its shards.
+
+        read_only opens the published versions for searching only: nothing but the leases keeping them
+        from being deleted is written to disk, a document type without a published index is empty, and
+        writes raise a RuntimeError.
         """
         self.config = config
+        self.search_config = search_config
         self.params = config.get("params", {})
         self.embedding_model = self.params.get("embedding_model", "paraphrase-multilingual-mpnet-base-v2")
         self.persistent = self.params.get("persistent", True)
-
+        self.rrf_k = self.params.get("rrf_k", 60)
+        self.read_only = read_only
 
         # Use separate index paths for each document type.
-        self.index_paths = {
+        self.index_paths = index_paths or {
             DocumentType.HOTEL_INFO: str(PathUtil.construct_path(PathUtil.get_project_base_path(), 'data','embedding_index', 'faiss_hotel_info_index')),
             DocumentType.HOTEL_REVIEW: str(PathUtil.construct_path(PathUtil.get_project_base_path(), 'data','embedding_index', 'faiss_hotel_review_index'))
         }
-        self.embeddings = HuggingFaceEmbeddings(model_name=self.embedding_model)
-        # Create a FAISS vectorstore per document type.
-        self.vectorstores = {
-            doc_type: self._initialize_store(self.index_paths[doc_type])
+        self.snapshots = {
+            doc_type: IndexSnapshots(path, keep=self.params.get("snapshots_to_keep", 2))
+            for doc_type, path in self.index_paths.items()
+        }
+        # The published version each document type was loaded from (None for an unversioned folder),
+        # and the unpublished version it is being written to, if any.
+        self.versions: Dict[DocumentType, Optional[str]] = {}
+        self._working: Dict[DocumentType, str] = {}
+        # Leases on the versions above, by version, keeping them from being deleted while they are in use.
+        self._leases: Dict[DocumentType, Dict[str, str]] = {doc_type: {} for doc_type in DocumentType}
+        # Vector ids of deleted documents, removed from the index when it is next saved.
+        self._deleted: Dict[DocumentType, Set[int]] = {}
+        self.search_settings: Dict[DocumentType, SearchSettings] = {
+            doc_type: SearchSettings(**(search_config or {}).get(doc_type.value, {}))
+            for doc_type in DocumentType
+        }
+        self.embeddings = embeddings or HuggingFaceEmbeddings(model_name=self.embedding_model)
+        self._dimension: Optional[int] = None
+        # The distance metric each index was actually built with, and the embeddings matching it.
+        self.metrics: Dict[DocumentType, DistanceMetric] = {}
+        self.embedders: Dict[DocumentType, Embeddings] = {}
+        # A FAISS index and a document table per document type.
+        self.indexes: Dict[DocumentType, faiss.Index] = {}
+        self.tables: Dict[DocumentType, DocumentTable] = {}
+        # Original vectors of compressed indexes (None for uncompressed ones), kept on disk.
+        self.raw_vectors: Dict[DocumentType, Optional[RawVectorStore]] = {}
+        for doc_type in DocumentType:
+            self._initialize_store(doc_type)
+        # BM25 keyword indexes over the same vector ids, for hybrid search.
+        self.lexical_indexes = {
+            doc_type: self._load_lexical_index(doc_type)
             for doc_type in DocumentType
         }
+        for doc_type in DocumentType:
+            self.raw_vectors[doc_type] = self._load_raw_vectors(doc_type)
+        for doc_type in DocumentType:
+            # Publish new empty indexes, indexes rebuilt with the configured compression and repaired copies.
+            if not self.read_only and (self._apply_compression(doc_type) or doc_type in self._working) \
+                    and self.persistent:
+                self.save(doc_type)
+        # Number of vectors each document type had when its open batch started.
+        self._batches: Dict[DocumentType, int] = {}
+
+    def _initialize_store(self, doc_type: DocumentType) -> None:
+        """
+        Open the FAISS index and document table of a document type.
+        If persistent mode is enabled and an index exists at index_path, load it; an index saved by
+        LangChain's FAISS wrapper has its pickled docstore migrated into the document table first.
+        A document table created before documents had keys is keyed (see _migrate_document_keys), and
+        one created before the filter columns gets them. Otherwise, create a new empty index.
 
-    def _initialize_store(self, index_path: str) -> FAISS:
+        The distance metric of an existing index is read from its meta file (indexes saved without one
+        are L2). Vectors cannot be converted to another metric, so a configured metric that differs from
+        the stored one only takes effect after the index is cleared and re-ingested.
         """
-        Initialize the FAISS vector store.
-        If persistent mode is enabled and an index exists at index_path, load it.
-        Otherwise, create a new index using a dummy entry.
+        self.versions[doc_type] = self.snapshots[doc_type].current() if self.persistent else None
+        self._update_leases(doc_type)
+        index_path = self._data_path(doc_type)
+        metric = DistanceMetric(self.search_settings[doc_type].metric)
+        if self.persistent and os.path.exists(os.path.join(index_path, FAISS_INDEX_FILE)):
+            stored_metric = self._read_metric(index_path)
+            if stored_metric != metric:
+                logging.warning(f"{index_path} was built with the {stored_metric.value} metric, not the configured "
+                                f"{metric.value}; clear and re-ingest it to change the metric.")
+            self._set_metric(doc_type, stored_metric)
+            self.indexes[doc_type] = faiss.read_index(os.path.join(index_path, FAISS_INDEX_FILE))
+            self.tables[doc_type] = DocumentTable(os.path.join(index_path, DOCUMENT_TABLE_FILE), read_only=self.read_only)
+            schema_version = self.tables[doc_type].schema_version
+            migrate_keys = schema_version < DOCUMENT_KEYS_VERSION
+            if os.path.exists(os.path.join(index_path, LANGCHAIN_DOCSTORE_FILE)):
+                self._migrate_langchain_docstore(doc_type)
+                # The migrated documents predate document keys too.
+                migrate_keys = True
+            self._reconcile(doc_type)
+            if self.read_only:
+                # Searches work on older tables too; they are upgraded by the next writer.
+                return
+            if migrate_keys:
+                self._migrate_document_keys(doc_type)
+            if schema_version < SCHEMA_VERSION:
+                self._migrate_filter_columns(doc_type)
+        else:
+            self._create_empty(doc_type, metric)
+
+    def _create_empty(self, doc_type: DocumentType, metric: DistanceMetric) -> None:
         """
-        if self.persistent and index_path and os.path.exists(index_path):
-            return FAISS.load_local(index_path, self.embeddings, allow_dangerous_deserialization=True)
+        Create an empty index and document table, in a new unpublished version when persistent. A
+        read-only store keeps them in memory.
+        """
+        self._set_metric(doc_type, metric)
+        self.indexes[doc_type] = VectorCompression.NONE.build_index(self._embedding_dimension(), FAISS_METRICS[metric])
+        if self.persistent and not self.read_only:
+            self._working[doc_type] = self.snapshots[doc_type].create()
+            self._update_leases(doc_type)
+            self.tables[doc_type] = DocumentTable(os.path.join(self._data_path(doc_type), DOCUMENT_TABLE_FILE))
         else:
-            dummy_texts = ["dummy"]
-            dummy_embeddings = self.embeddings.embed_documents(dummy_texts)
-            if not dummy_embeddings:
+            self.tables[doc_type] = DocumentTable()
+
+    def _data_path(self, doc_type: DocumentType) -> str:
+        """The folder the files of a document type are read from and written to: its unpublished or loaded version."""
+        return self.snapshots[doc_type].path(self._working.get(doc_type, self.versions.get(doc_type)))
+
+    def _begin_write(self, doc_type: DocumentType) -> None:
+        """
+        Copy the loaded version of a document type into a new unpublished version and switch the document
+        table and the original vectors to the copies, unless that already happened. Published versions are
+        never modified, so readers of them are not disturbed.
+        """
+        self._check_writable(doc_type)
+        if not self.persistent or doc_type in self._working:
+            return
+        source = self._data_path(doc_type)
+        self._working[doc_type] = self.snapshots[doc_type].create()
+        self._update_leases(doc_type)
+        target = self._data_path(doc_type)
+        self.tables[doc_type].copy_to(os.path.join(target, DOCUMENT_TABLE_FILE))
+        self.tables[doc_type].close()
+        self.tables[doc_type] = DocumentTable(os.path.join(target, DOCUMENT_TABLE_FILE))
+        if os.path.exists(os.path.join(source, RAW_VECTORS_FILE)):
+            shutil.copyfile(os.path.join(source, RAW_VECTORS_FILE), os.path.join(target, RAW_VECTORS_FILE))
+        if self.raw_vectors.get(doc_type) is not None:
+            self.raw_vectors[doc_type] = RawVectorStore(os.path.join(target, RAW_VECTORS_FILE), self.indexes[doc_type].d)
+
+    def _update_leases(self, doc_type: DocumentType) -> None:
+        """Lease the versions a document type is read from and written to, and release the ones it no longer uses."""
+        if not self.persistent:
+            return
+        in_use = {version for version in (self.versions[doc_type], self._working.get(doc_type)) if version}
+        leases = self._leases[doc_type]
+        for version in set(leases) - in_use:
+            self.snapshots[doc_type].release(leases.pop(version))
+        for version in in_use - set(leases):
+            lease = self.snapshots[doc_type].lease(version)
+            if lease is not None:
+                leases[version] = lease
+
+    def _check_writable(self, doc_type: DocumentType) -> None:
+        if self.read_only:
+            raise RuntimeError(f"The {doc_type.value} index is open read-only.")
+
+    def _set_metric(self, doc_type: DocumentType, metric: DistanceMetric) -> None:
+        self.metrics[doc_type] = metric
+        # Cosine similarity is the inner product of unit-length vectors.
+        self.embedders[doc_type] = NormalizedEmbeddings(self.embeddings) if metric is DistanceMetric.COSINE \
+            else self.embeddings
+
+    def _embedding_dimension(self) -> int:
+        if self._dimension is None:
+            embedding = self.embeddings.embed_query("dimension")
+            if not embedding:
                 raise ValueError("Embedding model returned empty embeddings.")
-            dummy_embeddings = np.array(dummy_embeddings)
-            data_store = FAISS.from_embeddings(list(zip(dummy_texts, dummy_embeddings)), self.embeddings)
-            if self.persistent and index_path:
-                data_store.save_local(folder_path=index_path, index_name="index")
-            return data_store
+            self._dimension = len(embedding)
+        return self._dimension
+
+    def _migrate_langchain_docstore(self, doc_type: DocumentType) -> None:
+        """
+        Copy the texts and metadata of an index saved by LangChain's FAISS wrapper from its pickled
+        docstore into a new version of the document table. Runs once per index: the unversioned
+        files, the pickle included, are deleted once that version is published.
+        """
+        pickle_path = os.path.join(self._data_path(doc_type), LANGCHAIN_DOCSTORE_FILE)
+        logging.info(f"Migrating the LangChain docstore {pickle_path} into the document table.")
+        self._begin_write(doc_type)
+        with open(pickle_path, 'rb') as f:
+            # Trusted file: written by this store before the document table existed.
+            docstore, index_to_docstore_id = pickle.load(f)
+        table = self.tables[doc_type]
+        table.truncate(0)
+        # The wrapper numbers its vectors 0..n-1, in index order.
+        docs = [docstore.search(index_to_docstore_id[vector_id]) for vector_id in range(len(index_to_docstore_id))]
+        table.add(0, [Document(content=doc.page_content, metadata=doc.metadata) for doc in docs])
+        table.commit()
+        logging.info(f"Migrated {len(index_to_docstore_id)} documents of the {doc_type.value} index.")
+
+    def _migrate_document_keys(self, doc_type: DocumentType) -> None:
+        """
+        Key the rows of a document table created before documents had keys with the keys ingestion
+        assigns (see scripts.hotel_preparer), in a new version: the hotel id for hotel info and
+        "<hotel id>_<review id>" for a review. Reviews stored as one document per hotel have no review
+        id and could never be replaced, so they are deleted; the next ingest adds them one by one.
+        """
+        self._begin_write(doc_type)
+        table = self.tables[doc_type]
+        keys, unkeyed_ids = [], []
+        for vector_id, doc in table.iter_all():
+            key = self._legacy_document_key(doc_type, doc.metadata)
+            if key is None:
+                unkeyed_ids.append(vector_id)
+            else:
+                keys.append((vector_id, key))
+        table.add_document_keys(keys)
+        if unkeyed_ids:
+            table.delete(unkeyed_ids)
+            self._deleted.setdefault(doc_type, set()).update(unkeyed_ids)
+        logging.info(f"Added document keys to {len(keys)} documents of the {doc_type.value} index and deleted "
+                     f"{len(unkeyed_ids)} per-hotel review documents.")
+
+    def _migrate_filter_columns(self, doc_type: DocumentType) -> None:
+        """Add the filter columns to a document table created before they existed, in a new version."""
+        self._begin_write(doc_type)
+        self.tables[doc_type].add_filter_columns()
+        logging.info(f"Added filter columns to the {doc_type.value} document table.")
+
+    @staticmethod
+    def _legacy_document_key(doc_type: DocumentType, metadata: dict) -> Optional[str]:
+        hotel_id = metadata.get("hotel_source_id")
+        if doc_type is DocumentType.HOTEL_REVIEW:
+            review_id = metadata.get("review_id")
+            return None if review_id is None else f"{hotel_id}_{review_id}"
+        return str(hotel_id)
+
+    def _reconcile(self, doc_type: DocumentType) -> None:
+        """
+        Make the index and the document table cover the same vector ids after a run that stopped
+        between writing one and the other: whichever has extra trailing vectors drops them. A read-only
+        store leaves extra rows on disk, since no vector id leads to them.
+        """
+        index, table = self.indexes[doc_type], self.tables[doc_type]
+        rows = len(table)
+        if rows > index.ntotal and not self.read_only:
+            self._begin_write(doc_type)
+            table = self.tables[doc_type]
+            table.truncate(index.ntotal)
+            table.commit()
+            logging.warning(f"Dropped {rows - index.ntotal} document rows without vectors from the {doc_type.value} table.")
+        elif rows < index.ntotal:
+            logging.warning(f"Dropped {index.ntotal - rows} vectors without documents from the {doc_type.value} index.")
+            index.remove_ids(faiss.IDSelectorRange(rows, index.ntotal))
+
+    def _write_index(self, doc_type: DocumentType) -> None:
+        # Written into the unpublished version, so no reader can see it half-written.
+        index_path = self._data_path(doc_type)
+        faiss.write_index(self.indexes[doc_type], os.path.join(index_path, FAISS_INDEX_FILE))
+        self._write_metric(index_path, self.metrics[doc_type])
+
+    @staticmethod
+    def _read_metric(index_path: str) -> DistanceMetric:
+        meta_path = os.path.join(index_path, INDEX_META_FILE)
+        if not os.path.exists(meta_path):
+            return DistanceMetric.L2
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return DistanceMetric(json.load(f).get("metric", DistanceMetric.L2.value))
+
+    @staticmethod
+    def _write_metric(index_path: str, metric: DistanceMetric) -> None:
+        with open(os.path.join(index_path, INDEX_META_FILE), 'w', encoding='utf-8') as f:
+            json.dump({"metric": metric.value}, f)
+
+    def _load_lexical_index(self, doc_type: DocumentType) -> BM25Index:
+        """
+        Load the BM25 index saved next to the FAISS index. It is rebuilt from the document table when it
+        is missing (an index saved before hybrid search existed) or does not cover every vector; the
+        rebuilt index is saved with the next version.
+        """
+        bm25_path = os.path.join(self._data_path(doc_type), BM25_INDEX_FILE)
+        if self.persistent and os.path.exists(bm25_path):
+            lexical_index = BM25Index.load(bm25_path)
+            if lexical_index.size == self.indexes[doc_type].ntotal:
+                return lexical_index
+            logging.info(f"BM25 index {bm25_path} is out of date, rebuilding it.")
+        return self._build_lexical_index(self.tables[doc_type])
+
+    @staticmethod
+    def _build_lexical_index(table: DocumentTable) -> BM25Index:
+        """Index the text of every stored document by its FAISS vector id."""
+        lexical_index = BM25Index()
+        for vector_id, doc in table.iter_all():
+            lexical_index.add(vector_id, doc.content)
+        return lexical_index
+
+    def _load_raw_vectors(self, doc_type: DocumentType) -> Optional[RawVectorStore]:
+        """
+        Open the original vectors of a compressed index. Rows missing from the file (an index that was
+        uncompressed until now, or vectors added by a run that crashed before saving) are recovered from
+        the index itself, into a new version; rows beyond the index are dropped.
+        """
+        index = self.indexes[doc_type]
+        if VectorCompression(self.search_settings[doc_type].compression) is VectorCompression.NONE:
+            # A file left by an earlier compressed index is not copied into new versions.
+            return None
+
+        raw_path = os.path.join(self._data_path(doc_type), RAW_VECTORS_FILE)
+        raw_vectors = RawVectorStore(raw_path if self.persistent else None, index.d)
+        if len(raw_vectors) != index.ntotal and self.persistent and doc_type not in self._working:
+            if self.read_only:
+                logging.warning(f"Original vectors of the {doc_type.value} index do not match it; "
+                                f"searching it without re-scoring.")
+                return None
+            self._begin_write(doc_type)
+            raw_vectors = RawVectorStore(os.path.join(self._data_path(doc_type), RAW_VECTORS_FILE), index.d)
+        if len(raw_vectors) > index.ntotal:
+            raw_vectors.truncate(index.ntotal)
+        elif len(raw_vectors) < index.ntotal:
+            if VectorCompression.of(index) is not VectorCompression.NONE:
+                logging.warning(f"Original vectors of the {doc_type.value} index are missing; "
+                                f"re-scoring will use the decompressed vectors.")
+            start = len(raw_vectors)
+            raw_vectors.append(index.reconstruct_n(start, index.ntotal - start))
+        return raw_vectors
+
+    def _apply_compression(self, doc_type: DocumentType) -> bool:
+        """
+        Rebuild the index of a document type with its configured compression, from the original vectors,
+        once enough vectors exist to train the quantizer. Until then the index stays exact.
+
+        Returns:
+            bool: Whether the index was rebuilt.
+        """
+        settings = self.search_settings[doc_type]
+        compression = VectorCompression(settings.compression)
+        raw_vectors = self.raw_vectors[doc_type]
+        if VectorCompression.of(self.indexes[doc_type]) is compression:
+            return False
+        if compression is VectorCompression.NONE:
+            # Decompressing without the original vectors would keep the quantization error.
+            return False
+        training_vectors = compression.min_training_vectors(settings.train_size)
+        if len(raw_vectors) < training_vectors:
+            return False
+
+        index = compression.build_index(self.indexes[doc_type].d, self.indexes[doc_type].metric_type, settings.pq_m)
+        if not index.is_trained:
+            index.train(raw_vectors.sample(training_vectors))
+        for chunk in raw_vectors.iter_chunks():
+            index.add(chunk)
+        self.indexes[doc_type] = index
+        logging.info(f"Rebuilt the {doc_type.value} index with {compression.value} compression "
+                     f"({index.ntotal} vectors).")
+        return True
 
     def add_documents(self, docs: List[Document], doc_type: DocumentType) -> None:
         """
         Add a list of Document objects to the FAISS store for the given document type.
         """
         if docs:
-            vectorstore = self.vectorstores[doc_type]
+            self._begin_write(doc_type)
             texts = [doc.content for doc in docs]
-            metadatas = [doc.metadata for doc in docs]
-            # FAISS.add_texts will generate embeddings internally using self.embeddings.
-            vectorstore.add_texts(texts, metadatas=metadatas)
-            if self.persistent:
+            first_vector_id = self.indexes[doc_type].ntotal
+            embeddings = np.asarray(self.embedders[doc_type].embed_documents(texts), dtype=np.float32)
+            self.indexes[doc_type].add(embeddings)
+            self.tables[doc_type].add(first_vector_id, docs)
+            if self.raw_vectors[doc_type] is not None:
+                self.raw_vectors[doc_type].append(embeddings)
+                self._apply_compression(doc_type)
+            lexical_index = self.lexical_indexes[doc_type]
+            for offset, text in enumerate(texts):
+                lexical_index.add(first_vector_id + offset, text)
+            if doc_type not in self._batches:
+                self.save(doc_type)
+
+    def delete_documents(self, keys: Iterable[str], doc_type: DocumentType) -> None:
+        """
+        Remove the chunks of the documents with the given keys. Their rows leave the document table
+        right away; their vectors and BM25 postings go when the index is saved,
+        which renumbers the remaining vectors (see _compact).
+        """
+        vector_ids = self.tables[doc_type].ids_of_keys(keys)
+        if not vector_ids:
+            return
+        self._begin_write(doc_type)
+        self.tables[doc_type].delete(vector_ids)
+        self._deleted.setdefault(doc_type, set()).update(vector_ids)
+        if doc_type not in self._batches:
+            self.save(doc_type)
+
+    def _compact(self, doc_type: DocumentType) -> None:
+        """
+        Remove the vectors of the deleted documents. FAISS renumbers the remaining vectors of these
+        flat indexes to consecutive ids in the same order, and the document table, original vectors
+        and BM25 index are renumbered the same way.
+        """
+        deleted = self._deleted.pop(doc_type, None)
+        if not deleted:
+            return
+        deleted_ids = np.array(sorted(deleted), dtype=np.int64)
+        self.indexes[doc_type].remove_ids(faiss.IDSelectorBatch(deleted_ids.size, faiss.swig_ptr(deleted_ids)))
+        self.tables[doc_type].compact()
+        if self.raw_vectors[doc_type] is not None:
+            self.raw_vectors[doc_type].remove(deleted_ids)
+        self.lexical_indexes[doc_type].remove(deleted_ids)
+        logging.info(f"Removed {deleted_ids.size} deleted documents from the {doc_type.value} index.")
+
+    @contextmanager
+    def batch(self, doc_type: DocumentType):
+        """
+        Defer saving the index and committing the document table until the block exits, so the block
+        is published as one version. If the block or the save fails, its additions and deletions are
+        undone: a persistent store loads its published version again, and an in-memory store removes
+        the documents added inside the block.
+        """
+        start = self.indexes[doc_type].ntotal
+        self._batches[doc_type] = start
+        try:
+            yield self
+            if self.indexes[doc_type].ntotal > start or doc_type in self._working:
                 self.save(doc_type)
+        except BaseException:
+            if self.persistent:
+                self._reload(doc_type)
+            else:
+                self._rollback(doc_type, start)
+            raise
+        finally:
+            del self._batches[doc_type]
+
+    def _reload(self, doc_type: DocumentType) -> None:
+        """Discard the unpublished version of a document type and load its published version again."""
+        self.tables[doc_type].close()
+        if doc_type in self._working:
+            self.snapshots[doc_type].discard(self._working.pop(doc_type))
+        self._deleted.pop(doc_type, None)
+        self._initialize_store(doc_type)
+        self.lexical_indexes[doc_type] = self._load_lexical_index(doc_type)
+        self.raw_vectors[doc_type] = self._load_raw_vectors(doc_type)
+        logging.info(f"Rolled the {doc_type.value} index back to its published version.")
+
+    def _rollback(self, doc_type: DocumentType, start: int) -> None:
+        """Remove the documents added after the index held start vectors, and undo the deletions since."""
+        self.tables[doc_type].rollback()
+        self._deleted.pop(doc_type, None)
+        # The save may have committed the rows before failing.
+        self.tables[doc_type].truncate(start)
+        self.tables[doc_type].commit()
+        added = self.indexes[doc_type].ntotal - start
+        if added:
+            # The added vectors are the last ones, so the ids of the others do not change.
+            self.indexes[doc_type].remove_ids(faiss.IDSelectorRange(start, self.indexes[doc_type].ntotal))
+            if self.raw_vectors[doc_type] is not None:
+                self.raw_vectors[doc_type].truncate(start)
+            # BM25 postings cannot be removed, so the BM25 index is rebuilt from the table.
+            self.lexical_indexes[doc_type] = self._build_lexical_index(self.tables[doc_type])
+            logging.info(f"Rolled back {added} documents from the {doc_type.value} index.")
 
     def save(self, doc_type: DocumentType) -> None:
-        """Save the FAISS index for the specified document type to disk."""
+        """
+        Remove the deleted documents and commit the document table, then write the FAISS index and its
+        BM25 index for the specified document type into a new version and publish it. A run that stops
+        before publishing leaves the previous version in place.
+        """
+        self._compact(doc_type)
+        self.tables[doc_type].commit()
         if self.persistent:
-            index_path = self.index_paths[doc_type]
-            self.vectorstores[doc_type].save_local(index_path)
+            self._begin_write(doc_type)
+            self.tables[doc_type].checkpoint()
+            self._write_index(doc_type)
+            self.lexical_indexes[doc_type].save(os.path.join(self._data_path(doc_type), BM25_INDEX_FILE))
+            version = self._working[doc_type]
+            self.snapshots[doc_type].publish(version)
+            self.versions[doc_type] = version
+            del self._working[doc_type]
+            self._update_leases(doc_type)
+            self._remove_unversioned_files(doc_type)
         else:
             logging.info("Persistent mode disabled, not saving index.")
 
-    def search(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO) -> List[Document]:
+    def _remove_unversioned_files(self, doc_type: DocumentType) -> None:
+        """Delete the files of an index saved before versioning, once a version has replaced them."""
+        index_path = self.index_paths[doc_type]
+        for name in (FAISS_INDEX_FILE, f"{FAISS_INDEX_FILE}.tmp", DOCUMENT_TABLE_FILE, f"{DOCUMENT_TABLE_FILE}-wal",
+                     f"{DOCUMENT_TABLE_FILE}-shm", LANGCHAIN_DOCSTORE_FILE, BM25_INDEX_FILE, INDEX_META_FILE,
+                     RAW_VECTORS_FILE):
+            path = os.path.join(index_path, name)
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def is_stale(self) -> bool:
+        """Whether a newer version of any index was published, e.g. by an ingest in another process."""
+        return self.persistent and any(self.snapshots[doc_type].current() != self.versions[doc_type]
+                                       for doc_type in DocumentType)
+
+    def reopen(self) -> 'FAISSStore':
+        """A new store on the same folders, loading their published versions."""
+        return FAISSStore(self.config, self.search_config, index_paths=self.index_paths, embeddings=self.embeddings,
+                          read_only=self.read_only)
+
+    @traced("store.search", count_result=True)
+    def search(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO,
+               metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
         """Search the FAISS store for a query and return relevant documents."""
-        vectorstore = self.vectorstores[doc_type]
-        results = vectorstore.similarity_search(query, k=k)
-        return [Document(content=doc.page_content, metadata=doc.metadata) for doc in results]
+        current_span().set("doc_type", doc_type.value)
+        return [doc for doc, _ in self.search_with_scores(query, k, doc_type, metadata_filter)]
+
+    def search_with_scores(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO,
+                           metadata_filter: Optional[MetadataFilter] = None,
+                           query_embedding: Optional[List[float]] = None) -> List[Tuple[Document, float]]:
+        """
+        Search the FAISS store and return (document, score) pairs, best first. The score is the L2
+        distance for L2 indexes and the inner product (cosine similarity) otherwise.
+
+        A metadata filter is resolved to the matching vector ids by the document table and
+        passed to FAISS as an id selector, so vectors outside the filter are never scored. The
+        document type's search settings then apply: results beyond score_threshold are dropped, and
+        with mmr_lambda set, k diverse results are picked from the fetch_k nearest by MMR.
+
+        query_embedding is the query already embedded by self.embeddings, to skip embedding it again.
+        """
+        settings = self.search_settings[doc_type]
+        allowed_ids = self._allowed_ids(doc_type, metadata_filter)
+        if allowed_ids is not None and allowed_ids.size == 0:
+            return []
+        query_vector = self._embed_query(query, doc_type, query_embedding)
+        fetch_k = max(k, settings.fetch_k) if settings.mmr_lambda is not None else k
+        vector_ids, scores = self._dense_search(query_vector, fetch_k, doc_type, allowed_ids)
+        keep = vector_ids != -1
+        if settings.score_threshold is not None:
+            if self.metrics[doc_type] is DistanceMetric.L2:
+                keep &= scores <= settings.score_threshold
+            else:
+                keep &= scores >= settings.score_threshold
+        vector_ids, scores = vector_ids[keep], scores[keep]
 
-    def get_retriever(self, doc_type: DocumentType) -> BaseRetriever:
-        """Return a retriever instance for the specified document type."""
-        vectorstore = self.vectorstores[doc_type]
-        return vectorstore.as_retriever(search_kwargs={"k": 10, "distance_metric": "cosine"})
+        if settings.mmr_lambda is not None and len(vector_ids) > k:
+            candidates = self._vectors(doc_type, vector_ids)
+            selected = maximal_marginal_relevance(query_vector[0], list(candidates), settings.mmr_lambda, k)
+            vector_ids, scores = vector_ids[selected], scores[selected]
+        return self._hydrate(doc_type, vector_ids[:k], scores[:k])
+
+    @traced("store.hybrid_search", count_result=True)
+    def hybrid_search(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO,
+                      metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
+        """
+        Search the FAISS index and the BM25 index and fuse the two rankings with reciprocal rank fusion.
+        Keyword matching recovers exact hotel and street names the embeddings rank poorly.
+        """
+        current_span().set("doc_type", doc_type.value)
+        return [doc for doc, _ in self.hybrid_search_with_scores(query, k, doc_type, metadata_filter)]
+
+    def hybrid_search_with_scores(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO,
+                                  metadata_filter: Optional[MetadataFilter] = None,
+                                  query_embedding: Optional[List[float]] = None) -> List[Tuple[Document, float]]:
+        """Hybrid search returning (document, fused score) pairs, best first."""
+        fetch_k = max(k, self.search_settings[doc_type].fetch_k)
+        dense, lexical = self.hybrid_candidates(query, fetch_k, doc_type, metadata_filter, query_embedding)
+        fused = RankFusion.reciprocal_rank_fusion([[i for i, _ in dense], [i for i, _ in lexical]], k=self.rrf_k)[:k]
+        return self._hydrate(doc_type, [i for i, _ in fused], [score for _, score in fused])
+
+    def hybrid_candidates(self, query: str, fetch_k: int, doc_type: DocumentType = DocumentType.HOTEL_INFO,
+                          metadata_filter: Optional[MetadataFilter] = None,
+                          query_embedding: Optional[List[float]] = None,
+                          lexical_statistics: Optional[BM25Statistics] = None
+                          ) -> Tuple[List[Tuple[int, float]], List[Tuple[int, float]]]:
+        """
+        The two rankings hybrid search fuses: the fetch_k best (vector id, score) pairs of the dense
+        search (distances for L2 indexes, similarities otherwise) and of the BM25 search, best first.
+        lexical_statistics replaces the BM25 index's own corpus statistics (see BM25Index.search).
+        """
+        allowed_ids = self._allowed_ids(doc_type, metadata_filter)
+        if allowed_ids is not None and allowed_ids.size == 0:
+            return [], []
+        dense_ids, dense_scores = self._dense_search(self._embed_query(query, doc_type, query_embedding), fetch_k,
+                                                     doc_type, allowed_ids)
+        dense = [(int(i), float(score)) for i, score in zip(dense_ids, dense_scores) if i != -1]
+        return dense, self.lexical_indexes[doc_type].search(query, fetch_k, allowed_ids, lexical_statistics)
+
+    def _allowed_ids(self, doc_type: DocumentType, metadata_filter: Optional[MetadataFilter]) -> Optional[np.ndarray]:
+        """Resolve a metadata filter to the ids of the matching vectors; None when there is no filter."""
+        if not metadata_filter:
+            return None
+        return np.array(self.tables[doc_type].select(metadata_filter), dtype=np.int64)
+
+    def _embed_query(self, query: str, doc_type: DocumentType,
+                     query_embedding: Optional[List[float]] = None) -> np.ndarray:
+        """
+        Embed the query the same way the vectors of the document type were embedded (normalized for cosine).
+        A query_embedding computed by self.embeddings is reused instead of embedding the query again.
+        """
+        if query_embedding is None:
+            with span("store.embed_query"):
+                return np.array([self.embedders[doc_type].embed_query(query)], dtype=np.float32)
+        if self.metrics[doc_type] is DistanceMetric.COSINE:
+            return np.array(NormalizedEmbeddings._normalize([query_embedding]), dtype=np.float32)
+        return np.array([query_embedding], dtype=np.float32)
+
+    def _dense_search(self, query_vector: np.ndarray, k: int, doc_type: DocumentType,
+                      allowed_ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the ids and scores of the k nearest vectors, restricted to allowed_ids when given.
+        A compressed index is searched for rescore_factor * k candidates, which are then re-scored
+        exactly against their original vectors. An index that cannot be searched with an id selector
+        (PQ) has the allowed ids scored exactly instead.
+        """
+        index = self.indexes[doc_type]
+        if allowed_ids is not None and not VectorCompression.of(index).supports_id_selector():
+            return self._exact_search(query_vector[0], allowed_ids, doc_type, k)
+        rescore = self.raw_vectors[doc_type] is not None and VectorCompression.of(index) is not VectorCompression.NONE
+        search_k = k * self.search_settings[doc_type].rescore_factor if rescore else k
+        search_params = None
+        if allowed_ids is not None:
+            search_params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(allowed_ids.size, faiss.swig_ptr(allowed_ids)))
+            search_k = min(search_k, int(allowed_ids.size))
+        distances, vector_ids = index.search(query_vector, search_k, params=search_params)
+        if rescore:
+            return self._rescore(query_vector[0], vector_ids[0], doc_type, k)
+        return vector_ids[0], distances[0]
+
+    def _exact_search(self, query_vector: np.ndarray, vector_ids: np.ndarray, doc_type: DocumentType,
+                      k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Score the given ids exactly against their stored vectors, a chunk at a time, and keep the best k."""
+        best_ids, best_scores = vector_ids[:0], np.empty(0, dtype=np.float32)
+        for start in range(0, len(vector_ids), EXACT_SEARCH_CHUNK):
+            candidates = np.concatenate([best_ids, vector_ids[start:start + EXACT_SEARCH_CHUNK]])
+            best_ids, best_scores = self._rescore(query_vector, candidates, doc_type, k)
+        return best_ids, best_scores
+
+    def _rescore(self, query_vector: np.ndarray, vector_ids: np.ndarray, doc_type: DocumentType,
+                 k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Order candidate ids by their exact score against the stored vectors and keep the best k."""
+        vector_ids = vector_ids[vector_ids != -1]
+        vectors = self._vectors(doc_type, vector_ids)
+        if self.metrics[doc_type] is DistanceMetric.L2:
+            # Squared distances, like the ones FAISS returns.
+            scores = ((vectors - query_vector) ** 2).sum(axis=1)
+            order = np.argsort(scores, kind="stable")[:k]
+        else:
+            scores = vectors @ query_vector
+            order = np.argsort(-scores, kind="stable")[:k]
+        return vector_ids[order], scores[order]
+
+    def _vectors(self, doc_type: DocumentType, vector_ids: np.ndarray) -> np.ndarray:
+        """Return the stored vectors of the given ids, exact even when the index is compressed."""
+        if self.raw_vectors[doc_type] is not None:
+            return self.raw_vectors[doc_type].get(vector_ids)
+        return self.indexes[doc_type].reconstruct_batch(vector_ids)
+
+    def _hydrate(self, doc_type: DocumentType, vector_ids, scores) -> List[Tuple[Document, float]]:
+        """Read the documents of the given FAISS vector ids from the document table, in the given order."""
+        vector_ids = [int(vector_id) for vector_id in vector_ids]
+        documents = self.tables[doc_type].get(vector_id for vector_id in vector_ids if vector_id != -1)
+        return [(documents[vector_id], float(score)) for vector_id, score in zip(vector_ids, scores)
+                if vector_id in documents]
+
+    def get_retriever(self, doc_type: DocumentType, metadata_filter: Optional[MetadataFilter] = None,
+                      mode: RetrievalMode = RetrievalMode.DENSE, k: Optional[int] = None) -> BaseRetriever:
+        """
+        Return a retriever instance returning the k best documents of the specified document type.
+        k defaults to the document type's search settings.
+        """
+        return DocumentStoreRetriever(document_store=self, doc_type=doc_type, k=k or self.search_settings[doc_type].k,
+                                      metadata_filter=metadata_filter, mode=mode)
 
     def clear(self, doc_type: DocumentType) -> None:
-        """Clear the FAISS index for the specified document type (in-memory and on disk)."""
-        index_path = self.index_paths[doc_type]
-        self.vectorstores[doc_type] = FAISS.from_texts([], self.embeddings)
-        if self.persistent and os.path.exists(index_path):
-            os.remove(index_path)
-            logging.info(f"Index file {index_path} deleted.")
+        """
+        Replace the FAISS index for the specified document type with an empty one, which uses the
+        configured distance metric. It is published right away, or with the rest of the open batch,
+        and the older versions are deleted on disk as newer ones are published.
+        """
+        self._check_writable(doc_type)
+        self.tables[doc_type].close()
+        if doc_type in self._working:
+            self.snapshots[doc_type].discard(self._working.pop(doc_type))
+        self._deleted.pop(doc_type, None)
+        self._create_empty(doc_type, DistanceMetric(self.search_settings[doc_type].metric))
+        self.lexical_indexes[doc_type] = BM25Index()
+        self.raw_vectors[doc_type] = self._load_raw_vectors(doc_type)
+        if doc_type not in self._batches:
+            self.save(doc_type)
+        logging.info(f"Cleared the {doc_type.value} index.")
+
+    def close(self) -> None:
+        """
+        Close the document tables, delete unpublished versions and release the leases on the loaded ones;
+        the store is unusable afterwards. A writable store also deletes the old versions it kept in use.
+        """
+        for table in self.tables.values():
+            table.close()
+        for doc_type, version in list(self._working.items()):
+            self.snapshots[doc_type].discard(version)
+            del self._working[doc_type]
+        for doc_type, leases in self._leases.items():
+            for lease in leases.values():
+                self.snapshots[doc_type].release(lease)
+            leases.clear()
+            if self.persistent and not self.read_only:
+                self.snapshots[doc_type].collect_garbage()
 
     def get_type(self) -> DocumentStoreType:
         return DocumentStoreType.FAISS
@@ -0,0 +1,114 @@
+import logging
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Set
+
+from rag.core.interfaces import DocumentType, IDocumentStore, Document, DocumentStoreType, MetadataFilter, \
+    RetrievalMode
+
+if TYPE_CHECKING:
+    from langchain_core.retrievers import BaseRetriever
+
+
+class HotSwapDocumentStore(IDocumentStore):
+    """
+    A document store whose backing store can be replaced while queries are being served.
+
+    Every call is delegated to the current store, so a store opened on a newly published index (see
+    refresh() and scripts.ingest_watcher.IngestionWatcher) takes over with a single reference swap: a
+    search that already started finishes on the store it began on and the next one runs on the new store.
+    A replaced store is closed once the calls still running on it return.
+    Retrievers are bound to this wrapper rather than to the store inside it, so they follow the swaps.
+    """
+
+    def __init__(self, store: IDocumentStore):
+        self._store = store
+        self._lock = threading.Lock()
+        # Calls running on each store, and the replaced stores to close once theirs return.
+        self._calls: Dict[IDocumentStore, int] = {}
+        self._replaced: Set[IDocumentStore] = set()
+
+    @property
+    def current(self) -> IDocumentStore:
+        return self._store
+
+    def swap(self, store: IDocumentStore) -> None:
+        """Serve from store from now on, and close the store it replaces once the calls running on it return."""
+        with self._lock:
+            previous, self._store = self._store, store
+            idle = previous is not store and not self._calls.get(previous)
+            if previous is not store and not idle:
+                self._replaced.add(previous)
+        logging.info(f"Swapped in a new {store.get_type().value} document store.")
+        if idle:
+            previous.close()
+
+    def refresh(self) -> bool:
+        """
+        Swap in a reopened store if a newer index was published since the current store was opened.
+        The replaced store is closed once the searches still running on it finish.
+
+        Returns:
+            bool: Whether a new store was swapped in.
+        """
+        current = self._store
+        if not current.is_stale():
+            return False
+        self.swap(current.reopen())
+        return True
+
+    @contextmanager
+    def _using(self) -> Iterator[IDocumentStore]:
+        """The current store, kept open until the block exits even if it is replaced meanwhile."""
+        with self._lock:
+            store = self._store
+            self._calls[store] = self._calls.get(store, 0) + 1
+        try:
+            yield store
+        finally:
+            with self._lock:
+                self._calls[store] -= 1
+                idle = not self._calls[store]
+                if idle:
+                    del self._calls[store]
+                close = idle and store in self._replaced
+                if close:
+                    self._replaced.discard(store)
+            if close:
+                store.close()
+
+    def add_documents(self, documents: List[Document], doc_type: DocumentType) -> None:
+        with self._using() as store:
+            store.add_documents(documents, doc_type)
+
+    def delete_documents(self, keys: Iterable[str], doc_type: DocumentType) -> None:
+        with self._using() as store:
+            store.delete_documents(keys, doc_type)
+
+    def clear(self, doc_type: DocumentType) -> None:
+        with self._using() as store:
+            store.clear(doc_type)
+
+    def search(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO,
+               metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
+        with self._using() as store:
+            return store.search(query, k=k, doc_type=doc_type, metadata_filter=metadata_filter)
+
+    def hybrid_search(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO,
+                      metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
+        with self._using() as store:
+            return store.hybrid_search(query, k=k, doc_type=doc_type, metadata_filter=metadata_filter)
+
+    def get_retriever(self, doc_type: DocumentType, metadata_filter: Optional[MetadataFilter] = None,
+                      mode: RetrievalMode = RetrievalMode.DENSE, k: Optional[int] = None) -> 'BaseRetriever':
+        """The current store's retriever, rebound to this wrapper so it searches whichever store is current."""
+        retriever = self._store.get_retriever(doc_type, metadata_filter=metadata_filter, mode=mode, k=k)
+        return retriever.model_copy(update={"document_store": self})
+
+    def get_type(self) -> DocumentStoreType:
+        return self._store.get_type()
+
+    @contextmanager
+    def batch(self, doc_type: DocumentType):
+        with self._using() as store, store.batch(doc_type) as batch_store:
+            yield batch_store
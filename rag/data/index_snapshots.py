@@ -0,0 +1,173 @@
+import itertools
+import logging
+import os
+import re
+import shutil
+import time
+from typing import List, Optional, Set
+
+# File in an index folder naming its published snapshot.
+CURRENT_FILE = "CURRENT"
+_VERSION_PATTERN = re.compile(r"^\d{20}-\d+$")
+# Lease files: <version>.<pid>.<number>.lease
+_LEASE_PATTERN = re.compile(r"^(\d{20}-\d+)\.(\d+)\.\d+\.lease$")
+_lease_numbers = itertools.count()
+
+
+class IndexSnapshots:
+    """
+    Versioned snapshots of one index folder.
+
+    Every version is a subfolder of the index folder, written completely and fsynced before it is
+    published by atomically replacing the CURRENT file, which names it. Readers only ever open the
+    version CURRENT names, so they never see a half-written index, and a reader in another process
+    notices a new version by CURRENT changing. Published versions are never modified: a writer
+    copies the current one into a new version first.
+
+    Version names start with the creation time in nanoseconds, so they sort by age. Publishing
+    keeps the newest `keep` versions up to the published one and deletes the older ones; versions
+    created after it (another writer's unpublished work) are left alone.
+
+    A store holds a lease on every version it reads or writes (see lease()), and older versions that
+    are leased are kept until they are released. Leases of processes that no longer run are ignored.
+    """
+
+    def __init__(self, root: str, keep: int = 2):
+        """
+        Args:
+            root (str): The index folder.
+            keep (int): Published versions to keep, so readers still opening an older one can finish.
+        """
+        self.root = root
+        self.keep = max(keep, 1)
+
+    def current(self) -> Optional[str]:
+        """The published version, or None if nothing was published (an empty or unversioned folder)."""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE), 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def path(self, version: Optional[str]) -> str:
+        """The folder of a version; None is the index folder itself, where indexes were saved before versioning."""
+        return os.path.join(self.root, version) if version else self.root
+
+    def create(self) -> str:
+        """Create an empty, unpublished version and return its name."""
+        os.makedirs(self.root, exist_ok=True)
+        while True:
+            version = f"{time.time_ns():020d}-{os.getpid()}"
+            try:
+                os.mkdir(self.path(version))
+                return version
+            except FileExistsError:
+                continue
+
+    def publish(self, version: str) -> None:
+        """Flush the files of version to disk, point CURRENT at it and delete old versions."""
+        version_path = self.path(version)
+        for name in os.listdir(version_path):
+            file_path = os.path.join(version_path, name)
+            if os.path.isfile(file_path):
+                with open(file_path, 'rb') as f:
+                    os.fsync(f.fileno())
+        self._fsync_directory(version_path)
+
+        tmp_path = os.path.join(self.root, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.root, CURRENT_FILE))
+        self._fsync_directory(self.root)
+        logging.info(f"Published index version {version} of {self.root}")
+        self.collect_garbage()
+
+    def discard(self, version: str) -> None:
+        """Delete an unpublished version."""
+        shutil.rmtree(self.path(version), ignore_errors=True)
+
+    def versions(self) -> List[str]:
+        """All versions in the folder, published or not, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if _VERSION_PATTERN.match(name) and os.path.isdir(self.path(name)))
+
+    def lease(self, version: str) -> Optional[str]:
+        """
+        Keep collect_garbage() from deleting a version until the lease is released.
+
+        Returns:
+            Optional[str]: The lease to pass to release(), or None if it could not be written (e.g. the
+            index folder is read-only).
+        """
+        lease = os.path.join(self.root, f"{version}.{os.getpid()}.{next(_lease_numbers)}.lease")
+        try:
+            with open(lease, 'x'):
+                pass
+        except OSError as e:
+            logging.warning(f"Could not lease index version {version} of {self.root}: {e}")
+            return None
+        return lease
+
+    def release(self, lease: str) -> None:
+        """Release a lease returned by lease()."""
+        try:
+            os.remove(lease)
+        except FileNotFoundError:
+            pass
+
+    def leased(self) -> Set[str]:
+        """The versions leased by running processes; the leases of processes that exited are deleted."""
+        if not os.path.isdir(self.root):
+            return set()
+        leased = set()
+        for name in os.listdir(self.root):
+            match = _LEASE_PATTERN.match(name)
+            if match is None:
+                continue
+            if _process_running(int(match.group(2))):
+                leased.add(match.group(1))
+            else:
+                self.release(os.path.join(self.root, name))
+        return leased
+
+    def collect_garbage(self) -> None:
+        """Delete the versions older than the `keep` newest ones up to the published one, unless leased."""
+        current = self.current()
+        versions = self.versions()
+        if current not in versions:
+            return
+        kept = versions[:versions.index(current) + 1][-self.keep:]
+        leased = self.leased()
+        for version in versions:
+            if version < kept[0] and version not in leased:
+                shutil.rmtree(self.path(version), ignore_errors=True)
+                logging.info(f"Deleted index version {version} of {self.root}")
+
+    @staticmethod
+    def _fsync_directory(path: str) -> None:
+        """Persist the entries of a directory (new and renamed files); not supported on Windows."""
+        if os.name == "nt":
+            return
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _process_running(pid: int) -> bool:
+    """Whether a process with the given id runs; always assumed on Windows, which has no signal 0 probe."""
+    if pid == os.getpid() or os.name == "nt":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # It runs under another user.
+        return True
+    return True
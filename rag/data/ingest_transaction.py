@@ -0,0 +1,66 @@
+import logging
+from contextlib import ExitStack
+from typing import Dict, Iterable, List
+
+from rag.core.interfaces import IDocumentStore, IHashStore, DocumentType, Document
+
+
+class IngestTransaction:
+    """
+    Two-phase write of documents and their content hashes.
+
+    Documents are added to the document store inside a batch, while the matching hashes are
+    only staged in memory. When the block exits successfully, the document store batches are
+    persisted first and the staged hashes are committed afterwards. If anything fails, the
+    hashes are never written, so the next ingest sees those documents as changed and retries
+    them instead of skipping them.
+
+    A transaction holds the documents and hashes of one ingest batch, so the staged hashes and the
+    store's open batch stay bounded by the batch size rather than growing with the corpus.
+
+    Usage:
+        with IngestTransaction(document_store, hash_stores) as transaction:
+            transaction.add_documents(chunks, DocumentType.HOTEL_INFO, changed_hashes)
+    """
+
+    def __init__(self, document_store: IDocumentStore, hash_stores: Dict[DocumentType, IHashStore]):
+        self.document_store = document_store
+        self.hash_stores = hash_stores
+        self._staged_hashes = {doc_type: {} for doc_type in hash_stores}
+        self._batches = None
+
+    def __enter__(self):
+        self._batches = ExitStack()
+        for doc_type in self.hash_stores:
+            self._batches.enter_context(self.document_store.batch(doc_type))
+        return self
+
+    def add_documents(self, documents: List[Document], doc_type: DocumentType, hashes: Dict[str, str],
+                      replaced_keys: Iterable[str] = ()) -> None:
+        """
+        Add documents to the store's open batch and stage the hashes they were built from. The chunks
+        of the earlier versions of the documents, named by replaced_keys, are deleted first.
+        """
+        self.document_store.delete_documents(replaced_keys, doc_type)
+        self.document_store.add_documents(documents, doc_type)
+        self._staged_hashes[doc_type].update(hashes)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        batches, self._batches = self._batches, None
+        # Closing the batches persists the documents, or rolls them back if the block raised.
+        batches.__exit__(exc_type, exc_val, exc_tb)
+        if exc_type is not None:
+            logging.warning("Ingest failed; discarding staged hashes so the documents are retried.")
+            return False
+
+        # Hash stores of one database file share a connection, so the nested transactions commit
+        # the hashes of every document type together.
+        with ExitStack() as transactions:
+            for doc_type, hash_store in self.hash_stores.items():
+                staged = self._staged_hashes[doc_type]
+                if staged:
+                    transactions.enter_context(hash_store.transaction())
+                    hash_store.save_hashes(staged.items())
+        logging.info("Committed staged hashes: " + ", ".join(
+            f"{doc_type.value}={len(staged)}" for doc_type, staged in self._staged_hashes.items()))
+        return False
@@ -0,0 +1,95 @@
+import os
+from typing import Iterator, Optional
+
+import numpy as np
+
+# Rows copied at a time when rewriting the file.
+_REWRITE_ROWS = 65536
+
+
+class RawVectorStore:
+    """
+    Append-only matrix of the original float32 vectors of an index, stored row by row in a flat file
+    and read through a memory map, so only the rows actually looked up are paged into memory.
+
+    Row i holds the vector with FAISS id i. Without a path the rows are kept in memory instead. The row
+    count is read from the file once and then kept up to date by the writes of this instance.
+    """
+
+    def __init__(self, path: Optional[str], dim: int):
+        """
+        Args:
+            path (Optional[str]): File holding the rows; None keeps them in memory.
+            dim (int): Vector dimension.
+        """
+        self.path = path
+        self.dim = dim
+        self._row_bytes = dim * np.dtype(np.float32).itemsize
+        self._memory = np.empty((0, dim), dtype=np.float32)
+        self._map: Optional[np.ndarray] = None
+        self._rows = os.path.getsize(path) // self._row_bytes if path is not None and os.path.exists(path) else 0
+
+    def __len__(self) -> int:
+        return len(self._memory) if self.path is None else self._rows
+
+    def append(self, vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if self.path is None:
+            self._memory = np.concatenate([self._memory, vectors])
+            return
+        self._map = None
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(vectors.tobytes())
+        self._rows += len(vectors)
+
+    def truncate(self, count: int) -> None:
+        """Keep only the first count rows, e.g. after the vectors added by a failed batch were removed."""
+        if self.path is None:
+            self._memory = self._memory[:count]
+            return
+        self._map = None
+        if os.path.exists(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(count * self._row_bytes)
+        self._rows = min(self._rows, count)
+
+    def remove(self, ids: np.ndarray) -> None:
+        """Remove the rows of the given ids; the rows after them move up, keeping their order."""
+        keep = np.ones(len(self), dtype=bool)
+        keep[ids[ids < len(keep)]] = False
+        if self.path is None:
+            self._memory = self._memory[keep]
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            for start, chunk in zip(range(0, len(keep), _REWRITE_ROWS), self.iter_chunks(_REWRITE_ROWS)):
+                f.write(np.ascontiguousarray(chunk[keep[start:start + len(chunk)]]).tobytes())
+        self._map = None
+        os.replace(tmp_path, self.path)
+        self._rows = int(keep.sum())
+
+    def get(self, ids: np.ndarray) -> np.ndarray:
+        """Return the rows of the given ids as an in-memory array."""
+        return np.asarray(self._matrix()[np.asarray(ids, dtype=np.int64)])
+
+    def sample(self, count: int) -> np.ndarray:
+        """Return up to count rows spread evenly over the whole matrix, e.g. to train a quantizer."""
+        total = len(self)
+        if total <= count:
+            return np.asarray(self._matrix()[:total])
+        return self.get(np.unique(np.linspace(0, total - 1, count).astype(np.int64)))
+
+    def iter_chunks(self, chunk_size: int = 65536) -> Iterator[np.ndarray]:
+        matrix = self._matrix()
+        for start in range(0, len(matrix), chunk_size):
+            yield np.asarray(matrix[start:start + chunk_size])
+
+    def _matrix(self) -> np.ndarray:
+        if self.path is None:
+            return self._memory
+        if self._map is None or len(self._map) != self._rows:
+            rows = self._rows
+            self._map = (np.memmap(self.path, dtype=np.float32, mode='r', shape=(rows, self.dim)) if rows
+                         else np.empty((0, self.dim), dtype=np.float32))
+        return self._map
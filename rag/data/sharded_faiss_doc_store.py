@@ -0,0 +1,360 @@
+import logging
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain.schema import BaseRetriever
+from langchain_core.embeddings import Embeddings
+
+from rag.configs.settings import SearchSettings
+from rag.core.interfaces import DocumentType, IDocumentStore, Document, DocumentStoreType, MetadataFilter, \
+    RetrievalMode, DistanceMetric, FilterOperator
+from rag.core.retrievers.document_store_retriever import DocumentStoreRetriever
+from rag.core.tracing import current_span, in_current_span, span, traced
+from rag.data.bm25_index import BM25Statistics
+from rag.data.faiss_doc_store import FAISSStore
+from utils.path_util import PathUtil
+from utils.rank_fusion import RankFusion
+
+# Shard of the documents without a value for the shard key.
+UNASSIGNED_SHARD = "_unassigned"
+
+
+class ShardedFAISSStore(IDocumentStore):
+    """
+    FAISS document store partitioned into independent shards by a metadata key (city_name by default).
+
+    Every shard is a complete FAISSStore with its own folder per document type, so re-ingesting the
+    hotels of one city only rewrites that city's indexes. Shards are opened lazily the first time a
+    query or an ingest touches them: read-only for queries, so searching never writes to disk, and
+    writable once documents are added to or deleted from them. A read-only shard replaced by a
+    writable one is closed once the searches still running on it finish.
+
+    A query whose filter pins the shard key (eq or in) only searches the matching shards. Any other
+    query searches every shard in parallel and merges the per-shard top k by score; hybrid queries
+    merge the shards' dense and BM25 rankings separately and fuse the two merged rankings.
+    """
+
+    def __init__(self, config: dict, search_config: Optional[dict] = None, embeddings: Optional[Embeddings] = None,
+                 read_only: bool = False):
+        """
+        The config should include:
+          - params.embedding_model: embedding model name, shared by all shards.
+          - params.persistent: whether to persist the shards.
+          - params.shard_key: metadata field the documents are partitioned by.
+          - params.search_workers: threads searching shards in parallel.
+          - params.rrf_k: reciprocal rank fusion constant.
+
+        search_config holds the per-document-type search settings, applied inside every shard.
+        embeddings replaces the model named by params.embedding_model.
+        read_only only opens shards for searching; adding, deleting or clearing documents raises a RuntimeError.
+        """
+        self.config = config
+        self.search_config = search_config
+        self.params = config.get("params", {})
+        self.embedding_model = self.params.get("embedding_model", "paraphrase-multilingual-mpnet-base-v2")
+        self.persistent = self.params.get("persistent", True)
+        self.shard_key = self.params.get("shard_key", "city_name")
+        self.rrf_k = self.params.get("rrf_k", 60)
+        self.read_only = read_only
+        self.shards_path = str(PathUtil.construct_path(PathUtil.get_project_base_path(), 'data', 'embedding_index',
+                                                       'faiss_shards'))
+        self.search_settings: Dict[DocumentType, SearchSettings] = {
+            doc_type: SearchSettings(**(search_config or {}).get(doc_type.value, {}))
+            for doc_type in DocumentType
+        }
+        self.embeddings = embeddings or HuggingFaceEmbeddings(model_name=self.embedding_model)
+        self.executor = ThreadPoolExecutor(max_workers=self.params.get("search_workers", 8),
+                                           thread_name_prefix="faiss-shard")
+        # Opened shards by shard name; the others are only on disk.
+        self.shards: Dict[str, FAISSStore] = {}
+        self._lock = threading.RLock()
+        # Searches running on each shard, and the replaced shards to close once theirs finish.
+        self._searches: Dict[FAISSStore, int] = {}
+        self._replaced: Set[FAISSStore] = set()
+        # The exit stack holding the batches of the shards touched by the open batch of each document type,
+        # and the names of those shards.
+        self._batches: Dict[DocumentType, ExitStack] = {}
+        self._batched_shards: Dict[DocumentType, Set[str]] = {}
+
+    @staticmethod
+    def shard_name(value) -> str:
+        """Folder name of the shard holding the documents with the given shard key value."""
+        if value is None or str(value).strip() == "":
+            return UNASSIGNED_SHARD
+        return re.sub(r'[\\/:*?"<>|\s]+', '_', str(value).strip())
+
+    def shard_names(self) -> Set[str]:
+        """Names of all shards, opened or only on disk."""
+        names = set(self.shards)
+        if self.persistent and os.path.isdir(self.shards_path):
+            names.update(name for name in os.listdir(self.shards_path)
+                         if os.path.isdir(os.path.join(self.shards_path, name)))
+        return names
+
+    def _shard_paths(self, name: str) -> Dict[DocumentType, str]:
+        return {doc_type: os.path.join(self.shards_path, name, doc_type.value) for doc_type in DocumentType}
+
+    def _shard(self, name: str, create: bool = False, read_only: bool = False) -> Optional[FAISSStore]:
+        """
+        Return the shard with the given name, opening it on first use. A shard that does not exist yet
+        is only created when create is set; otherwise None is returned. A shard opened read-only is
+        reopened writable the first time a writable one is asked for.
+        """
+        if not read_only:
+            self._check_writable()
+        with self._lock:
+            shard = self.shards.get(name)
+            if shard is not None and shard.read_only and not read_only:
+                self._retire(name)
+                shard = None
+            if shard is None and (create or name in self.shard_names()):
+                shard = FAISSStore(self.config, self.search_config, index_paths=self._shard_paths(name),
+                                   embeddings=self.embeddings, read_only=read_only)
+                self.shards[name] = shard
+                logging.info(f"Opened FAISS shard {name}{' read-only' if read_only else ''}")
+            return shard
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise RuntimeError("The FAISS shards are open read-only.")
+
+    def _retire(self, name: str) -> None:
+        """Stop using an opened shard, and close it now or, if searches are running on it, once they finish."""
+        with self._lock:
+            shard = self.shards.pop(name)
+            if not self._searches.get(shard):
+                shard.close()
+            else:
+                self._replaced.add(shard)
+
+    @contextmanager
+    def _reading(self, names: Iterable[str]) -> Iterator[List[FAISSStore]]:
+        """The named shards that exist, opened for searching and kept open until the block exits."""
+        with self._lock:
+            shards = [shard for shard in (self._shard(name, read_only=True) for name in names) if shard]
+            for shard in shards:
+                self._searches[shard] = self._searches.get(shard, 0) + 1
+        try:
+            yield shards
+        finally:
+            finished = []
+            with self._lock:
+                for shard in shards:
+                    self._searches[shard] -= 1
+                    if not self._searches[shard]:
+                        del self._searches[shard]
+                        if shard in self._replaced:
+                            self._replaced.discard(shard)
+                            finished.append(shard)
+            for shard in finished:
+                shard.close()
+
+    def _target_shards(self, metadata_filter: Optional[MetadataFilter]) -> List[str]:
+        """The shards that can hold documents matching the filter: those named by its shard key conditions, or all."""
+        names: Optional[Set[str]] = None
+        for condition in (metadata_filter.conditions if metadata_filter else ()):
+            if condition.field != self.shard_key:
+                continue
+            if condition.operator is FilterOperator.EQ:
+                values = {self.shard_name(condition.value)}
+            elif condition.operator is FilterOperator.IN:
+                values = {self.shard_name(value) for value in condition.value}
+            else:
+                continue
+            names = values if names is None else names & values
+        existing = self.shard_names()
+        return sorted(existing if names is None else names & existing)
+
+    def add_documents(self, docs: List[Document], doc_type: DocumentType) -> None:
+        """
+        Add a list of Document objects to the shards matching their shard key value, for the given document type.
+        """
+        groups: Dict[str, List[Document]] = {}
+        for doc in docs:
+            groups.setdefault(self.shard_name((doc.metadata or {}).get(self.shard_key)), []).append(doc)
+        for name, shard_docs in groups.items():
+            self._batched_shard(name, doc_type).add_documents(shard_docs, doc_type)
+
+    def delete_documents(self, keys: Iterable[str], doc_type: DocumentType) -> None:
+        """
+        Remove the chunks of the documents with the given keys from every shard holding some of them.
+        A document can move between shards when its shard key value changes, so every shard is checked.
+        """
+        keys = list(keys)
+        if not keys:
+            return
+        for name in sorted(self.shard_names()):
+            with self._reading([name]) as shards:
+                holds_keys = bool(shards[0].tables[doc_type].ids_of_keys(keys))
+            if holds_keys:
+                self._batched_shard(name, doc_type).delete_documents(keys, doc_type)
+
+    def _batched_shard(self, name: str, doc_type: DocumentType) -> FAISSStore:
+        """The shard with the given name, created if needed, inside the open batch of the document type if any."""
+        shard = self._shard(name, create=True)
+        if doc_type in self._batches and name not in self._batched_shards[doc_type]:
+            self._batches[doc_type].enter_context(shard.batch(doc_type))
+            self._batched_shards[doc_type].add(name)
+        return shard
+
+    @contextmanager
+    def batch(self, doc_type: DocumentType):
+        """
+        Open a batch on every shard the block adds documents to or deletes documents from. On exit each
+        of them saves, or rolls back its changes if the block or a save fails. Shards that saved before a later shard failed
+        keep their documents; the hashes of the ingest are not committed, so those are re-added.
+        """
+        with ExitStack() as shard_batches:
+            self._batches[doc_type] = shard_batches
+            self._batched_shards[doc_type] = set()
+            try:
+                yield self
+            finally:
+                del self._batches[doc_type]
+                del self._batched_shards[doc_type]
+
+    def save(self, doc_type: DocumentType) -> None:
+        """Save the opened shards for the specified document type."""
+        for shard in list(self.shards.values()):
+            shard.save(doc_type)
+
+    @traced("store.search", count_result=True)
+    def search(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO,
+               metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
+        """Search the shards matching the filter for a query and return the k best documents overall."""
+        current_span().set("doc_type", doc_type.value)
+        return [doc for doc, _ in self.search_with_scores(query, k, doc_type, metadata_filter)]
+
+    def search_with_scores(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO,
+                           metadata_filter: Optional[MetadataFilter] = None) -> List[Tuple[Document, float]]:
+        """
+        Search every matching shard for its k best (document, score) pairs and merge them. The query is
+        embedded once and shared by the shards. With MMR enabled, each shard picks its own diverse k.
+        """
+        with span("store.embed_query"):
+            query_embedding = self.embeddings.embed_query(query)
+        with self._reading(self._target_shards(metadata_filter)) as shards:
+            shard_results = self._scatter_gather(
+                shards, lambda shard: shard.search_with_scores(query, k, doc_type, metadata_filter, query_embedding))
+        return self._merge(shard_results, lambda shard: shard.metrics[doc_type] is DistanceMetric.L2)[:k]
+
+    @traced("store.hybrid_search", count_result=True)
+    def hybrid_search(self, query: str, k: int = 5, doc_type: DocumentType = DocumentType.HOTEL_INFO,
+                      metadata_filter: Optional[MetadataFilter] = None) -> List[Document]:
+        """
+        Hybrid search the matching shards. Every shard returns its fetch_k best dense and BM25 candidates;
+        each ranking is merged across the shards by score, and the two merged rankings are fused with
+        reciprocal rank fusion, as in an unsharded store. Fusing per shard would rank every shard's
+        first hit alike, whatever its score. BM25 scores depend on corpus statistics, so the shards
+        score with the statistics of all the searched shards together.
+        """
+        current_span().set("doc_type", doc_type.value)
+        with span("store.embed_query"):
+            query_embedding = self.embeddings.embed_query(query)
+        fetch_k = max(k, self.search_settings[doc_type].fetch_k)
+        with self._reading(self._target_shards(metadata_filter)) as shards:
+            statistics = sum((shard.lexical_indexes[doc_type].statistics(query) for shard in shards), BM25Statistics())
+            shard_candidates = self._scatter_gather(
+                shards, lambda shard: shard.hybrid_candidates(query, fetch_k, doc_type, metadata_filter,
+                                                              query_embedding, statistics))
+            return self._fuse(shard_candidates, k, fetch_k, doc_type)
+
+    def _scatter_gather(self, shards: List[FAISSStore], search_shard: Callable) -> List[tuple]:
+        """
+        Run search_shard on the shards, in parallel when there are several, and return (shard, result) pairs.
+        Every shard search is timed as a store.shard_search span, a child of the current span on whichever
+        thread it runs.
+        """
+        current_span().set("shards", len(shards))
+
+        def search_in_span(shard: FAISSStore):
+            with span("store.shard_search"):
+                return search_shard(shard)
+
+        if len(shards) == 1:
+            shard_results = [search_in_span(shards[0])]
+        else:
+            shard_results = list(self.executor.map(in_current_span(search_in_span), shards))
+        return list(zip(shards, shard_results))
+
+    @staticmethod
+    def _merge(shard_hits: List[Tuple[FAISSStore, List[tuple]]],
+               lower_is_better: Callable[[FAISSStore], bool]) -> List[tuple]:
+        """
+        Merge the hits of the shards, (item, score) pairs each best first, into one list, best first.
+        lower_is_better tells for each shard whether its scores are distances, which depends on the
+        metric the shard's index was built with rather than the configured one.
+        """
+        results = [(-hit[1] if lower_is_better(shard) else hit[1], hit)
+                   for shard, hits in shard_hits for hit in hits]
+        results.sort(key=lambda result: result[0], reverse=True)
+        return [hit for _, hit in results]
+
+    def _fuse(self, shard_candidates: List[Tuple[FAISSStore, tuple]], k: int, fetch_k: int,
+              doc_type: DocumentType) -> List[Document]:
+        """Fuse the hybrid candidates of the shards into the k best documents overall."""
+        # Vector ids are per shard, so candidates are keyed by the shard's position and their vector id.
+        dense = self._merge([(shard, [((position, i), score) for i, score in candidates[0]])
+                             for position, (shard, candidates) in enumerate(shard_candidates)],
+                            lambda shard: shard.metrics[doc_type] is DistanceMetric.L2)
+        lexical = self._merge([(shard, [((position, i), score) for i, score in candidates[1]])
+                               for position, (shard, candidates) in enumerate(shard_candidates)],
+                              lambda shard: False)
+        fused = RankFusion.reciprocal_rank_fusion([[key for key, _ in dense[:fetch_k]],
+                                                   [key for key, _ in lexical[:fetch_k]]], k=self.rrf_k)[:k]
+        documents = {}
+        for position, (shard, _) in enumerate(shard_candidates):
+            ids = [i for (shard_position, i), _ in fused if shard_position == position]
+            if ids:
+                documents.update(((position, i), doc) for i, doc in shard.tables[doc_type].get(ids).items())
+        return [documents[key] for key, _ in fused if key in documents]
+
+    def get_retriever(self, doc_type: DocumentType, metadata_filter: Optional[MetadataFilter] = None,
+                      mode: RetrievalMode = RetrievalMode.DENSE, k: Optional[int] = None) -> BaseRetriever:
+        """
+        Return a retriever instance returning the k best documents of the specified document type.
+        k defaults to the document type's search settings.
+        """
+        return DocumentStoreRetriever(document_store=self, doc_type=doc_type, k=k or self.search_settings[doc_type].k,
+                                      metadata_filter=metadata_filter, mode=mode)
+
+    def clear(self, doc_type: DocumentType) -> None:
+        """
+        Clear the specified document type in every shard. Shards that are not open, or only open for
+        searching, have their folder deleted without being loaded.
+        """
+        self._check_writable()
+        with self._lock:
+            for name in self.shard_names():
+                shard = self.shards.get(name)
+                if shard is not None and shard.read_only:
+                    self._retire(name)
+                    shard = None
+                if shard is not None:
+                    shard.clear(doc_type)
+                else:
+                    shutil.rmtree(self._shard_paths(name)[doc_type], ignore_errors=True)
+        logging.info(f"Cleared {doc_type.value} in all FAISS shards.")
+
+    def is_stale(self) -> bool:
+        """Whether a newer version of an opened shard was published; shards opened later load their newest one."""
+        with self._lock:
+            return any(shard.is_stale() for shard in self.shards.values())
+
+    def reopen(self) -> 'ShardedFAISSStore':
+        return ShardedFAISSStore(self.config, self.search_config, embeddings=self.embeddings, read_only=self.read_only)
+
+    def close(self) -> None:
+        with self._lock:
+            for shard in self.shards.values():
+                shard.close()
+        self.executor.shutdown(wait=False)
+
+    def get_type(self) -> DocumentStoreType:
+        return DocumentStoreType.SHARDED_FAISS
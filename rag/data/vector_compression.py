@@ -0,0 +1,46 @@
+from enum import Enum
+
+import faiss
+
+# Product quantization with 8-bit codes trains 256 centroids per sub-quantizer.
+PQ_MIN_TRAINING_VECTORS = 256
+
+
+class VectorCompression(Enum):
+    NONE = "none"  # Exact float32 vectors (IndexFlat)
+    FP16 = "fp16"  # Scalar quantization to 16-bit floats: 2x smaller, no training
+    INT8 = "int8"  # Scalar quantization to 8-bit integers: 4x smaller, trained per dimension
+    PQ = "pq"  # Product quantization to pq_m bytes per vector, trained with k-means
+
+    @staticmethod
+    def of(index: faiss.Index) -> "VectorCompression":
+        """Return the compression of an existing index."""
+        if isinstance(index, faiss.IndexScalarQuantizer):
+            return VectorCompression.FP16 if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else VectorCompression.INT8
+        if isinstance(index, faiss.IndexPQ):
+            return VectorCompression.PQ
+        return VectorCompression.NONE
+
+    def build_index(self, dim: int, metric_type: int, pq_m: int = 16) -> faiss.Index:
+        """Create an empty (untrained) index storing vectors with this compression."""
+        if self is VectorCompression.FP16:
+            return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, metric_type)
+        if self is VectorCompression.INT8:
+            return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, metric_type)
+        if self is VectorCompression.PQ:
+            if dim % pq_m:
+                raise ValueError(f"pq_m ({pq_m}) must divide the vector dimension ({dim}).")
+            return faiss.IndexPQ(dim, pq_m, 8, metric_type)
+        return faiss.IndexFlat(dim, metric_type)
+
+    def supports_id_selector(self) -> bool:
+        """Whether searches of an index with this compression can be restricted to ids; IndexPQ rejects selectors."""
+        return self is not VectorCompression.PQ
+
+    def min_training_vectors(self, train_size: int) -> int:
+        """Number of vectors needed before an index with this compression can be trained."""
+        if self is VectorCompression.INT8:
+            return train_size
+        if self is VectorCompression.PQ:
+            return max(train_size, PQ_MIN_TRAINING_VECTORS)
+        return 0
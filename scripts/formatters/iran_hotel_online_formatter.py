@@ -1,4 +1,10 @@
+from typing import List
+
 from rag.core.interfaces import Document
+from utils.hash_util import HashUtil
+
+# Fields that together identify one stay, used to derive a stable review id.
+REVIEW_IDENTITY_FIELDS = ["hotelId", "guestName", "arrivalDate", "checkoutDate", "roomName", "title"]
 
 
 class IranHotelOnlineFormatter:
@@ -31,6 +37,37 @@ class IranHotelOnlineFormatter:
         # Create and return a Document object
         return Document(content=text, metadata=metadata)
 
+    @staticmethod
+    def format_review_text(review: dict) -> str:
+        """
+        Converts a single structured review into its Persian text form.
+
+        Args:
+            review (dict): A dictionary containing one review.
+
+        Returns:
+            str: The formatted review text.
+        """
+        return " ".join([
+            f"عنوان: {review.get('title', 'بدون عنوان')}.",
+            f"توضیحات: {review.get('description', 'بدون توضیحات')}.",
+            f"امتیاز: {review.get('rate', 'بدون امتیاز')} ({review.get('rateTitle', 'بدون عنوان امتیاز')}).",
+            f"مسافر: {review.get('guestName', 'نامشخص')}.",
+            f"تاریخ ورود: {review.get('arrivalDatePersian', 'نامشخص')}.",
+            f"تاریخ خروج: {review.get('checkoutDatePersian', 'نامشخص')}.",
+            f"مدت اقامت: {review.get('duration', 'نامشخص')} شب.",
+            f"نوع سفر: {review.get('travelTypeTitle', 'نامشخص')}.",
+            f"نوع اتاق: {review.get('roomName', 'نامشخص')}."
+        ])
+
+    @staticmethod
+    def review_id(review: dict) -> str:
+        """
+        Computes a stable identifier for a review from the fields that identify a stay,
+        so the same review keeps its id across scrapes.
+        """
+        return HashUtil.compute_dict_hash({field: review.get(field) for field in REVIEW_IDENTITY_FIELDS})[:16]
+
     @staticmethod
     def format_hotel_reviews_for_faiss(hotel_review: dict) -> Document:
         """
@@ -46,17 +83,38 @@ class IranHotelOnlineFormatter:
         reviews = hotel_review.get("reviews", [])
 
         # Combine fields into a single text
-        text = ""
-        for review in reviews:
-            text += f"عنوان: {review.get('title', 'بدون عنوان')}. "
-            text += f"توضیحات: {review.get('description', 'بدون توضیحات')}. "
-            text += f"امتیاز: {review.get('rate', 'بدون امتیاز')} ({review.get('rateTitle', 'بدون عنوان امتیاز')}). "
-            text += f"مسافر: {review.get('guestName', 'نامشخص')}. "
-            text += f"تاریخ ورود: {review.get('arrivalDatePersian', 'نامشخص')}. "
-            text += f"تاریخ خروج: {review.get('checkoutDatePersian', 'نامشخص')}. "
-            text += f"مدت اقامت: {review.get('duration', 'نامشخص')} شب. "
-            text += f"نوع سفر: {review.get('travelTypeTitle', 'نامشخص')}. "
-            text += f"نوع اتاق: {review.get('roomName', 'نامشخص')}.\n"
+        text = "\n".join(IranHotelOnlineFormatter.format_review_text(review) for review in reviews)
 
         # Create and return a Document object
         return Document(content=text.strip(), metadata=metadata)
+
+    @staticmethod
+    def format_reviews_as_documents(hotel_review: dict) -> List[Document]:
+        """
+        Converts each review of a hotel into its own Document object.
+
+        Every document carries the hotel metadata plus the review's own fields (id, rate, travel
+        type and stay dates), so reviews can be hashed, embedded, filtered and retrieved one by one.
+
+        Args:
+            hotel_review (dict): A dictionary containing hotel review information.
+
+        Returns:
+            List[Document]: One Document per review.
+        """
+        hotel_metadata = hotel_review.get("metadata", {})
+        documents = []
+        for review in hotel_review.get("reviews", []):
+            metadata = dict(hotel_metadata)
+            metadata.update({
+                "review_id": IranHotelOnlineFormatter.review_id(review),
+                "rate": review.get("rate"),
+                "travel_type": review.get("travelTypeTitle"),
+                "arrival_date": review.get("arrivalDate"),
+                "arrival_date_persian": review.get("arrivalDatePersian"),
+                "checkout_date": review.get("checkoutDate"),
+                "duration": review.get("duration"),
+                "room_name": review.get("roomName")
+            })
+            documents.append(Document(content=IranHotelOnlineFormatter.format_review_text(review), metadata=metadata))
+        return documents
@@ -0,0 +1,153 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from rag.core.interfaces import Document, DocumentType, IDocumentChunker, DOCUMENT_KEY_FIELD
+from scripts.formatters.iran_hotel_online_formatter import IranHotelOnlineFormatter
+from utils.hash_util import HashUtil
+
+
+@dataclass
+class PreparedDocument:
+    """A formatted document with the hash key and content hash that ingestion detects its changes by."""
+    key: str
+    hash: str
+    document: Document
+
+
+@dataclass
+class PreparedHotel:
+    """The prepared documents of one hotel, per document type, and the hotel-level metadata."""
+    hotel_id: str
+    documents: Dict[DocumentType, List[PreparedDocument]] = field(default_factory=dict)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+# Chunkers of the current worker process, set once by _init_worker.
+_worker_chunkers: Dict[DocumentType, IDocumentChunker] = {}
+
+
+def _init_worker(chunkers: Dict[DocumentType, IDocumentChunker]) -> None:
+    _worker_chunkers.update(chunkers)
+
+
+def prepare_hotel(hotel: dict) -> PreparedHotel:
+    """
+    Format and hash a single raw hotel record: one document for the hotel info and one document
+    per review, each with its own hash so unchanged reviews are skipped before they are chunked.
+    """
+    formatted_hotel_info = IranHotelOnlineFormatter.format_hotel_info_for_faiss(hotel)
+    hotel_id = formatted_hotel_info.metadata["hotel_source_id"]
+
+    prepared = PreparedHotel(hotel_id=hotel_id, metadata=formatted_hotel_info.metadata)
+    prepared.documents[DocumentType.HOTEL_INFO] = [_prepare_document(str(hotel_id), formatted_hotel_info)]
+    prepared.documents[DocumentType.HOTEL_REVIEW] = [
+        _prepare_document(f"{hotel_id}_{review.metadata['review_id']}", review)
+        for review in IranHotelOnlineFormatter.format_reviews_as_documents(hotel)
+    ]
+    return prepared
+
+
+def _prepare_document(key: str, doc: Document) -> PreparedDocument:
+    # Every chunk carries the key, so a changed document can replace its chunks in the document store.
+    doc.metadata[DOCUMENT_KEY_FIELD] = key
+    return PreparedDocument(key=key, hash=HashUtil.compute_hash(doc.content), document=doc)
+
+
+def _prepare_hotels_in_worker(hotels: List[dict]) -> List[PreparedHotel]:
+    return [prepare_hotel(hotel) for hotel in hotels]
+
+
+def _chunk_documents(documents: List[Document], chunker: IDocumentChunker) -> List[Document]:
+    chunks = []
+    for doc in documents:
+        chunks.extend(chunker.chunk_text(doc.content, doc.metadata))
+    return chunks
+
+
+def _chunk_documents_in_worker(doc_type: DocumentType, documents: List[Document]) -> List[Document]:
+    return _chunk_documents(documents, _worker_chunkers[doc_type])
+
+
+class HotelPreparer:
+    """
+    Formats and hashes raw hotel records and chunks the documents selected for ingestion,
+    optionally across a pool of worker processes.
+
+    Chunking is a separate step so that only the documents whose hash changed are chunked.
+    Both steps share one pool, which is started on first use and shut down by close() or by
+    leaving the preparer's with block.
+
+    prepare() yields results in input order. Only a bounded window of tasks is in flight at
+    any time, so a streamed input is never read far ahead of the consumer.
+    """
+
+    def __init__(self, chunkers: Dict[DocumentType, IDocumentChunker], workers: int = 0,
+                 task_size: int = 16, prefetch: int = 2):
+        """
+        Args:
+            chunkers (Dict[DocumentType, IDocumentChunker]): The chunker used for each document type.
+            workers (int): Number of worker processes. 0 or 1 prepares hotels in the calling process.
+            task_size (int): Hotels (or documents, when chunking) sent to a worker per task, to amortize
+                inter-process overhead.
+            prefetch (int): Tasks kept in flight per worker.
+        """
+        self.chunkers = chunkers
+        self.workers = workers
+        self.task_size = max(1, task_size)
+        self.prefetch = max(1, prefetch)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> 'HotelPreparer':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def close(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    def _pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 1:
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.chunkers,))
+        return self._executor
+
+    def prepare(self, hotels: Iterable[dict]) -> Iterator[PreparedHotel]:
+        executor = self._pool()
+        if executor is None:
+            for hotel in hotels:
+                yield prepare_hotel(hotel)
+            return
+
+        max_in_flight = self.workers * self.prefetch
+        iterator = iter(hotels)
+        pending = deque()
+        while True:
+            task = list(islice(iterator, self.task_size))
+            if task:
+                pending.append(executor.submit(_prepare_hotels_in_worker, task))
+            if pending and (not task or len(pending) >= max_in_flight):
+                yield from pending.popleft().result()
+            if not task and not pending:
+                return
+
+    def chunk(self, doc_type: DocumentType, documents: List[Document]) -> List[Document]:
+        """Chunk documents of one type with its chunker. Returns the chunks in document order."""
+        executor = self._pool()
+        if executor is None:
+            return _chunk_documents(documents, self.chunkers[doc_type])
+
+        futures = [executor.submit(_chunk_documents_in_worker, doc_type, documents[start:start + self.task_size])
+                   for start in range(0, len(documents), self.task_size)]
+        chunks = []
+        for future in futures:
+            chunks.extend(future.result())
+        return chunks
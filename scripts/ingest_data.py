@@ -1,61 +1,150 @@
 import logging
+import time
+from itertools import islice
+from typing import Dict, List, Optional, Tuple, Iterable, Iterator
 
 from rag.configs.config_loader import ConfigLoader
+from rag.core.analyzers.query_analyzer import EntityDictionary
 from rag.core.container import RAGContainer
-from rag.core.interfaces import DocumentType, DocumentStoreType
-from scripts.formatters.iran_hotel_online_formatter import IranHotelOnlineFormatter
+from rag.core.interfaces import DocumentType, DocumentStoreType, IDocumentStore, IHashStore
+from rag.core.metrics import INGEST_DOCUMENTS, INGEST_LAST_DURATION, INGEST_LAST_SUCCESS, INGEST_RUNS, \
+    INGEST_UNCHANGED, MetricsExporter
+from rag.data.ingest_transaction import IngestTransaction
+from scripts.hotel_preparer import HotelPreparer, PreparedDocument, PreparedHotel
+from utils.file_manager import FileManager
 from utils.hash_util import HashUtil
+from utils.path_util import PathUtil
 
 
 class MainIngestionProcess:
-    def __init__(self, container):
+    def __init__(self, container, document_store: Optional[IDocumentStore] = None):
+        """
+        Args:
+            container (RAGContainer): Provides the scraper, hash stores, chunkers and document store.
+            document_store (Optional[IDocumentStore]): Ingest into this store instead of the container's,
+                e.g. a writable store opened next to the served one.
+        """
         self.scraper = container.scraper()
         self.hotel_hash_store = container.hash_store(table_name= DocumentType.HOTEL_INFO.value)
         self.review_hash_store = container.hash_store(table_name= DocumentType.HOTEL_REVIEW.value)
-        self.document_store = container.document_store()
+        self.hash_stores = {
+            DocumentType.HOTEL_INFO: self.hotel_hash_store,
+            DocumentType.HOTEL_REVIEW: self.review_hash_store
+        }
+        self.document_store = document_store or container.document_store()
         # Obtain a hotel chunker using the factory.
         self.hotel_chunker = container.chunker(DocumentType.HOTEL_INFO)
         self.review_chunker = container.chunker(DocumentType.HOTEL_REVIEW)
+        ingestion_config = container.config.ingestion() or {}
+        self.stream = ingestion_config.get("stream", True)
+        self.batch_size = ingestion_config.get("batch_size", 256)
+        self.preparer = HotelPreparer(
+            chunkers={DocumentType.HOTEL_INFO: self.hotel_chunker, DocumentType.HOTEL_REVIEW: self.review_chunker},
+            workers=ingestion_config.get("workers", 0)
+        )
+
+    def ingest(self) -> int:
+        """
+        Runs the ingestion pipeline: read -> format, hash -> hash check -> chunk -> embed -> store.
+        The city and hotel names of every hotel are collected into the entity dictionary used by
+        the query analyzer, which is saved once the run has been committed.
 
-    def ingest(self):
-        # Step 1: Scrape raw hotel info records (each record is a dict)
-        iran_hotel_online_raw_data = self.scraper.get_data(from_file=True)
-        all_hotel_info_docs = []
-        all_review_docs = []
-
-        # Step 2: Process each hotel in the list
-        for hotel in iran_hotel_online_raw_data:
-
-            # Format hotel info
-            formatted_hotel_info = IranHotelOnlineFormatter.format_hotel_info_for_faiss(hotel)
-
-            # Compute and check hotel info hash is changed or not
-            hotel_info_new_hash = HashUtil.compute_hash(formatted_hotel_info.content)
-            hotel_id = formatted_hotel_info.metadata["hotel_source_id"]
-
-            hotel_hash_id =self.generate_unique_hash_id(hotel_id, self.document_store.get_type(), DocumentType.HOTEL_INFO)
-            if HashUtil.update_hash_in_store_if_needed(self.hotel_hash_store, hotel_hash_id, hotel_info_new_hash):
-                hotel_info_chunks = self.hotel_chunker.chunk_text(formatted_hotel_info.content, formatted_hotel_info.metadata)
-                all_hotel_info_docs.extend(hotel_info_chunks)
-
-            # Format hotel reviews
-            formatted_reviews = IranHotelOnlineFormatter.format_hotel_reviews_for_faiss(hotel)
-
-            # Compute and check hotel review hash is changed or not
-            hotel_review_new_hash = HashUtil.compute_hash(formatted_reviews.content)
-
-            review_hash_id =self.generate_unique_hash_id(hotel_id, self.document_store.get_type(), DocumentType.HOTEL_REVIEW)
-            if HashUtil.update_hash_in_store_if_needed(self.review_hash_store, review_hash_id, hotel_review_new_hash):
-                review_chunks = self.hotel_chunker.chunk_text(formatted_reviews.content, formatted_reviews.metadata)
-                all_review_docs.extend(review_chunks)
-
-        # Step 3: Add all hotel info Document chunks to the document store
-        self.document_store.add_documents(all_hotel_info_docs, DocumentType.HOTEL_INFO)
-
-        # Step 4: Add all review Document chunks to the document store
-        self.document_store.add_documents(all_review_docs, DocumentType.HOTEL_REVIEW)
+        Hotels flow through the pipeline in batches of `batch_size`, so only one batch of records,
+        formatted documents and chunks is held in memory at a time. Only the documents whose hash
+        changed are chunked, and their chunks replace those of their earlier versions. Formatting, hashing and chunking run on a process pool when
+        `ingestion.workers` is greater than 1. Every batch is written in its own IngestTransaction:
+        its hashes are committed once its documents are persisted, so a failed run keeps the batches
+        committed before the failure and retries the rest next time.
 
-        return all_hotel_info_docs + all_review_docs
+        Returns:
+            int: The number of chunks written to the document store.
+        """
+        started = time.perf_counter()
+        try:
+            chunk_count = self._ingest()
+        except Exception:
+            INGEST_RUNS.labels("error").inc()
+            raise
+        INGEST_RUNS.labels("ok").inc()
+        INGEST_LAST_DURATION.set(time.perf_counter() - started)
+        INGEST_LAST_SUCCESS.set_to_current_time()
+        return chunk_count
+
+    def _ingest(self) -> int:
+        # Step 1: Read raw hotel info records (each record is a dict)
+        if self.stream:
+            iran_hotel_online_raw_data = self.scraper.iter_data(from_file=True)
+        else:
+            iran_hotel_online_raw_data = self.scraper.get_data(from_file=True)
+
+        # Step 2: Format and hash each hotel, in parallel when workers are configured
+        prepared_hotels = self.preparer.prepare(iran_hotel_online_raw_data)
+
+        entity_dictionary = EntityDictionary.load()
+        chunk_count = 0
+        with self.preparer:
+            for batch_number, hotels in enumerate(self._batched(prepared_hotels, self.batch_size), start=1):
+                batch_counts = []
+                for hotel in hotels:
+                    entity_dictionary.add_hotel(hotel.metadata)
+                with IngestTransaction(self.document_store, self.hash_stores) as transaction:
+                    for doc_type, hash_store in self.hash_stores.items():
+                        # Step 3: Check the batch's hashes in bulk and keep only the changed documents
+                        changed, changed_hashes = self._select_changed(hotels, doc_type, hash_store)
+
+                        # Step 4: Chunk the changed documents
+                        chunks = self.preparer.chunk(doc_type, [prepared.document for prepared in changed])
+
+                        # Step 5: Replace the chunks of their earlier versions with the new chunks, embedded;
+                        # their hashes are staged until the batch's transaction commits.
+                        transaction.add_documents(chunks, doc_type, changed_hashes,
+                                                  replaced_keys=[prepared.key for prepared in changed])
+                        INGEST_DOCUMENTS.labels(doc_type.value).inc(len(chunks))
+                        batch_counts.append(f"{len(chunks)} {doc_type.value} chunks")
+                        chunk_count += len(chunks)
+                logging.info(f"Ingested batch {batch_number}: {len(hotels)} hotels, " + ", ".join(batch_counts))
+
+        # Step 6: Save the city and hotel names for query analysis
+        self._save_entity_dictionary(entity_dictionary)
+        return chunk_count
+
+    @staticmethod
+    def _save_entity_dictionary(entity_dictionary: EntityDictionary) -> None:
+        """Add the Persian city names from the hotel list records and persist the dictionary."""
+        records_path = PathUtil.construct_path(PathUtil.get_project_base_path(), 'data', 'hotel', 'hotel_records.json')
+        entity_dictionary.add_city_aliases_from_records(FileManager(records_path).iter_records())
+        entity_dictionary.save()
+        logging.info(f"Saved entity dictionary: {len(entity_dictionary.cities)} city aliases, "
+                     f"{len(entity_dictionary.hotels)} hotel aliases")
+
+    def _select_changed(self, hotels: List[PreparedHotel], doc_type: DocumentType,
+                        hash_store: IHashStore) -> Tuple[List[PreparedDocument], Dict[str, str]]:
+        """
+        Compare the hashes of the prepared documents of one type against the hash store in bulk.
+        Earlier batches of the run are committed, so their documents are in the hash store already.
+        Returns the changed documents and their new hashes, which are not saved yet.
+        """
+        doc_store_type = self.document_store.get_type()
+        candidates = {}
+        for hotel in hotels:
+            for prepared in hotel.documents.get(doc_type, []):
+                candidates[self.generate_unique_hash_id(prepared.key, doc_store_type, doc_type)] = prepared
+
+        new_hashes = {hash_id: prepared.hash for hash_id, prepared in candidates.items()}
+        changed_hashes = HashUtil.find_changed_hashes(hash_store, new_hashes)
+
+        INGEST_UNCHANGED.labels(doc_type.value).inc(len(candidates) - len(changed_hashes))
+        return [candidates[hash_id] for hash_id in changed_hashes], changed_hashes
+
+    @staticmethod
+    def _batched(records: Iterable, batch_size: int) -> Iterator[List]:
+        """Group an iterable into lists of at most batch_size items."""
+        iterator = iter(records)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield batch
 
     def generate_unique_hash_id(self, id: str, doc_store_type: DocumentStoreType, doc_type: DocumentType) -> str:
         """
@@ -72,10 +161,20 @@ class MainIngestionProcess:
         return f"{id}_{doc_store_type.value}_{doc_type.value}"
 
 
+def run_ingestion(container) -> int:
+    """Run one ingestion as a batch job and export its metrics, which Prometheus could not scrape in time."""
+    try:
+        return MainIngestionProcess(container).ingest()
+    finally:
+        # Batch runs end before Prometheus could scrape them: leave the metrics in a textfile or push them.
+        metrics_config = container.config.metrics()
+        MetricsExporter.export(metrics_config["textfile_path"], metrics_config["pushgateway_url"],
+                               metrics_config["job"])
+
+
 # Example usage
 if __name__ == "__main__":
     config_loader = ConfigLoader()
     container = RAGContainer.create(config_loader)
-    ingestion_process = MainIngestionProcess(container)
-    hotel_info = ingestion_process.ingest()
-    print(f"the number of hotel info is:  {len(hotel_info)}")
+    chunk_count = run_ingestion(container)
+    print(f"the number of ingested chunks is:  {chunk_count}")
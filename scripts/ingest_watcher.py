@@ -0,0 +1,128 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from rag.data.hot_swap_doc_store import HotSwapDocumentStore
+from scripts.ingest_data import MainIngestionProcess
+from utils.path_util import PathUtil
+
+# Files written by the scrapers; the served index is rebuilt when one of them changes.
+SOURCE_FILES = ("hotels_info.json", "hotel_records.json")
+
+
+class IngestionWatcher:
+    """
+    Keeps the served document store up to date without taking the UI down.
+
+    A background thread checks every reload_interval seconds whether a newer index was published,
+    by this process or by an ingest in another one (`python main.py ingest`), and swaps a store
+    opened on it into the HotSwapDocumentStore between requests. With ingest set it also checks the
+    scraped hotel files every interval seconds and ingests them whenever they changed (and once at
+    start, to catch up with files scraped while the server was down).
+
+    The served store is read-only: every ingest opens its own writable store (the container's
+    ingest_document_store) and closes it when done. FAISS ingests publish a new version at the end
+    (see IndexSnapshots), so queries are answered from the last published index until then;
+    Elasticsearch indexes are updated in place. Only one ingest should run against an index at a time.
+    """
+
+    def __init__(self, container, store: HotSwapDocumentStore, interval: float = 300.0,
+                 reload_interval: float = 10.0, ingest: bool = True, on_swap: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            container (RAGContainer): The application container the ingestions are built from.
+            store (HotSwapDocumentStore): The store the UI is served from.
+            interval (float): Seconds between two checks of the source files.
+            reload_interval (float): Seconds between two checks for a newer published index.
+            ingest (bool): Ingest changed source files; otherwise only follow indexes published elsewhere.
+            on_swap (Optional[Callable[[], None]]): Called after the served index changed, e.g. to
+                reload the query analyzer's entity dictionary.
+        """
+        self.container = container
+        self.store = store
+        self.interval = interval
+        self.reload_interval = reload_interval
+        self.ingest = ingest
+        self.on_swap = on_swap
+        self._last_signature: Optional[List[Tuple[str, int, int]]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start watching from a daemon thread."""
+        self._thread = threading.Thread(target=self._run, name="ingestion-watcher", daemon=True)
+        self._thread.start()
+        logging.info(f"Checking for new indexes every {self.reload_interval}s"
+                     + (f" and for new hotel data every {self.interval}s" if self.ingest else ""))
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop watching; an ingest in progress is finished first."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        next_ingest = 0.0
+        while not self._stop.is_set():
+            if self.ingest and time.monotonic() >= next_ingest:
+                next_ingest = time.monotonic() + self.interval
+                try:
+                    self.run_once()
+                except Exception as e:
+                    # The files are checked again next time; the served index is untouched.
+                    logging.exception(f"Background ingestion failed: {e}")
+            try:
+                self.reload()
+            except Exception as e:
+                logging.exception(f"Loading the new index failed: {e}")
+            self._stop.wait(self.reload_interval)
+
+    def reload(self) -> bool:
+        """
+        Serve the newest published index if it changed.
+
+        Returns:
+            bool: Whether a new store was swapped in.
+        """
+        if not self.store.refresh():
+            return False
+        if self.on_swap is not None:
+            self.on_swap()
+        return True
+
+    def run_once(self) -> bool:
+        """
+        Ingest the source files if they changed since the last successful run, then serve the result.
+
+        Returns:
+            bool: Whether an ingest ran.
+        """
+        signature = self._source_signature()
+        if signature == self._last_signature:
+            return False
+        logging.info("Hotel data changed, ingesting in the background")
+        writer = self.container.ingest_document_store()
+        try:
+            chunk_count = MainIngestionProcess(self.container, document_store=writer).ingest()
+        finally:
+            writer.close()
+        logging.info(f"Background ingestion added {chunk_count} chunks")
+        # Stores without versioned indexes already serve the new documents.
+        if not self.reload() and self.on_swap is not None:
+            self.on_swap()
+        self._last_signature = signature
+        return True
+
+    @staticmethod
+    def _source_signature() -> List[Tuple[str, int, int]]:
+        """The modification time and size of every source file that exists."""
+        data_dir = PathUtil.construct_path(PathUtil.get_project_base_path(), 'data', 'hotel')
+        signature = []
+        for name in SOURCE_FILES:
+            path = os.path.join(data_dir, name)
+            if os.path.exists(path):
+                stat = os.stat(path)
+                signature.append((name, stat.st_mtime_ns, stat.st_size))
+        return signature
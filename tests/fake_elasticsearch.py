@@ -0,0 +1,183 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import unquote, urlparse
+
+
+class FakeElasticsearch:
+    """
+    In-process stand-in for the Elasticsearch REST endpoints ElasticsearchDocStore uses to load
+    documents: index templates and creation, index settings, refresh, _bulk, _delete_by_query and
+    _update_by_query. Searches are not supported.
+
+    Every request is recorded, so tests can count bulk requests and check the settings the store
+    changed. Documents whose source matches reject_document fail in the bulk response the way a
+    mapping error does. _update_by_query reports the documents it matches without running scripts.
+    """
+
+    def __init__(self, reject_document: Optional[Callable[[dict], bool]] = None):
+        self.reject_document = reject_document or (lambda source: False)
+        # Per index: "docs" by id, "settings" and "mappings".
+        self.indices: Dict[str, Dict[str, Any]] = {}
+        self.templates: Dict[str, dict] = {}
+        self.bulk_requests = 0
+        self.refreshes: List[str] = []
+        self.settings_updates: List[Any] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> 'FakeElasticsearch':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def documents(self, index: str) -> Dict[str, dict]:
+        return self.indices.get(index, {}).get("docs", {})
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _route(self):
+                url = urlparse(self.path)
+                parts = [unquote(part) for part in url.path.split("/") if part]
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                # The shared client compresses request bodies.
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                status, response = fake._dispatch(self.command, parts, body)
+                data = b"" if response is None else json.dumps(response).encode("utf-8")
+                self.send_response(status)
+                self.send_header("X-Elastic-Product", "Elasticsearch")
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(data)
+
+            do_GET = do_PUT = do_POST = do_HEAD = do_DELETE = _route
+
+        return Handler
+
+    def _dispatch(self, method: str, parts: List[str], body: bytes):
+        if parts == ["_bulk"]:
+            return 200, self._bulk(body)
+        if len(parts) == 2 and parts[0] == "_index_template":
+            self.templates[parts[1]] = json.loads(body)
+            return 200, {"acknowledged": True}
+        if len(parts) == 1:
+            return self._index(method, parts[0], body)
+        index = self.indices.get(parts[0])
+        if index is None:
+            return 404, {"error": {"type": "index_not_found_exception"}, "status": 404}
+        if parts[1] == "_settings":
+            return 200, self._settings(method, parts[0], index, body)
+        if parts[1] == "_refresh":
+            self.refreshes.append(parts[0])
+            return 200, {"_shards": {"failed": 0}}
+        if parts[1] == "_delete_by_query":
+            query = json.loads(body)["query"]
+            matching = [doc_id for doc_id, source in index["docs"].items() if _matches(query, source)]
+            for doc_id in matching:
+                del index["docs"][doc_id]
+            return 200, {"deleted": len(matching), "failures": []}
+        if parts[1] == "_update_by_query":
+            query = json.loads(body)["query"]
+            matching = [doc_id for doc_id, source in index["docs"].items() if _matches(query, source)]
+            return 200, {"updated": len(matching), "failures": []}
+        return 400, {"error": {"type": "unsupported", "reason": f"{method} /{'/'.join(parts)}"}, "status": 400}
+
+    def _index(self, method: str, name: str, body: bytes):
+        if method == "HEAD":
+            return (200 if name in self.indices else 404), None
+        if method == "DELETE":
+            self.indices.pop(name, None)
+            return 200, {"acknowledged": True}
+        if method == "PUT":
+            templates = [template for template in self.templates.values() if name in template["index_patterns"]]
+            mappings = templates[0]["template"]["mappings"] if templates else {}
+            self.indices[name] = {"docs": {}, "settings": {}, "mappings": mappings}
+            return 200, {"acknowledged": True, "index": name}
+        return 400, {"error": {"type": "unsupported"}, "status": 400}
+
+    def _settings(self, method: str, name: str, index: dict, body: bytes):
+        if method == "GET":
+            refresh_interval = index["settings"].get("refresh_interval")
+            return {name: {"settings": {"index": {"refresh_interval": refresh_interval}}}} if refresh_interval else {}
+        refresh_interval = json.loads(body)["index"]["refresh_interval"]
+        self.settings_updates.append(refresh_interval)
+        if refresh_interval is None:
+            index["settings"].pop("refresh_interval", None)
+        else:
+            index["settings"]["refresh_interval"] = refresh_interval
+        return {"acknowledged": True}
+
+    def _bulk(self, body: bytes) -> dict:
+        with self._lock:
+            self.bulk_requests += 1
+        lines = [json.loads(line) for line in body.decode("utf-8").splitlines() if line.strip()]
+        items = []
+        position = 0
+        while position < len(lines):
+            (operation, meta), = lines[position].items()
+            docs = self.indices.setdefault(meta["_index"], {"docs": {}, "settings": {}, "mappings": {}})["docs"]
+            if operation == "index":
+                source = lines[position + 1]
+                position += 2
+                if self.reject_document(source):
+                    items.append({operation: {"_id": meta["_id"], "status": 400,
+                                              "error": {"type": "document_parsing_exception"}}})
+                    continue
+                docs[meta["_id"]] = source
+                items.append({operation: {"_id": meta["_id"], "status": 201}})
+            else:
+                position += 1
+                status = 200 if docs.pop(meta["_id"], None) is not None else 404
+                items.append({operation: {"_id": meta["_id"], "status": status}})
+        errors = any(result["status"] >= 300 for item in items for result in item.values())
+        return {"took": 1, "errors": errors, "items": items}
+
+
+def _field(source: dict, field: str) -> Any:
+    """The value of a dotted field of a document source; the keyword sub-field reads the field itself."""
+    value = source
+    for part in field[:-len(".keyword")].split(".") if field.endswith(".keyword") else field.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _matches(query: dict, source: dict) -> bool:
+    """Evaluate the subset of the query DSL the document store sends: bool, exists, term, terms and match_all."""
+    (kind, clause), = query.items()
+    if kind == "match_all":
+        return True
+    if kind == "exists":
+        return _field(source, clause["field"]) is not None
+    if kind == "term":
+        (field, value), = clause.items()
+        return _field(source, field) == value
+    if kind == "terms":
+        (field, values), = clause.items()
+        return _field(source, field) in values
+    if kind == "bool":
+        return (all(_matches(sub, source) for sub in clause.get("must", []) + clause.get("filter", []))
+                and not any(_matches(sub, source) for sub in clause.get("must_not", [])))
+    raise ValueError(f"Unsupported query: {kind}")
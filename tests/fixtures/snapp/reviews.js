@@ -0,0 +1,55 @@
+// Renders a SnappTrip-like hotel page: the reviews appear after the "all reviews" button is
+// clicked and are loaded in batches as the last one is scrolled into view, like the real site.
+(function () {
+    var REVIEW_CLASSES = "shadow-1 bg-dim-background flex w-full flex-col gap-4 overflow-hidden rounded-xl p-4 xl:p-6";
+    var BATCH_SIZE = 2;
+    var loaded = 0;
+    var loading = false;
+
+    function viewpoint(markerClass, text) {
+        return '<div class="text-caption xl:text-body-2 flex">' +
+            '<div><span class="' + markerClass + '">•</span></div><div>' + text + '</div></div>';
+    }
+
+    function renderReview(review) {
+        return '<div class="' + REVIEW_CLASSES + '" style="min-height: 120vh">' +
+            '<div class="flex"><img src="/emoji-' + review.emoji + '.svg">' +
+            '<div class="text-caption xl:text-subtitle-2">' + review.name + '</div>' +
+            '<div class="text-on-surface-medium-emphasis">' + review.date + '</div></div>' +
+            '<span class="mini-chips_text__xuhB9">' + review.rating + '</span>' +
+            '<span class="mini-chips_text__xuhB9">' + review.room_type + '</span>' +
+            '<div class="text-caption xl:text-body-2">' + review.text + '</div>' +
+            review.positive.map(function (text) { return viewpoint("text-ventures-snapp", text); }).join("") +
+            review.negative.map(function (text) { return viewpoint("text-error", text); }).join("") +
+            '</div>';
+    }
+
+    function loadMore() {
+        var container = document.getElementById("reviews");
+        if (loading || loaded >= window.REVIEWS.length) {
+            return;
+        }
+        loading = true;
+        setTimeout(function () {
+            var batch = window.REVIEWS.slice(loaded, loaded + BATCH_SIZE);
+            container.insertAdjacentHTML("beforeend", batch.map(renderReview).join(""));
+            loaded += batch.length;
+            loading = false;
+        }, 50);
+    }
+
+    window.addEventListener("scroll", function () {
+        var reviews = document.querySelectorAll("#reviews > div");
+        if (reviews.length && reviews[reviews.length - 1].getBoundingClientRect().top < window.innerHeight) {
+            loadMore();
+        }
+    });
+
+    document.getElementById("all-reviews").addEventListener("click", function () {
+        if (!document.getElementById("reviews")) {
+            document.body.insertAdjacentHTML("beforeend",
+                '<div id="reviews" class="flex w-full flex-col gap-6 md:self-start"></div>');
+            loadMore();
+        }
+    });
+})();
@@ -0,0 +1,77 @@
+import pytest
+
+pytest.importorskip("langchain_elasticsearch")
+
+from benchmarks.hashing_embeddings import HashingEmbeddings
+from rag.core.interfaces import Document, DocumentType, DOCUMENT_KEY_FIELD
+from rag.data import elasticsearch_doc_store
+from rag.data.elasticsearch_doc_store import ElasticsearchDocStore
+from tests.fake_elasticsearch import FakeElasticsearch
+
+INDEX = "elasticsearch_hotel_info_index"
+
+
+@pytest.fixture
+def fake_es():
+    """A fake cluster rejecting the documents marked with a "reject" metadata field."""
+    server = FakeElasticsearch(reject_document=lambda source: source["metadata"].get("reject", False)).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def store(fake_es, monkeypatch):
+    monkeypatch.setattr(elasticsearch_doc_store, "HuggingFaceEmbeddings",
+                        lambda model_name=None: HashingEmbeddings(dimension=16))
+    config = {"params": {"elasticsearch_url": fake_es.url, "bulk_chunk_size": 50, "bulk_workers": 4}}
+    return ElasticsearchDocStore(config)
+
+
+def _hotels(start: int, count: int, **metadata):
+    return [Document(content=f"هتل شماره {i}", metadata={"hotel_source_id": i, DOCUMENT_KEY_FIELD: str(i), **metadata})
+            for i in range(start, start + count)]
+
+
+def test_batch_sends_one_bulk_request_per_chunk(fake_es, store):
+    with store.batch(DocumentType.HOTEL_INFO):
+        store.add_documents(_hotels(0, 500), DocumentType.HOTEL_INFO)
+        store.add_documents(_hotels(500, 500), DocumentType.HOTEL_INFO)
+
+    assert len(fake_es.documents(INDEX)) == 1000
+    assert fake_es.bulk_requests == 1000 // 50
+    # Periodic refreshes are off during the load, and the index is refreshed once at the end.
+    assert fake_es.settings_updates == ["-1", None]
+    assert fake_es.refreshes == [INDEX]
+    vector_options = fake_es.indices[INDEX]["mappings"]["properties"]["vector"]["index_options"]
+    assert vector_options["type"] == "hnsw"
+
+
+def test_batch_restores_a_custom_refresh_interval(fake_es, store):
+    store.add_documents(_hotels(0, 10), DocumentType.HOTEL_INFO)
+    fake_es.indices[INDEX]["settings"]["refresh_interval"] = "5s"
+
+    store.add_documents(_hotels(10, 10), DocumentType.HOTEL_INFO)
+
+    assert fake_es.settings_updates[-2:] == ["-1", "5s"]
+    assert fake_es.indices[INDEX]["settings"]["refresh_interval"] == "5s"
+
+
+def test_failed_bulk_load_rolls_back_the_batch(fake_es, store):
+    store.add_documents(_hotels(0, 30), DocumentType.HOTEL_INFO)
+
+    with pytest.raises(RuntimeError):
+        store.add_documents(_hotels(30, 120) + _hotels(150, 1, reject=True), DocumentType.HOTEL_INFO)
+
+    assert sorted(source["metadata"]["hotel_source_id"] for source in fake_es.documents(INDEX).values()) \
+        == list(range(30))
+    assert fake_es.settings_updates[-2:] == ["-1", None]
+
+
+def test_exception_inside_a_batch_rolls_back_its_documents(fake_es, store):
+    with pytest.raises(ValueError):
+        with store.batch(DocumentType.HOTEL_INFO):
+            store.add_documents(_hotels(0, 75), DocumentType.HOTEL_INFO)
+            raise ValueError("ingest failed")
+
+    assert fake_es.documents(INDEX) == {}
+    assert fake_es.refreshes[-1] == INDEX
@@ -0,0 +1,56 @@
+import pytest
+
+from benchmarks.hashing_embeddings import HashingEmbeddings
+from rag.core.interfaces import Document, DocumentType, DOCUMENT_KEY_FIELD, MetadataFilter
+from rag.data.faiss_doc_store import FAISSStore
+from rag.data.vector_compression import PQ_MIN_TRAINING_VECTORS, VectorCompression
+
+CITIES = ["تهران", "شیراز", "اصفهان"]
+WORDS = ["هتل", "استخر", "صبحانه", "پارکینگ", "نزدیک", "مرکز", "شهر", "ساحل", "آرام", "لوکس"]
+
+
+def _hotels(count: int):
+    return [Document(content=" ".join(WORDS[(i + j * 3) % len(WORDS)] for j in range(4)) + f" شماره {i}",
+                     metadata={"hotel_source_id": i, "city_name": CITIES[i % len(CITIES)], DOCUMENT_KEY_FIELD: str(i)})
+            for i in range(count)]
+
+
+def _store(tmp_path, compression: VectorCompression) -> FAISSStore:
+    settings = {"compression": compression.value, "train_size": 50, "pq_m": 4, "k": 5}
+    index_paths = {doc_type: str(tmp_path / doc_type.value) for doc_type in DocumentType}
+    return FAISSStore({"params": {"persistent": True}}, {doc_type.value: settings for doc_type in DocumentType},
+                      index_paths=index_paths, embeddings=HashingEmbeddings(dimension=16))
+
+
+@pytest.mark.parametrize("compression", list(VectorCompression))
+def test_filtered_search_on_every_compression(tmp_path, compression):
+    store = _store(tmp_path, compression)
+    store.add_documents(_hotels(PQ_MIN_TRAINING_VECTORS + 44), DocumentType.HOTEL_INFO)
+    assert VectorCompression.of(store.indexes[DocumentType.HOTEL_INFO]) is compression
+
+    city_filter = MetadataFilter().eq("city_name", "شیراز")
+    results = store.search("هتل استخر نزدیک ساحل", k=5, metadata_filter=city_filter)
+    hybrid = store.hybrid_search("هتل استخر نزدیک ساحل", k=5, metadata_filter=city_filter)
+    single = store.search("هتل", k=5, metadata_filter=MetadataFilter().eq("hotel_source_id", 7))
+
+    assert len(results) == 5 and all(doc.metadata["city_name"] == "شیراز" for doc in results)
+    assert len(hybrid) == 5 and all(doc.metadata["city_name"] == "شیراز" for doc in hybrid)
+    assert [doc.metadata["hotel_source_id"] for doc in single] == [7]
+    store.close()
+
+
+def test_filtered_pq_search_matches_the_exact_ranking(tmp_path):
+    exact = _store(tmp_path / "exact", VectorCompression.NONE)
+    pq = _store(tmp_path / "pq", VectorCompression.PQ)
+    for store in (exact, pq):
+        store.add_documents(_hotels(PQ_MIN_TRAINING_VECTORS + 44), DocumentType.HOTEL_INFO)
+    city_filter = MetadataFilter().eq("city_name", "تهران")
+
+    expected = exact.search_with_scores("صبحانه مرکز شهر", k=8, metadata_filter=city_filter)
+    actual = pq.search_with_scores("صبحانه مرکز شهر", k=8, metadata_filter=city_filter)
+
+    assert [doc.metadata["hotel_source_id"] for doc, _ in actual] \
+        == [doc.metadata["hotel_source_id"] for doc, _ in expected]
+    assert [score for _, score in actual] == pytest.approx([score for _, score in expected], rel=1e-5)
+    exact.close()
+    pq.close()
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+from benchmarks.hashing_embeddings import HashingEmbeddings
+from rag.core.interfaces import Document, DocumentType, DOCUMENT_KEY_FIELD
+from rag.core.tracing import span, tracer
+from rag.data.faiss_doc_store import FAISSStore
+from rag.data.sharded_faiss_doc_store import ShardedFAISSStore
+from utils.path_util import PathUtil
+
+CITIES = ["تهران", "شیراز", "اصفهان", "مشهد"]
+WORDS = ["هتل", "استخر", "صبحانه", "پارکینگ", "نزدیک", "مرکز", "شهر", "ساحل", "آرام", "لوکس", "بازار", "حرم"]
+QUERIES = ["هتل استخر نزدیک ساحل", "صبحانه مرکز شهر", "پارکینگ آرام", "لوکس نزدیک حرم", "بازار"]
+
+
+def _hotels(count: int):
+    # Every hotel has a different length, so no two have the same BM25 score.
+    return [Document(content=" ".join(WORDS[(i * 7 + j * 5) % len(WORDS)] for j in range(2 + i % 5))
+                     + " اتاق" * i + f" شماره {i}",
+                     metadata={"hotel_source_id": i, "city_name": CITIES[(i * 3) % len(CITIES)],
+                               DOCUMENT_KEY_FIELD: str(i)})
+            for i in range(count)]
+
+
+def test_hybrid_search_ranks_like_an_unsharded_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(PathUtil, "get_project_base_path", staticmethod(lambda: Path(tmp_path)))
+    embeddings = HashingEmbeddings(dimension=16)
+    config = {"params": {"persistent": True}}
+    unsharded = FAISSStore(config, index_paths={doc_type: str(tmp_path / "single" / doc_type.value)
+                                                for doc_type in DocumentType}, embeddings=embeddings)
+    sharded = ShardedFAISSStore(config, embeddings=embeddings)
+    for store in (unsharded, sharded):
+        store.add_documents(_hotels(120), DocumentType.HOTEL_INFO)
+    assert len(sharded.shard_names()) == len(CITIES)
+
+    for query in QUERIES:
+        expected = [doc.metadata["hotel_source_id"] for doc in unsharded.hybrid_search(query, k=10)]
+        actual = [doc.metadata["hotel_source_id"] for doc in sharded.hybrid_search(query, k=10)]
+        assert actual == expected, query
+    unsharded.close()
+    sharded.close()
+
+
+def test_shard_searches_are_traced_under_the_query_span(tmp_path, monkeypatch):
+    monkeypatch.setattr(PathUtil, "get_project_base_path", staticmethod(lambda: Path(tmp_path)))
+    sharded = ShardedFAISSStore({"params": {"persistent": True}}, embeddings=HashingEmbeddings(dimension=16))
+    sharded.add_documents(_hotels(40), DocumentType.HOTEL_INFO)
+    traces = []
+    monkeypatch.setattr(tracer, "enabled", True)
+    monkeypatch.setattr(tracer, "exporters", [traces.append])
+
+    with span("query"):
+        sharded.search(QUERIES[0], k=5)
+        sharded.hybrid_search(QUERIES[0], k=5)
+
+    assert [trace.name for trace in traces] == ["query"]
+    for search in traces[0].children:
+        assert [child.name for child in search.children].count("store.shard_search") == len(CITIES)
+    sharded.close()
@@ -0,0 +1,88 @@
+import functools
+import shutil
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from rag.core.scrapers.snap.snapp_hotel_scraper import ExtractionMode, SnappTripScraper
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "snapp"
+CHROME_BINARIES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+# Review names per fixture page, in page order.
+EXPECTED_REVIEWS = {
+    "هتل آزادی": ["مریم", "علی", "سارا", "رضا", "نگار"],
+    "هتل اسپیناس": ["حسین", "زهرا", "امیر"],
+}
+PAGES = {"هتل آزادی": "hotel_azadi.html", "هتل اسپیناس": "hotel_espinas.html"}
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def fixture_server():
+    """Serves the fixture pages from a local http.server for the duration of the module."""
+    handler = functools.partial(_QuietHandler, directory=str(FIXTURES_DIR))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _chrome_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-gpu")
+    return webdriver.Chrome(options=options)
+
+
+@pytest.fixture(scope="module")
+def driver_factory():
+    if not any(shutil.which(binary) for binary in CHROME_BINARIES):
+        pytest.skip("Chrome is not installed")
+    _chrome_driver().quit()
+    return _chrome_driver
+
+
+@pytest.mark.parametrize("extraction_mode", [ExtractionMode.WEBDRIVER, ExtractionMode.HTML])
+def test_worker_pool_scrapes_every_hotel(fixture_server, driver_factory, extraction_mode):
+    scraper = SnappTripScraper(num_workers=2, driver_factory=driver_factory, extraction_mode=extraction_mode,
+                               wait_timeout=5, scroll_timeout=1)
+    hotels = {name: f"{fixture_server}/{page}" for name, page in PAGES.items()}
+
+    scraper._scrape_hotels(hotels)
+
+    records = {record["hotel_name"]: record for record in scraper.all_reviews}
+    assert set(records) == set(EXPECTED_REVIEWS)
+    for hotel_name, names in EXPECTED_REVIEWS.items():
+        reviews = records[hotel_name]["reviews"]
+        assert [review["name"] for review in reviews] == names
+        assert records[hotel_name]["hotel_city"] == scraper.user_selected_city
+
+    review = records["هتل آزادی"]["reviews"][1]
+    assert review["rating"] == "۳"
+    assert review["room_type"] == "یک تخته"
+    assert review["main_text"] == "موقعیت خوب ولی سر و صدای خیابان زیاد بود."
+    assert review["positive_viewpoints"] == ["موقعیت"]
+    assert review["negative_viewpoints"] == ["سر و صدا"]
+    assert review["emoji"].endswith("/emoji-3.svg")
+
+
+def test_worker_pool_keeps_going_after_a_failed_hotel(fixture_server, driver_factory):
+    scraper = SnappTripScraper(num_workers=2, driver_factory=driver_factory, wait_timeout=1, scroll_timeout=1)
+    hotels = {"هتل آزادی": f"{fixture_server}/hotel_azadi.html", "missing": f"{fixture_server}/missing.html"}
+
+    scraper._scrape_hotels(hotels)
+
+    assert [record["hotel_name"] for record in scraper.all_reviews] == ["هتل آزادی"]
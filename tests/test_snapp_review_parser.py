@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from rag.core.scrapers.snap.snapp_review_parser import SnappReviewParser
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "snapp"
+
+
+def test_parses_only_the_reviews_inside_the_reviews_list():
+    page_source = (FIXTURES_DIR / "hotel_reviews_loaded.html").read_text(encoding="utf-8")
+
+    reviews = SnappReviewParser.parse_reviews(page_source)
+
+    assert reviews == [
+        {
+            "name": "مریم",
+            "date": "۱۴۰۳/۰۱/۱۲",
+            "emoji": "/emoji-5.svg",
+            "rating": "۵",
+            "room_type": "دو تخته",
+            "main_text": "اتاق تمیز و کارکنان مودب بودند.",
+            "positive_viewpoints": ["صبحانه", "نظافت"],
+            "negative_viewpoints": []
+        },
+        {
+            "name": "علی",
+            "date": "۱۴۰۳/۰۲/۰۳",
+            "emoji": "/emoji-3.svg",
+            "rating": "۳",
+            "room_type": "یک تخته",
+            "main_text": "موقعیت خوب ولی سر و صدای خیابان زیاد بود.",
+            "positive_viewpoints": ["موقعیت"],
+            "negative_viewpoints": ["سر و صدا"]
+        }
+    ]
+
+
+def test_empty_page_has_no_reviews():
+    assert SnappReviewParser.parse_reviews("") == []
@@ -1,19 +1,28 @@
+from typing import Optional
+
 import gradio as gr
 
-from rag.core.interfaces import IRetriever, ILLM
+from rag.core.analyzers.query_analyzer import QueryAnalyzer
+
+from rag.core.interfaces import IRetriever, ILLM, IReranker
 from rag.core.processors.main_query_process import MainQueryProcess
 from ui.chat_interface import ChatInterface
 
 
 # Assume you have already built your container and loaded the document store.
-def create_chat_interface(hotel_retriever: IRetriever, review_retriever: IRetriever, llm: ILLM) -> ChatInterface:
+def create_chat_interface(hotel_retriever: IRetriever, review_retriever: IRetriever, llm: ILLM,
+                          query_analyzer: Optional[QueryAnalyzer] = None, reranker: Optional[IReranker] = None,
+                          rerank_top_k: int = 5) -> ChatInterface:
     # Build a simple query processor.
-    qp = MainQueryProcess(hotel_retriever, review_retriever, llm)
+    qp = MainQueryProcess(hotel_retriever, review_retriever, llm, query_analyzer, reranker, rerank_top_k)
     return ChatInterface(qp)
 
 
-def launch_gradio_ui(hotel_retriever: IRetriever, review_retriever: IRetriever, llm: ILLM):
-    chat_interface = create_chat_interface(hotel_retriever, review_retriever, llm)
+def launch_gradio_ui(hotel_retriever: IRetriever, review_retriever: IRetriever, llm: ILLM,
+                     query_analyzer: Optional[QueryAnalyzer] = None, reranker: Optional[IReranker] = None,
+                     rerank_top_k: int = 5):
+    chat_interface = create_chat_interface(hotel_retriever, review_retriever, llm, query_analyzer,
+                                           reranker, rerank_top_k)
 
     def respond(query):
         return chat_interface.submit_query(query)
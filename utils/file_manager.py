@@ -1,10 +1,12 @@
 import json
 import os
+from typing import Any, Iterator
 
 
 class FileManager:
-    def __init__(self, file_path):
+    def __init__(self, file_path, read_size: int = 1 << 16):
         self.file_path = file_path
+        self.read_size = read_size
 
     def load_records(self):
         # Load records from file
@@ -18,3 +20,84 @@ class FileManager:
         else:
             print(f"File {self.file_path} does not exist.")
             return []
+
+    def iter_records(self) -> Iterator[Any]:
+        """
+        Lazily yield the records of a JSON array file or a JSON Lines file one at a time.
+
+        Only the record being decoded is held in memory, so the file can be much larger than RAM.
+        Files ending in .jsonl are read line by line; any other file is expected to hold a
+        top-level JSON array.
+        """
+        if not os.path.exists(self.file_path):
+            print(f"File {self.file_path} does not exist.")
+            return
+        with open(self.file_path, 'r', encoding='utf-8') as file:
+            if str(self.file_path).endswith('.jsonl'):
+                yield from self._iter_json_lines(file)
+            else:
+                yield from self._iter_json_array(file)
+
+    @staticmethod
+    def _iter_json_lines(file) -> Iterator[Any]:
+        for line_number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Failed to decode JSON on line {line_number} of {file.name}.")
+
+    def _iter_json_array(self, file) -> Iterator[Any]:
+        decoder = json.JSONDecoder()
+        buffer = ""
+        position = 0
+        eof = False
+
+        def fill(size: int = self.read_size):
+            nonlocal buffer, position, eof
+            chunk = file.read(size)
+            if not chunk:
+                eof = True
+            buffer = buffer[position:] + chunk
+            position = 0
+
+        def skip(chars: str) -> None:
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position] in chars:
+                    position += 1
+                if position < len(buffer) or eof:
+                    return
+                fill()
+
+        skip(" \t\r\n")
+        if position >= len(buffer) or buffer[position] != '[':
+            print(f"Failed to decode JSON from {file.name}: expected a top-level array.")
+            return
+        position += 1
+
+        while True:
+            skip(" \t\r\n,")
+            if position >= len(buffer):
+                print(f"Failed to decode JSON from {file.name}: unexpected end of file.")
+                return
+            if buffer[position] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The record is split across reads: pull in more data and retry. The read size
+                # doubles with the pending data so a large record is not re-parsed many times.
+                if eof:
+                    print(f"Failed to decode JSON from {file.name}.")
+                    return
+                fill(max(self.read_size, len(buffer) - position))
+                continue
+            if end == len(buffer) and not eof and not isinstance(record, (dict, list)):
+                # A scalar at the end of the buffer may continue in the next read.
+                fill()
+                continue
+            position = end
+            yield record
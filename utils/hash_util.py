@@ -76,3 +76,15 @@ class HashUtil:
         except Exception as e:
             print(f"An error occurred while loading the hash: {e}")
             raise e
+
+    @staticmethod
+    def find_changed_hashes(hash_store, new_hashes: Dict[str, str]) -> Dict[str, str]:
+        """
+        Compare the given id -> hash mapping against the hash store with a single bulk lookup.
+        Returns the subset of ids whose hash is missing from the store or differs from it.
+        """
+        existing_hashes = hash_store.load_hashes(new_hashes.keys())
+        return {
+            id: new_hash for id, new_hash in new_hashes.items()
+            if id not in existing_hashes or HashUtil.should_update(existing_hashes[id], new_hash)
+        }
@@ -0,0 +1,34 @@
+import re
+from typing import List
+
+# Arabic code points that have a Persian counterpart, and Persian/Arabic digits.
+_CHARACTER_MAP = str.maketrans({
+    "ي": "ی", "ى": "ی", "ك": "ک", "ة": "ه", "ۀ": "ه", "أ": "ا", "إ": "ا", "ٱ": "ا", "ؤ": "و",
+    "۰": "0", "۱": "1", "۲": "2", "۳": "3", "۴": "4", "۵": "5", "۶": "6", "۷": "7", "۸": "8", "۹": "9",
+    "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4", "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+    "‌": " ",  # zero-width non-joiner
+    "‏": None,  # right-to-left mark
+    "ـ": None,  # tatweel
+})
+_DIACRITICS = re.compile("[ً-ْٰ]")
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+class PersianNormalizer:
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Normalize Persian text so differently typed forms of a word compare equal:
+        Arabic letter variants are mapped to their Persian forms, digits to ASCII, diacritics and
+        tatweel are removed, zero-width non-joiners become spaces and Latin letters are lower-cased.
+        """
+        if not text:
+            return ""
+        text = _DIACRITICS.sub("", text.translate(_CHARACTER_MAP))
+        return _WHITESPACE.sub(" ", text).strip().lower()
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """Normalize the text and split it into word tokens."""
+        return [token for token in _NON_WORD.split(PersianNormalizer.normalize(text)) if token]
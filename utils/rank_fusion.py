@@ -0,0 +1,23 @@
+from typing import Hashable, List, Sequence, Tuple
+
+
+class RankFusion:
+    @staticmethod
+    def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = 60) -> List[Tuple[Hashable, float]]:
+        """
+        Fuse several ranked lists with Reciprocal Rank Fusion: each item scores the sum of
+        1 / (k + rank) over the lists it appears in. Only ranks are used, so lists scored on
+        incomparable scales (BM25 scores and vector distances) can be combined directly.
+
+        Args:
+            rankings (Sequence[Sequence[Hashable]]): Ranked item ids, best first, one list per ranker.
+            k (int): Damping constant; larger values flatten the advantage of the top ranks.
+
+        Returns:
+            List[Tuple[Hashable, float]]: (item, fused score) pairs, best first.
+        """
+        scores = {}
+        for ranking in rankings:
+            for rank, item in enumerate(ranking, start=1):
+                scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+        return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
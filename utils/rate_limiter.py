@@ -0,0 +1,38 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Thread-safe rate limiter that spaces calls at least 1 / rate seconds apart.
+
+    A single instance can be shared by several worker threads so that the combined
+    request rate against a remote API never exceeds the configured limit.
+    """
+
+    def __init__(self, rate: float):
+        """
+        :param rate: Maximum number of calls per second. A value <= 0 disables limiting.
+        """
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self) -> None:
+        """Block until the caller is allowed to issue the next call."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False